@@ -1,23 +1,25 @@
 """API dependencies."""
-from typing import Generator
-from fastapi import Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.database import get_db
+import hmac
+from typing import Optional
+from fastapi import Depends, Header, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.models.user import User
-from app.repositories.user_repository import UserRepository
+from app.config import settings
+from app.repositories.user_repository import AsyncUserRepository
 
 
-def get_current_user(
+async def get_current_user(
     user_id: int = 1,  # Simplified for MVP - would use JWT in production
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> User:
     """
     Get current authenticated user.
     
     Note: This is simplified for MVP. In production, use JWT tokens.
     """
-    repository = UserRepository(db)
-    user = repository.find_by_id(user_id)
+    repository = AsyncUserRepository(db)
+    user = await repository.find_by_id(user_id)
     
     if not user:
         raise HTTPException(
@@ -28,7 +30,35 @@ def get_current_user(
     return user
 
 
+async def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """
+    Require the admin token (X-Admin-Token header).
+    
+    Admin endpoints are disabled (404) while ADMIN_TOKEN is not set.
+    """
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid admin token",
+        )
 
 
-
-
+async def require_metrics_token(authorization: Optional[str] = Header(None)) -> None:
+    """
+    Require the metrics token (Authorization: Bearer <token>).
+    
+    GET /metrics is disabled (404) while METRICS_ENABLED is off or
+    METRICS_TOKEN is not set.
+    """
+    if not settings.METRICS_ENABLED or not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    
+    expected = f"Bearer {settings.METRICS_TOKEN}"
+    if not authorization or not hmac.compare_digest(authorization, expected):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+        )
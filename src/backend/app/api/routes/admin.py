@@ -0,0 +1,39 @@
+"""Admin routes (protected by ADMIN_TOKEN)."""
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.api.dependencies import require_admin
+from app.config import settings
+from app.database import get_async_db
+from app.services.migration_service import MigrationService
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.post("/migrations/{migration_id}/profile", status_code=status.HTTP_202_ACCEPTED)
+async def profile_migration(
+    migration_id: int,
+    seconds: Optional[int] = Query(None, ge=1, description="Profiling window in seconds"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Capture a sampled CPU profile and asyncio task dump of a running migration.
+    
+    The worker processing the migration picks the request up within one item
+    and writes the artifacts to PROFILE_DIR on the worker host.
+    """
+    service = MigrationService(db)
+    migration = await service.request_profile(migration_id, seconds)
+    
+    if not migration:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Migration not found",
+        )
+    
+    return {
+        "migration_id": migration.id,
+        "status": migration.status,
+        "profile": migration.options["profile"],
+        "profile_dir": settings.PROFILE_DIR,
+    }
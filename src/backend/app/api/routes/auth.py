@@ -1,12 +1,13 @@
 """Authentication routes."""
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db, get_async_db
 from app.config import settings
 from app.schemas.user import UserCreate, UserResponse
 from app.services.auth_service import AuthService
 from app.services.credential_service import CredentialService
-from app.repositories.user_repository import UserRepository
+from app.repositories.user_repository import UserRepository, AsyncUserRepository
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -14,13 +15,13 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def register_user(
     user_data: UserCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Register a new user."""
-    repository = UserRepository(db)
+    repository = AsyncUserRepository(db)
     
     # Check if user already exists
-    existing = repository.find_by_email(user_data.email)
+    existing = await repository.find_by_email(user_data.email)
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -30,7 +31,7 @@ async def register_user(
     # Create user
     from app.models.user import User
     user = User(email=user_data.email)
-    user = repository.create(user)
+    user = await repository.create(user)
     
     return user
 
@@ -1,11 +1,12 @@
 """Credential routes."""
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app.models.user import User
 from app.api.dependencies import get_current_user
 from app.schemas.credential import CredentialCreate, CredentialResponse, CredentialList
-from app.services.credential_service import CredentialService
+from app.services.credential_service import AsyncCredentialService, CredentialService
 
 router = APIRouter(prefix="/credentials", tags=["credentials"])
 
@@ -14,7 +15,7 @@ router = APIRouter(prefix="/credentials", tags=["credentials"])
 async def create_credential(
     credential_data: CredentialCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Create or update credentials.
@@ -26,7 +27,7 @@ async def create_credential(
     For Google Drive:
     - Use OAuth flow instead of this endpoint
     """
-    service = CredentialService(db)
+    service = AsyncCredentialService(db)
     
     try:
         # Additional validation for iCloud
@@ -44,7 +45,7 @@ async def create_credential(
                     detail="Apple ID deve ser um email válido",
                 )
         
-        credential = service.create_credential(current_user.id, credential_data)
+        credential = await service.create_credential(current_user.id, credential_data)
         
         return CredentialResponse(
             id=credential.id,
@@ -179,12 +180,12 @@ async def verify_google_connection(
 async def delete_credential(
     credential_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Delete a credential."""
-    service = CredentialService(db)
+    service = AsyncCredentialService(db)
     
-    success = service.delete_credential(credential_id, current_user.id)
+    success = await service.delete_credential(credential_id, current_user.id)
     
     if not success:
         raise HTTPException(
@@ -1,8 +1,9 @@
 """Migration routes."""
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from app.database import get_db
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Query
+from fastapi import status as http_status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.models.user import User
 from app.api.dependencies import get_current_user
 from app.schemas.migration import (
@@ -10,8 +11,11 @@ from app.schemas.migration import (
     MigrationResponse,
     MigrationList,
     MigrationProgress,
+    FailedItemList,
+    FailedItemResponse,
 )
 from app.services.migration_service import MigrationService
+from app.services.outbox_dispatcher import flush_outbox
 
 router = APIRouter(prefix="/migrations", tags=["migrations"])
 
@@ -19,8 +23,9 @@ router = APIRouter(prefix="/migrations", tags=["migrations"])
 @router.post("", response_model=MigrationResponse, status_code=status.HTTP_201_CREATED)
 async def create_migration(
     migration_data: MigrationCreate,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Create a new migration.
@@ -29,11 +34,15 @@ async def create_migration(
     1. Verifies that both iCloud and Google Drive credentials are configured
     2. Creates a migration record
     3. Queues the migration task in the background
+    
+    The task is written to the outbox with the migration and published
+    after the response is sent, so QStash latency does not affect this call.
     """
     service = MigrationService(db)
     
     try:
-        migration = service.create_migration(current_user.id, migration_data)
+        migration = await service.create_migration(current_user.id, migration_data)
+        background_tasks.add_task(flush_outbox)
         response = MigrationResponse(
             id=migration.id,
             status=migration.status,
@@ -63,17 +72,45 @@ async def list_migrations(
     status: Optional[str] = Query(None, description="Filter by status"),
     page: int = Query(1, ge=1, description="Page number"),
     limit: int = Query(20, ge=1, le=100, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page (enables cursor pagination)"),
+    paginate: str = Query("offset", pattern="^(offset|cursor)$", description="Pagination mode"),
+    include_total: bool = Query(True, description="Compute the total count (extra query)"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    """List user migrations."""
+    """
+    List user migrations.
+    
+    Offset pagination (page/limit) is the default. With paginate=cursor (or
+    when a cursor is given) pages are fetched with keyset pagination and the
+    response carries next_cursor; the total is only computed if requested.
+    """
     service = MigrationService(db)
-    migrations, total = service.get_user_migrations(
-        current_user.id,
-        status=status,
-        page=page,
-        limit=limit,
-    )
+    next_cursor = None
+    
+    if cursor or paginate == "cursor":
+        try:
+            migrations, next_cursor = await service.get_user_migrations_after(
+                current_user.id,
+                status=status,
+                cursor=cursor,
+                limit=limit,
+            )
+        except ValueError as e:
+            raise HTTPException(
+                status_code=http_status.HTTP_400_BAD_REQUEST,
+                detail=str(e),
+            )
+        total = await service.count_user_migrations(current_user.id, status) if include_total else None
+        page = 1
+    else:
+        migrations, total = await service.get_user_migrations(
+            current_user.id,
+            status=status,
+            page=page,
+            limit=limit,
+            include_total=include_total,
+        )
     
     return MigrationList(
         migrations=[
@@ -92,6 +129,7 @@ async def list_migrations(
         total=total,
         page=page,
         limit=limit,
+        next_cursor=next_cursor,
     )
 
 
@@ -99,11 +137,11 @@ async def list_migrations(
 async def get_migration(
     migration_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Get migration details."""
     service = MigrationService(db)
-    migration = service.get_migration(migration_id, current_user.id)
+    migration = await service.get_migration(migration_id, current_user.id)
     
     if not migration:
         raise HTTPException(
@@ -127,11 +165,11 @@ async def get_migration(
 async def get_migration_progress(
     migration_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Get migration progress."""
     service = MigrationService(db)
-    progress = service.get_migration_progress(migration_id, current_user.id)
+    progress = await service.get_migration_progress(migration_id, current_user.id)
     
     if not progress:
         raise HTTPException(
@@ -146,11 +184,11 @@ async def get_migration_progress(
 async def pause_migration(
     migration_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Pause a migration."""
     service = MigrationService(db)
-    success = service.pause_migration(migration_id, current_user.id)
+    success = await service.pause_migration(migration_id, current_user.id)
     
     if not success:
         raise HTTPException(
@@ -164,12 +202,13 @@ async def pause_migration(
 @router.post("/{migration_id}/resume")
 async def resume_migration(
     migration_id: int,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Resume a paused migration."""
     service = MigrationService(db)
-    success = service.resume_migration(migration_id, current_user.id)
+    success = await service.resume_migration(migration_id, current_user.id)
     
     if not success:
         raise HTTPException(
@@ -177,6 +216,8 @@ async def resume_migration(
             detail="Cannot resume migration",
         )
     
+    background_tasks.add_task(flush_outbox)
+    
     return {"success": True, "status": "in_progress"}
 
 
@@ -184,11 +225,11 @@ async def resume_migration(
 async def cancel_migration(
     migration_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Cancel a migration."""
     service = MigrationService(db)
-    success = service.cancel_migration(migration_id, current_user.id)
+    success = await service.cancel_migration(migration_id, current_user.id)
     
     if not success:
         raise HTTPException(
@@ -196,3 +237,65 @@ async def cancel_migration(
             detail="Cannot cancel migration",
         )
 
+
+@router.get("/{migration_id}/failed-items", response_model=FailedItemList)
+async def list_failed_items(
+    migration_id: int,
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of items"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """List the items of a migration that could not be transferred."""
+    service = MigrationService(db)
+    failed_items = await service.get_failed_items(migration_id, current_user.id, limit=limit)
+    
+    if failed_items is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Migration not found",
+        )
+    
+    return FailedItemList(items=[FailedItemResponse.model_validate(item) for item in failed_items])
+
+
+@router.post("/{migration_id}/retry-failed", response_model=MigrationResponse, status_code=status.HTTP_201_CREATED)
+async def retry_failed_items(
+    migration_id: int,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Re-run only the failed items of a migration.
+    
+    Creates a new migration covering the items recorded as failed (and not
+    yet retried), from the same source, and queues it like a new migration.
+    """
+    service = MigrationService(db)
+    
+    try:
+        migration = await service.retry_failed_items(migration_id, current_user.id)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+    
+    if not migration:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Migration not found",
+        )
+    
+    background_tasks.add_task(flush_outbox)
+    
+    return MigrationResponse(
+        id=migration.id,
+        status=migration.status,
+        total_photos=migration.total_photos,
+        migrated_photos=migration.migrated_photos,
+        failed_photos=migration.failed_photos,
+        started_at=migration.started_at,
+        completed_at=migration.completed_at,
+        created_at=migration.created_at,
+    )
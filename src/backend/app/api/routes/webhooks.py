@@ -1,10 +1,8 @@
 """Webhook routes for QStash."""
-import asyncio
 import json
 from fastapi import APIRouter, Request, HTTPException, status, Header, Depends
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.workers.tasks import process_migration_async
 from app.services.qstash_service import get_qstash_service
 import logging
 
@@ -61,8 +59,14 @@ async def qstash_webhook(
         
         # Process migration asynchronously
         # Note: QStash espera uma resposta rápida, então processamos em background
+        # Imported here so the worker code is only loaded when a task arrives
+        from app.workers.migration_processor import mark_migration_failed, process_migration_async
+        from app.services.outbox_dispatcher import flush_outbox
+        
         try:
             result = await process_migration_async(migration_id, user_id, db)
+            # Publish the next fairly scheduled units (including the continuation)
+            await flush_outbox()
             logger.info(f"Migration {migration_id} processed successfully")
             return {
                 "success": True,
@@ -70,8 +74,11 @@ async def qstash_webhook(
                 "result": result,
             }
         except ValueError as e:
-            # Validation errors
+            # Validation errors are not retried: end the migration and
+            # publish the units waiting for the freed slot
             logger.error(f"Validation error in migration {migration_id}: {str(e)}")
+            mark_migration_failed(db, migration_id, str(e))
+            await flush_outbox()
             return {
                 "success": False,
                 "error": str(e),
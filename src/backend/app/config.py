@@ -24,6 +24,18 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite:///./cloud_migrate.db"
+    DB_POOL_PROFILE: str = "auto"  # auto | api | worker | serverless
+    # Sobrescrevem o perfil do engine principal (na API, o assíncrono; o
+    # engine síncrono da API mantém o perfil api_sync)
+    DB_POOL_SIZE: Optional[int] = None  # Sobrescreve o tamanho do perfil
+    DB_MAX_OVERFLOW: Optional[int] = None  # Sobrescreve o overflow do perfil
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800  # segundos
+    DB_POOL_PRE_PING: bool = True
+    DB_ECHO: bool = False  # Loga todas as queries SQL (muito verboso)
+    # Cria as tabelas no startup da API; vazio = apenas em development.
+    # Em produção use: python init_db.py
+    DB_AUTO_CREATE_SCHEMA: Optional[bool] = None
     
     # Security
     SECRET_KEY: str = "change-me-in-production"
@@ -44,6 +56,85 @@ class Settings(BaseSettings):
     QSTASH_CURRENT_SIGNING_KEY: Optional[str] = None
     QSTASH_NEXT_SIGNING_KEY: Optional[str] = None
     QSTASH_URL: str = "https://qstash.upstash.io/v2/publish"
+    QSTASH_PUBLISH_TIMEOUT: float = 3.0  # Orçamento (segundos) por requisição de publicação
+    QSTASH_BATCH_SIZE: int = 100  # Mensagens por requisição /v2/batch
+    
+    # Outbox de tarefas de migração
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_MAX_ATTEMPTS: int = 8
+    OUTBOX_DISPATCH_INTERVAL: int = 30  # segundos (Celery beat)
+    
+    # Escalonador justo entre usuários: cada execução do worker processa um
+    # bloco (itens ou segundos, o que vier primeiro) e reenfileira o restante
+    SCHEDULER_MAX_IN_FLIGHT: int = 16  # blocos em execução no total; 0 = sem limite
+    SCHEDULER_PER_USER_CAP: int = 2  # blocos em execução por usuário; 0 = sem limite
+    SCHEDULER_CHUNK_ITEMS: int = 500  # 0 = sem limite
+    SCHEDULER_CHUNK_SECONDS: int = 300  # 0 = sem limite
+    # Blocos sem conclusão após este prazo são reenfileirados (>= task_time_limit)
+    SCHEDULER_LEASE_SECONDS: int = 1800
+    SCHEDULER_FAIRNESS_WINDOW: int = 3600  # segundos de histórico usados na fila justa
+    # Migrações pequenas (ou ainda sem nenhuma foto) têm peso maior na fila
+    SCHEDULER_SMALL_MIGRATION_PHOTOS: int = 500
+    SCHEDULER_SMALL_MIGRATION_WEIGHT: float = 4.0
+    
+    # Limite de banda (bytes/s; 0 = sem limite), dividido igualmente entre as
+    # transferências ativas. Os limites do host são compartilhados via Redis
+    # por todos os processos da mesma máquina
+    BANDWIDTH_DOWNLOAD_LIMIT: int = 0
+    BANDWIDTH_UPLOAD_LIMIT: int = 0
+    BANDWIDTH_HOST_DOWNLOAD_LIMIT: int = 0
+    BANDWIDTH_HOST_UPLOAD_LIMIT: int = 0
+    BANDWIDTH_BURST_SECONDS: float = 1.0  # segundos de tráfego liberados sem espera
+    
+    # Spool em disco entre download e upload (por processo; 0 = desabilitado)
+    SPOOL_DIR: Optional[str] = None  # Padrão: <tmp>/cloud-migrate-spool
+    SPOOL_MAX_BYTES: int = 1024 * 1024 * 1024
+    SPOOL_PREFETCH_ITEMS: int = 4  # itens baixados à frente do upload
+    
+    # iCloud - threads dedicados para I/O bloqueante do pyicloud
+    # (cada usuário é fixado em um único thread)
+    ICLOUD_IO_WORKERS: int = 8
+    # Recursos transferidos junto com o original de cada foto, separados por
+    # vírgula: "live_video" (vídeo das Live Photos) e/ou "edited" (versão
+    # editada). Substituível por migração com options {"resources": [...]}
+    ICLOUD_EXTRA_RESOURCES: str = "live_video"
+    
+    # Métricas Prometheus: GET /metrics na API e exportador HTTP nos workers
+    METRICS_ENABLED: bool = True
+    METRICS_TOKEN: Optional[str] = None  # Exigido em "Authorization: Bearer <token>"; sem ele, /metrics responde 404
+    # Porta base do exportador dos workers (somada ao índice do processo); 0 = desabilitado
+    METRICS_WORKER_PORT: int = 0
+    EVENT_LOOP_LAG_INTERVAL: float = 1.0  # segundos entre medições do atraso do event loop
+    
+    # Profiler por migração (options {"profile": true} ou endpoint admin)
+    PROFILE_DIR: str = "./profiles"  # Onde os artefatos são gravados
+    PROFILE_DEFAULT_SECONDS: int = 60
+    PROFILE_MAX_SECONDS: int = 300
+    PROFILE_SAMPLE_INTERVAL: float = 0.01  # segundos entre amostras de stack
+    
+    # Token dos endpoints administrativos (/admin); vazio = desabilitados
+    ADMIN_TOKEN: Optional[str] = None
+    
+    # Instrumentação: intervalo (segundos) do resumo JSON dos tempos por
+    # etapa nos logs do worker; 0 = desabilitado
+    METRICS_SUMMARY_INTERVAL: int = 60
+    
+    # Verificação de integridade: novas transferências de um arquivo cujo
+    # md5Checksum no destino diverge do calculado durante o envio
+    TRANSFER_CHECKSUM_RETRIES: int = 2
+    # Novos envios de um item após erros transitórios (rede, 429, 5xx), com
+    # backoff exponencial, reenviando os bytes já baixados
+    TRANSFER_UPLOAD_RETRIES: int = 3
+    TRANSFER_RETRY_BACKOFF: float = 1.0  # segundos
+    TRANSFER_RETRY_MAX_BACKOFF: float = 30.0  # segundos
+    # Itens até este tamanho (fora do spool) ficam em memória para novos envios
+    TRANSFER_MEMORY_RETAIN_BYTES: int = 8 * 1024 * 1024
+    
+    # Importação de exportações locais do iCloud (pasta ou arquivos .zip).
+    # Caminhos informados nas migrações devem estar dentro deste diretório;
+    # vazio = importação local desabilitada
+    LOCAL_EXPORT_ROOT: Optional[str] = None
+    LOCAL_EXPORT_MMAP_THRESHOLD: int = 8 * 1024 * 1024  # bytes; arquivos maiores usam mmap
     
     # CORS - aceita string separada por vírgulas ou lista
     ALLOWED_ORIGINS: Union[str, list[str]] = "http://localhost:3000,http://localhost:3001"
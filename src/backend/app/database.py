@@ -1,7 +1,10 @@
 """Database configuration and session management."""
+import os
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 from app.config import settings
 
 # Normalize database URL to use psycopg3 if PostgreSQL
@@ -14,16 +17,202 @@ def normalize_database_url(url: str) -> str:
             url = url.replace("postgres://", "postgresql+psycopg://", 1)
     return url
 
-# Create engine
+
+def normalize_async_database_url(url: str) -> str:
+    """Normalize database URL to an asyncio driver (aiosqlite / psycopg3 async)."""
+    url = normalize_database_url(url)
+    if url.startswith("sqlite://"):
+        url = url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    elif url.startswith("postgresql+psycopg2://"):
+        url = url.replace("postgresql+psycopg2://", "postgresql+psycopg://", 1)
+    return url
+
+# Pool profiles per process role.
+# - api: request handlers, many short concurrent checkouts (asyncio engine)
+# - api_sync: the API's synchronous engine, used only by the routes that
+#   still need a sync Session (credentials and OAuth callback, which refresh
+#   Google tokens through CredentialService; the QStash webhook, which runs
+#   the worker code) and the outbox flush. Together with "api" it stays
+#   within the 20 connections the API process had before the async engine.
+# - worker: Celery processes, one long migration per process
+# - serverless: no pooling, connections are closed after each checkout
+#   (Vercel instances are frozen between invocations)
+POOL_PROFILES = {
+    "api": {"pool_size": 8, "max_overflow": 7},
+    "api_sync": {"pool_size": 3, "max_overflow": 2},
+    "worker": {"pool_size": 2, "max_overflow": 2},
+    "serverless": {"poolclass": NullPool},
+}
+
 database_url = normalize_database_url(settings.DATABASE_URL)
-engine = create_engine(
-    database_url,
-    connect_args={"check_same_thread": False} if "sqlite" in database_url else {},
-    echo=settings.DEBUG,
-)
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+_engines: dict[str, Engine] = {}
+_sessionmakers: dict[str, sessionmaker] = {}
+_async_engines: dict = {}
+_async_sessionmakers: dict = {}
+
+
+def resolve_pool_profile(role: str) -> str:
+    """
+    Resolve the pool profile for a process role.
+    
+    DB_POOL_PROFILE forces a profile for every engine of the process;
+    with "auto", API engines on Vercel use the serverless profile and every
+    other role uses the profile of the same name.
+    """
+    if settings.DB_POOL_PROFILE != "auto":
+        return settings.DB_POOL_PROFILE
+    if role == "api" and os.getenv("VERCEL"):
+        return "serverless"
+    return role
+
+
+def _engine_options(role: str, url: str, is_async: bool = False) -> dict:
+    """
+    Build create_engine options for a role's pool profile.
+    
+    A synchronous engine uses the "<profile>_sync" profile when there is
+    one. DB_POOL_SIZE and DB_MAX_OVERFLOW only override the main profile.
+    """
+    profile = resolve_pool_profile(role)
+    if profile not in POOL_PROFILES:
+        raise ValueError(f"Perfil de pool desconhecido: {profile}")
+    split_profile = None if is_async else f"{profile}_sync"
+    if split_profile not in POOL_PROFILES:
+        split_profile = None
+    
+    options = {
+        "echo": settings.DB_ECHO,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    
+    if "sqlite" in url:
+        # SQLite uses SQLAlchemy's default pool; sizing does not apply
+        options["connect_args"] = {"check_same_thread": False}
+    else:
+        pool_options = dict(POOL_PROFILES[split_profile or profile])
+        if pool_options.get("poolclass") is not NullPool:
+            pool_options["poolclass"] = AsyncAdaptedQueuePool if is_async else QueuePool
+            if settings.DB_POOL_SIZE is not None and split_profile is None:
+                pool_options["pool_size"] = settings.DB_POOL_SIZE
+            if settings.DB_MAX_OVERFLOW is not None and split_profile is None:
+                pool_options["max_overflow"] = settings.DB_MAX_OVERFLOW
+            pool_options["pool_timeout"] = settings.DB_POOL_TIMEOUT
+            pool_options["pool_recycle"] = settings.DB_POOL_RECYCLE
+        options.update(pool_options)
+    
+    return options
+
+
+def build_engine(role: str = "api") -> Engine:
+    """
+    Create an engine configured with the pool profile for a role.
+    
+    Args:
+        role: Process role ("api" or "worker")
+        
+    Returns:
+        New SQLAlchemy engine
+    """
+    return create_engine(database_url, **_engine_options(role, database_url))
+
+
+def get_engine(role: str = "api") -> Engine:
+    """Get the shared engine for a role, creating it on first use."""
+    if role not in _engines:
+        _engines[role] = build_engine(role)
+    return _engines[role]
+
+
+def get_sessionmaker(role: str = "api") -> sessionmaker:
+    """Get the session factory bound to the engine of a role."""
+    if role not in _sessionmakers:
+        _sessionmakers[role] = sessionmaker(autocommit=False, autoflush=False, bind=get_engine(role))
+    return _sessionmakers[role]
+
+
+def get_async_engine(role: str = "api"):
+    """
+    Get the shared asyncio engine for a role, creating it on first use.
+    
+    Used by the API request handlers so database calls do not block the
+    event loop. Workers keep using the synchronous engine.
+    """
+    if role not in _async_engines:
+        from sqlalchemy.ext.asyncio import create_async_engine
+        
+        url = normalize_async_database_url(settings.DATABASE_URL)
+        _async_engines[role] = create_async_engine(url, **_engine_options(role, url, is_async=True))
+    return _async_engines[role]
+
+
+def get_async_sessionmaker(role: str = "api"):
+    """Get the AsyncSession factory bound to the asyncio engine of a role."""
+    if role not in _async_sessionmakers:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+        
+        _async_sessionmakers[role] = async_sessionmaker(
+            bind=get_async_engine(role),
+            autoflush=False,
+            expire_on_commit=False,
+        )
+    return _async_sessionmakers[role]
+
+
+def dispose_engines(close: bool = True) -> None:
+    """
+    Dispose the pools of all engines.
+    
+    Call with close=False right after fork() so the child does not reuse
+    connections opened by the parent.
+    """
+    for engine_ in _engines.values():
+        engine_.dispose(close=close)
+
+
+def get_pool_status() -> dict:
+    """
+    Get connection pool usage for every engine of this process.
+    
+    Returns:
+        Dictionary keyed by role with profile and pool counters
+    """
+    engines = [(role, role, e) for role, e in _engines.items()]
+    engines += [(f"{role}_async", role, e.sync_engine) for role, e in _async_engines.items()]
+    
+    status = {}
+    for key, role, engine_ in engines:
+        pool = engine_.pool
+        profile = resolve_pool_profile(role)
+        if not key.endswith("_async") and f"{profile}_sync" in POOL_PROFILES:
+            profile = f"{profile}_sync"
+        entry = {"profile": profile, "pool": type(pool).__name__}
+        # AsyncAdaptedQueuePool is a QueuePool subclass
+        if isinstance(pool, QueuePool):
+            entry.update({
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+            })
+        status[key] = entry
+    return status
+
+
+def __getattr__(name: str):
+    """
+    Create the API engine (``engine``) and session factory (``SessionLocal``)
+    on first access.
+    
+    Importing this module (for Base, from a Celery worker) does not create
+    an api-sized pool next to the worker one.
+    """
+    if name == "engine":
+        return get_engine("api")
+    if name == "SessionLocal":
+        return get_sessionmaker("api")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # Base class for models
 Base = declarative_base()
@@ -31,19 +220,21 @@ Base = declarative_base()
 
 def get_db():
     """Dependency for getting database session."""
-    db = SessionLocal()
+    db = get_sessionmaker("api")()
     try:
         yield db
     finally:
         db.close()
 
 
-def init_db():
-    """Initialize database tables."""
-    Base.metadata.create_all(bind=engine)
-
-
-
-
+async def get_async_db():
+    """Dependency for getting an async database session."""
+    async with get_async_sessionmaker("api")() as db:
+        yield db
 
 
+def init_db():
+    """Initialize database tables."""
+    # Registra todos os modelos no metadata (init_db.py não importa a API)
+    import app.models  # noqa: F401
+    Base.metadata.create_all(bind=get_engine("api"))
@@ -0,0 +1,14 @@
+"""Metrics and timing instrumentation."""
+from app.instrumentation.metrics import Counter, Gauge, Histogram, Registry, REGISTRY
+from app.instrumentation.stages import time_stage, observe_stage, maybe_log_summary
+
+__all__ = [
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "Registry",
+    "REGISTRY",
+    "time_stage",
+    "observe_stage",
+    "maybe_log_summary",
+]
@@ -0,0 +1,127 @@
+"""Application metrics exported by the API and the workers."""
+import asyncio
+import time
+from urllib.parse import urlsplit
+from app.instrumentation.metrics import REGISTRY, Counter, Gauge, Histogram
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "API request latency in seconds by route template",
+    ("method", "route", "status"),
+)
+
+MIGRATIONS_BY_STATUS = Gauge(
+    "migrations",
+    "Migrations in the database by status",
+    ("status",),
+)
+
+MIGRATIONS_FINISHED = Counter(
+    "migrations_finished_total",
+    "Migration runs finished by this process, by outcome",
+    ("outcome",),
+)
+
+ITEMS_TRANSFERRED = Counter(
+    "migration_items_total",
+    "Items processed by the transfer loop, by result",
+    ("result",),
+)
+
+BYTES_TRANSFERRED = Counter(
+    "migration_bytes_transferred_total",
+    "Bytes uploaded to the destination",
+)
+
+UPLOAD_RETRIES = Counter(
+    "migration_upload_retries_total",
+    "Item uploads retried from the retained payload, by reason",
+    ("reason",),
+)
+
+BANDWIDTH_WAIT_SECONDS = Counter(
+    "bandwidth_wait_seconds_total",
+    "Time transfers were paced by the bandwidth governor, by direction",
+    ("direction",),
+)
+
+EXTERNAL_CALL_SECONDS = Histogram(
+    "external_api_call_duration_seconds",
+    "Latency of calls to external APIs (Google Drive, iCloud, QStash)",
+    ("service", "operation", "status"),
+)
+
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Database connection pool usage by engine",
+    ("engine", "state"),
+)
+
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "event_loop_lag_seconds",
+    "Delay between when a loop callback was due and when it ran",
+    ("loop",),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+
+def observe_external_call(service: str, operation: str, status: str, seconds: float) -> None:
+    """Record the latency and outcome of an external API call."""
+    EXTERNAL_CALL_SECONDS.observe(seconds, service=service, operation=operation, status=status)
+
+
+def httpx_event_hooks(service: str) -> dict:
+    """
+    Event hooks that time every request of an httpx.AsyncClient.
+    
+    The operation label is the method and the first path segments (IDs are
+    left out to keep the label cardinality bounded); the status label is
+    the HTTP status code.
+    
+    Usage:
+        httpx.AsyncClient(event_hooks=httpx_event_hooks("google_drive"))
+    """
+    async def on_request(request):
+        request.extensions["metrics_start"] = time.perf_counter()
+    
+    async def on_response(response):
+        request = response.request
+        start = request.extensions.get("metrics_start")
+        if start is None:
+            return
+        segments = [s for s in urlsplit(str(request.url)).path.split("/") if s]
+        operation = f"{request.method} /" + "/".join(segments[:3])
+        observe_external_call(service, operation, str(response.status_code), time.perf_counter() - start)
+    
+    return {"request": [on_request], "response": [on_response]}
+
+
+def _collect_pool_usage() -> None:
+    """Refresh the connection pool gauges from get_pool_status."""
+    from app.database import get_pool_status
+    
+    for engine_name, entry in get_pool_status().items():
+        for state in ("size", "checked_in", "checked_out", "overflow"):
+            if state in entry:
+                DB_POOL_CONNECTIONS.set(entry[state], engine=engine_name, state=state)
+
+
+REGISTRY.add_collector(_collect_pool_usage)
+
+
+async def monitor_event_loop_lag(name: str, interval: float) -> None:
+    """
+    Measure event loop lag until cancelled.
+    
+    Sleeps for interval seconds and records how late the wake-up was; a busy
+    or blocked loop wakes up late.
+    
+    Args:
+        name: Loop label (e.g. "api", "worker")
+        interval: Seconds between samples
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        due = loop.time() + interval
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG_SECONDS.observe(max(0.0, loop.time() - due), loop=name)
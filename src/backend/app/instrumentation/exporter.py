@@ -0,0 +1,68 @@
+"""Prometheus exporter for worker processes."""
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from app.instrumentation.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_server: Optional[ThreadingHTTPServer] = None
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Serve GET /metrics."""
+    
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would flood the worker logs
+        pass
+
+
+def start_exporter(port: int, host: str = "0.0.0.0") -> Optional[ThreadingHTTPServer]:
+    """
+    Serve this process' metrics on a background thread.
+    
+    Args:
+        port: TCP port
+        host: Bind address
+    
+    Returns:
+        The server, or None if the port could not be bound
+    """
+    global _server
+    if _server is not None:
+        return _server
+    
+    try:
+        _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logger.warning(f"Could not start metrics exporter on port {port}: {e}")
+        return None
+    
+    _server.daemon_threads = True
+    thread = threading.Thread(target=_server.serve_forever, name="metrics-exporter", daemon=True)
+    thread.start()
+    logger.info(f"Metrics exporter listening on {host}:{port}")
+    return _server
+
+
+def stop_exporter() -> None:
+    """Stop the exporter started by start_exporter."""
+    global _server
+    if _server is not None:
+        _server.shutdown()
+        _server.server_close()
+        _server = None
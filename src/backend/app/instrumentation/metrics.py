@@ -0,0 +1,287 @@
+"""
+Lightweight in-process metrics.
+
+Counters, gauges and histograms with labels, rendered in the Prometheus text
+exposition format or as a JSON-friendly snapshot. Updates take a lock and a
+dictionary lookup, so they are cheap enough for per-photo hot paths.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; covers fast API calls up to multi-minute video transfers
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the text format."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """Render a label set as {a="1",b="2"}."""
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value."""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Registry:
+    """A set of metrics rendered together."""
+    
+    def __init__(self):
+        self._metrics: Dict[str, "Metric"] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+    
+    def register(self, metric: "Metric") -> None:
+        """Register a metric (a metric with the same name is replaced)."""
+        with self._lock:
+            self._metrics[metric.name] = metric
+    
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """
+        Register a callback that refreshes gauges right before rendering.
+        
+        Used for values that are cheaper to read on scrape than to track
+        continuously (e.g. connection pool usage).
+        """
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+    
+    def _collect(self) -> List["Metric"]:
+        """Run collectors and return the registered metrics."""
+        with self._lock:
+            collectors = list(self._collectors)
+        for collector in collectors:
+            try:
+                collector()
+            except Exception:
+                # A failing collector must not break the whole scrape
+                pass
+        with self._lock:
+            return list(self._metrics.values())
+    
+    def get(self, name: str) -> Optional["Metric"]:
+        """Get a registered metric by name."""
+        return self._metrics.get(name)
+    
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text format."""
+        metrics = self._collect()
+        return "".join(metric.render() for metric in metrics)
+    
+    def snapshot(self) -> Dict[str, Dict]:
+        """Return all metrics as plain dictionaries."""
+        metrics = self._collect()
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+
+REGISTRY = Registry()
+
+
+class Metric:
+    """Base class for labelled metrics."""
+    type = "untyped"
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: Optional[Registry] = REGISTRY,
+    ):
+        """
+        Initialize metric.
+        
+        Args:
+            name: Metric name
+            documentation: Help text
+            labelnames: Label names
+            registry: Registry to add the metric to (None to keep it unregistered)
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+        if registry is not None:
+            registry.register(self)
+    
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        """Label values in declaration order."""
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+    
+    def _header(self) -> str:
+        """HELP and TYPE lines."""
+        return f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.type}\n"
+    
+    def _label_dict(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        """Label values as a dictionary."""
+        return dict(zip(self.labelnames, key))
+    
+    def clear(self) -> None:
+        """Drop all recorded samples."""
+        with self._lock:
+            self._values.clear()
+    
+    def render(self) -> str:
+        """Render in the Prometheus text format."""
+        raise NotImplementedError
+    
+    def snapshot(self) -> Dict:
+        """Return samples as a dictionary."""
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """Monotonically increasing value."""
+    type = "counter"
+    
+    def inc(self, amount: float = 1, **labels) -> None:
+        """Increment the counter."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def render(self) -> str:
+        with self._lock:
+            items = list(self._values.items())
+        lines = [self._header()]
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}\n")
+        return "".join(lines)
+    
+    def snapshot(self) -> Dict:
+        with self._lock:
+            items = list(self._values.items())
+        return {"type": self.type, "samples": [
+            {"labels": self._label_dict(key), "value": value} for key, value in items
+        ]}
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+    type = "gauge"
+    
+    def set(self, value: float, **labels) -> None:
+        """Set the gauge."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+    
+    def dec(self, amount: float = 1, **labels) -> None:
+        """Decrement the gauge."""
+        self.inc(-amount, **labels)
+
+
+class _HistogramValue:
+    """Bucket counts, sum and max for one label set."""
+    __slots__ = ("counts", "sum", "count", "max")
+    
+    def __init__(self, buckets: int):
+        self.counts = [0] * buckets
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+
+class Histogram(Metric):
+    """Distribution of observed values in fixed buckets."""
+    type = "histogram"
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        registry: Optional[Registry] = REGISTRY,
+    ):
+        """
+        Initialize histogram.
+        
+        Args:
+            name: Metric name
+            documentation: Help text
+            labelnames: Label names
+            buckets: Upper bounds of the buckets (+Inf is added automatically)
+            registry: Registry to add the metric to
+        """
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+    
+    def observe(self, value: float, **labels) -> None:
+        """Record an observation."""
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            sample = self._values.get(key)
+            if sample is None:
+                sample = self._values[key] = _HistogramValue(len(self.buckets))
+            sample.counts[index] += 1
+            sample.sum += value
+            sample.count += 1
+            if value > sample.max:
+                sample.max = value
+    
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the duration of a block in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+    
+    def _quantile(self, sample: _HistogramValue, q: float) -> float:
+        """Estimate a quantile from the buckets (upper bound of its bucket)."""
+        target = q * sample.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, sample.counts):
+            cumulative += count
+            if cumulative >= target:
+                return min(bound, sample.max)
+        return sample.max
+    
+    def render(self) -> str:
+        with self._lock:
+            items = [(key, list(v.counts), v.sum, v.count) for key, v in self._values.items()]
+        lines = [self._header()]
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}\n")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}\n")
+            lines.append(f"{self.name}_count{labels} {count}\n")
+        return "".join(lines)
+    
+    def snapshot(self) -> Dict:
+        with self._lock:
+            items = list(self._values.items())
+            samples = [
+                {
+                    "labels": self._label_dict(key),
+                    "count": v.count,
+                    "sum": round(v.sum, 6),
+                    "avg": round(v.sum / v.count, 6) if v.count else 0.0,
+                    "p50": self._quantile(v, 0.5),
+                    "p95": self._quantile(v, 0.95),
+                    "max": round(v.max, 6),
+                }
+                for key, v in items
+            ]
+        return {"type": self.type, "samples": samples}
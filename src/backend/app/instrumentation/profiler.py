@@ -0,0 +1,284 @@
+"""
+Opt-in sampling profiler for live migrations.
+
+A profiling window is requested per migration through its options
+(``{"profile": true}`` or ``{"profile": {"seconds": 60}}``) or with the
+admin endpoint. The worker running the migration then samples the stacks of
+all its threads and dumps its asyncio tasks for a bounded window, and writes
+the result to PROFILE_DIR. The worker stores ``handled_at`` in the request
+when it picks it up, so each request opens one window even though the
+migration runs as several work units:
+
+- ``migration-<id>-<timestamp>.json``: metadata, CPU/wall time, hottest
+  stacks and task dumps
+- ``migration-<id>-<timestamp>.folded``: collapsed stacks, loadable in
+  speedscope or flamegraph.pl
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_STACK_DEPTH = 64
+TOP_STACKS = 50
+
+# One profiling window per process at a time
+_active_lock = threading.Lock()
+_active: Optional["ProfileSession"] = None
+
+
+def normalize_profile_request(value) -> Optional[dict]:
+    """
+    Normalize a profile request from migration options.
+    
+    Args:
+        value: True, a number of seconds, or a dict with "seconds"
+    
+    Returns:
+        {"seconds": int, "requested_at": iso or None, "handled_at": iso or None}
+        or None if not requested
+    
+    Raises:
+        ValueError: If the value is not valid
+    """
+    if not value:
+        return None
+    
+    requested_at = handled_at = None
+    if value is True:
+        seconds = settings.PROFILE_DEFAULT_SECONDS
+    elif isinstance(value, (int, float)):
+        seconds = value
+    elif isinstance(value, dict):
+        seconds = value.get("seconds", settings.PROFILE_DEFAULT_SECONDS)
+        requested_at = value.get("requested_at")
+        handled_at = value.get("handled_at")
+    else:
+        raise ValueError("Opção 'profile' inválida.")
+    
+    try:
+        seconds = int(seconds)
+    except (TypeError, ValueError):
+        raise ValueError("Opção 'profile.seconds' inválida.")
+    
+    return {
+        "seconds": max(1, min(seconds, settings.PROFILE_MAX_SECONDS)),
+        "requested_at": requested_at,
+        "handled_at": handled_at,
+    }
+
+
+def _frame_label(frame) -> str:
+    """Label a stack frame as function (file:line of the definition)."""
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def dump_tasks() -> List[Dict]:
+    """
+    Describe the asyncio tasks of the running loop.
+    
+    Must be called from the loop thread.
+    """
+    tasks = []
+    for task in asyncio.all_tasks():
+        coro = task.get_coro()
+        tasks.append({
+            "name": task.get_name(),
+            "coro": getattr(coro, "__qualname__", repr(coro)),
+            "done": task.done(),
+            "stack": [_frame_label(f) for f in task.get_stack(limit=MAX_STACK_DEPTH)],
+        })
+    return tasks
+
+
+class ProfileSession:
+    """A bounded profiling window for one migration."""
+    
+    def __init__(self, migration_id: int, seconds: int, interval: float):
+        """
+        Initialize session.
+        
+        Args:
+            migration_id: Migration being profiled
+            seconds: Length of the window
+            interval: Seconds between stack samples
+        """
+        self.migration_id = migration_id
+        self.seconds = seconds
+        self.interval = interval
+        self.started_at = datetime.now(timezone.utc)
+        self._start_monotonic = time.monotonic()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.task_dumps: List[Dict] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._dump_task: Optional[asyncio.Task] = None
+    
+    def start(self) -> None:
+        """Start sampling (called from the event loop running the migration)."""
+        self._thread = threading.Thread(
+            target=self._run, name=f"profiler-{self.migration_id}", daemon=True
+        )
+        self._thread.start()
+        self._dump_task = asyncio.get_running_loop().create_task(self._dump_periodically())
+    
+    def stop(self) -> None:
+        """End the window early."""
+        self._stop.set()
+    
+    async def _dump_periodically(self) -> None:
+        """Dump asyncio tasks a few times during the window."""
+        interval = max(1.0, self.seconds / 5)
+        while not self._stop.is_set():
+            self.task_dumps.append({
+                "at": round(time.monotonic() - self._start_monotonic, 3),
+                "tasks": dump_tasks(),
+            })
+            await asyncio.sleep(interval)
+    
+    def _sample(self, own_ident: int) -> None:
+        """Record the current stack of every other thread."""
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+    
+    def _run(self) -> None:
+        """Sampling thread: sample until the window ends, then write the artifact."""
+        global _active
+        own_ident = threading.get_ident()
+        cpu_start = time.process_time()
+        deadline = self._start_monotonic + self.seconds
+        
+        try:
+            while not self._stop.is_set() and time.monotonic() < deadline:
+                self._sample(own_ident)
+                self._stop.wait(self.interval)
+            self._stop.set()
+            
+            wall = time.monotonic() - self._start_monotonic
+            cpu = time.process_time() - cpu_start
+            self._write(wall, cpu)
+        except Exception as e:
+            logger.error(f"Profiling of migration {self.migration_id} failed: {str(e)}")
+        finally:
+            with _active_lock:
+                if _active is self:
+                    _active = None
+    
+    def _write(self, wall: float, cpu: float) -> None:
+        """Write the JSON and folded-stack artifacts."""
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        stamp = self.started_at.strftime("%Y%m%dT%H%M%S")
+        base = os.path.join(settings.PROFILE_DIR, f"migration-{self.migration_id}-{stamp}")
+        
+        with open(f"{base}.folded", "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        
+        artifact = {
+            "migration_id": self.migration_id,
+            "pid": os.getpid(),
+            "started_at": self.started_at.isoformat(),
+            "wall_seconds": round(wall, 3),
+            # Process CPU time over wall time: close to 1.0 (or more, with
+            # several busy threads) means CPU-bound, close to 0 means waiting on I/O
+            "cpu_seconds": round(cpu, 3),
+            "cpu_ratio": round(cpu / wall, 3) if wall else 0.0,
+            "sample_interval": self.interval,
+            "samples": self.samples,
+            "top_stacks": [
+                {"stack": stack.split(";"), "count": count}
+                for stack, count in self.stacks.most_common(TOP_STACKS)
+            ],
+            "task_dumps": self.task_dumps,
+            "folded": os.path.basename(f"{base}.folded"),
+        }
+        with open(f"{base}.json", "w") as f:
+            json.dump(artifact, f, indent=2)
+        
+        logger.info(f"Profile of migration {self.migration_id} written to {base}.json")
+
+
+class MigrationProfiler:
+    """
+    Starts profiling windows for a migration when its options request one.
+    
+    The transfer loop calls check() every time it refreshes the migration,
+    so a request made while the migration runs is picked up within one item.
+    A profiler lives for one work unit; the caller persists the request that
+    check() returns (with ``handled_at``) so later units skip it.
+    """
+    
+    def __init__(self, migration_id: int):
+        """Initialize profiler for a migration."""
+        self.migration_id = migration_id
+        self._handled: Optional[str] = None
+        self._session: Optional[ProfileSession] = None
+    
+    def check(self, options: Optional[dict]) -> Optional[dict]:
+        """
+        Start a window if a new profile request is present.
+        
+        Returns:
+            The request, to be stored with ``handled_at``, when it was
+            handled now (started, or skipped because another migration is
+            being profiled); None otherwise
+        """
+        global _active
+        request = (options or {}).get("profile")
+        if not request:
+            return None
+        
+        try:
+            request = normalize_profile_request(request)
+        except ValueError:
+            return None
+        
+        # Handled by an earlier work unit
+        if request["handled_at"]:
+            return None
+        
+        # Requests set at creation have no timestamp and run once
+        requested_at = request["requested_at"] or "initial"
+        if requested_at == self._handled:
+            return None
+        self._handled = requested_at
+        
+        with _active_lock:
+            if _active is not None:
+                logger.warning(
+                    f"Profile of migration {self.migration_id} skipped: "
+                    f"migration {_active.migration_id} is already being profiled"
+                )
+                return request
+            session = ProfileSession(self.migration_id, request["seconds"], settings.PROFILE_SAMPLE_INTERVAL)
+            _active = session
+        
+        logger.info(f"Profiling migration {self.migration_id} for {request['seconds']}s")
+        self._session = session
+        session.start()
+        return request
+    
+    def stop(self) -> None:
+        """End a running window early (e.g. when the migration finishes)."""
+        if self._session is not None:
+            self._session.stop()
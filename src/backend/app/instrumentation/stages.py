@@ -0,0 +1,107 @@
+"""Per-stage timing of the migration worker."""
+import json
+import logging
+import threading
+import time
+from typing import AsyncIterator, ContextManager
+from app.config import settings
+from app.instrumentation.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Stages of the transfer path
+LOGIN = "login"
+ENUMERATE = "enumerate"
+METADATA = "metadata"
+DOWNLOAD = "download"
+UPLOAD = "upload"
+DB_FLUSH = "db_flush"
+TOKEN_REFRESH = "token_refresh"
+
+STAGE_SECONDS = Histogram(
+    "migration_stage_duration_seconds",
+    "Duration of migration worker stages in seconds",
+    ("stage",),
+)
+
+
+def time_stage(stage: str) -> ContextManager[None]:
+    """
+    Time a block of the transfer path.
+    
+    Usage:
+        with time_stage(DB_FLUSH):
+            db.commit()
+    """
+    return STAGE_SECONDS.time(stage=stage)
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    """Record a duration measured elsewhere."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+
+
+class TimedStream:
+    """
+    Wrap a chunk stream, accumulating the time spent waiting for chunks.
+    
+    When a download is streamed into an upload, this separates the time
+    spent reading the source from the time spent sending.
+    """
+    
+    def __init__(self, stream: AsyncIterator[bytes]):
+        """
+        Initialize wrapper.
+        
+        Args:
+            stream: Chunk stream to wrap
+        """
+        self._stream = stream
+        self.seconds = 0.0
+    
+    def __aiter__(self) -> "TimedStream":
+        return self
+    
+    async def __anext__(self) -> bytes:
+        start = time.perf_counter()
+        try:
+            return await self._stream.__anext__()
+        finally:
+            self.seconds += time.perf_counter() - start
+    
+    async def aclose(self) -> None:
+        """Close the wrapped stream."""
+        aclose = getattr(self._stream, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+_last_summary = time.monotonic()
+_summary_lock = threading.Lock()
+
+
+def maybe_log_summary(force: bool = False) -> None:
+    """
+    Log the stage histograms as one JSON line, at most every
+    METRICS_SUMMARY_INTERVAL seconds.
+    
+    Args:
+        force: Log even if the interval has not elapsed (e.g. when a
+            migration completes)
+    """
+    global _last_summary
+    interval = settings.METRICS_SUMMARY_INTERVAL
+    if interval <= 0:
+        return
+    
+    now = time.monotonic()
+    with _summary_lock:
+        if not force and now - _last_summary < interval:
+            return
+        _last_summary = now
+    
+    summary = {
+        sample["labels"]["stage"]: {k: v for k, v in sample.items() if k != "labels"}
+        for sample in STAGE_SECONDS.snapshot()["samples"]
+    }
+    logger.info("migration_stage_summary %s", json.dumps(summary, sort_keys=True))
@@ -1,15 +1,54 @@
 """Main FastAPI application."""
+import asyncio
 import logging
-from fastapi import FastAPI
+from contextlib import asynccontextmanager, suppress
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.config import settings
-from app.database import init_db
-from app.api.routes import auth, credentials, migrations, webhooks
+from app.api.dependencies import require_metrics_token
+from app.api.routes import admin, auth, credentials, migrations, webhooks
+from app.instrumentation.middleware import RequestMetricsMiddleware
 
 logger = logging.getLogger(__name__)
 
-# Initialize database
-init_db()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Application startup and shutdown.
+    
+    Nothing here runs at import time, so serverless cold starts only pay for
+    importing the app. Schema creation is an explicit step (python init_db.py)
+    and only runs on startup in development or when DB_AUTO_CREATE_SCHEMA is set.
+    """
+    auto_create = settings.DB_AUTO_CREATE_SCHEMA
+    if auto_create is None:
+        auto_create = settings.ENVIRONMENT == "development"
+    
+    if auto_create:
+        from app.database import init_db
+        init_db()
+        logger.info("Database schema created")
+    
+    lag_monitor = None
+    if settings.METRICS_ENABLED:
+        from app.instrumentation.collectors import monitor_event_loop_lag
+        lag_monitor = asyncio.create_task(
+            monitor_event_loop_lag("api", settings.EVENT_LOOP_LAG_INTERVAL)
+        )
+    
+    yield
+    
+    if lag_monitor is not None:
+        lag_monitor.cancel()
+        with suppress(asyncio.CancelledError):
+            await lag_monitor
+    
+    if settings.QSTASH_TOKEN:
+        from app.services.qstash_service import get_qstash_service
+        await get_qstash_service().aclose()
+
 
 # Create FastAPI app
 app = FastAPI(
@@ -18,6 +57,7 @@ app = FastAPI(
     description="API for migrating photos from iCloud to Google Drive",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 # CORS middleware
@@ -29,24 +69,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.METRICS_ENABLED:
+    app.add_middleware(RequestMetricsMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix=settings.API_V1_PREFIX)
 app.include_router(credentials.router, prefix=settings.API_V1_PREFIX)
 app.include_router(migrations.router, prefix=settings.API_V1_PREFIX)
 app.include_router(webhooks.router, prefix=settings.API_V1_PREFIX)
-
-# Configure QStash webhook URL if QStash is enabled
-if settings.QSTASH_TOKEN:
-    try:
-        from app.services.qstash_service import get_qstash_service
-        # Determine base URL from environment or use default
-        import os
-        base_url = os.getenv("BASE_URL") or os.getenv("RENDER_EXTERNAL_URL") or "http://localhost:8000"
-        qstash_service = get_qstash_service()
-        qstash_service.set_webhook_url(base_url)
-        logger.info(f"QStash webhook URL configured: {qstash_service.webhook_url}")
-    except Exception as e:
-        logger.warning(f"Failed to configure QStash: {str(e)}")
+app.include_router(admin.router, prefix=settings.API_V1_PREFIX)
 
 
 @app.get("/")
@@ -65,11 +96,25 @@ async def health():
     return {"status": "healthy"}
 
 
-# For Vercel serverless
-app = app
-
-
-
-
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_metrics_token)])
+async def metrics():
+    """Prometheus metrics for this API process (requires METRICS_TOKEN)."""
+    from app.database import get_async_sessionmaker
+    from app.instrumentation.collectors import MIGRATIONS_BY_STATUS
+    from app.instrumentation.exporter import CONTENT_TYPE
+    from app.instrumentation.metrics import REGISTRY
+    from app.repositories.migration_repository import AsyncMigrationRepository
+    
+    # Migration counts come from the database, so every API replica reports
+    # the same fleet-wide values
+    async with get_async_sessionmaker("api")() as db:
+        counts = await AsyncMigrationRepository(db).count_by_status()
+    MIGRATIONS_BY_STATUS.clear()
+    for migration_status, count in counts.items():
+        MIGRATIONS_BY_STATUS.set(count, status=migration_status)
+    
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
 
 
+# For Vercel serverless
+app = app
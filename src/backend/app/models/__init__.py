@@ -3,8 +3,10 @@ from app.models.user import User
 from app.models.credential import Credential
 from app.models.migration import Migration
 from app.models.migration_log import MigrationLog
+from app.models.failed_item import FailedItem
+from app.models.outbox_message import OutboxMessage
 
-__all__ = ["User", "Credential", "Migration", "MigrationLog"]
+__all__ = ["User", "Credential", "Migration", "MigrationLog", "FailedItem", "OutboxMessage"]
 
 
 
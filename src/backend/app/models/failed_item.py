@@ -0,0 +1,40 @@
+"""Failed item model."""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class FailedItem(Base):
+    """
+    Failed item model (dead-letter queue of a migration).
+    
+    One row per source item that could not be transferred, with enough of
+    the item to transfer it again without enumerating the library:
+    POST /migrations/{id}/retry-failed creates a migration covering only
+    these rows and links them through retried_migration_id.
+    """
+    
+    __tablename__ = "failed_items"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    migration_id = Column(Integer, ForeignKey("migrations.id", ondelete="CASCADE"), nullable=False, index=True)
+    item_id = Column(String, nullable=False)  # ID in the source (SourceItem.id)
+    filename = Column(String, nullable=False)
+    file_size = Column(Integer, nullable=True)
+    mime_type = Column(String, nullable=True)
+    error_class = Column(String, nullable=False)
+    error_message = Column(String, nullable=True)
+    attempts = Column(Integer, nullable=False, default=1)  # Including earlier migrations it was retried from
+    retried_migration_id = Column(Integer, ForeignKey("migrations.id", ondelete="SET NULL"), nullable=True, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Relationships
+    migration = relationship("Migration", back_populates="failed_items", foreign_keys=[migration_id])
+    
+    # Constraints
+    __table_args__ = (
+        UniqueConstraint("migration_id", "item_id", name="uq_failed_items_migration_item"),
+        {"sqlite_autoincrement": True},
+    )
@@ -1,5 +1,5 @@
 """Migration model."""
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, CheckConstraint
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, CheckConstraint, Index, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -19,11 +19,19 @@ class Migration(Base):
     started_at = Column(DateTime(timezone=True), nullable=True)
     completed_at = Column(DateTime(timezone=True), nullable=True)
     error_message = Column(String, nullable=True)
+    options = Column(JSON, nullable=True)  # e.g. {"source": "local_export", "export_path": "..."}
+    destination_folder_id = Column(String, nullable=True)  # Reused by every work unit
     created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     
     # Relationships
     user = relationship("User", back_populates="migrations")
     logs = relationship("MigrationLog", back_populates="migration", cascade="all, delete-orphan")
+    failed_items = relationship(
+        "FailedItem",
+        back_populates="migration",
+        cascade="all, delete-orphan",
+        foreign_keys="FailedItem.migration_id",
+    )
     
     # Constraints
     __table_args__ = (
@@ -31,6 +39,10 @@ class Migration(Base):
             "status IN ('pending', 'in_progress', 'completed', 'failed', 'paused')",
             name="check_migration_status"
         ),
+        # Listing a user's history (GET /migrations), with and without the
+        # status filter, ordered by created_at DESC, id DESC
+        Index("ix_migrations_user_created", "user_id", "created_at", "id"),
+        Index("ix_migrations_user_status_created", "user_id", "status", "created_at", "id"),
         {"sqlite_autoincrement": True},
     )
 
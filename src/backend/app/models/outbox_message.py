@@ -0,0 +1,63 @@
+"""Outbox message model."""
+import uuid
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, CheckConstraint, Index, JSON
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class OutboxMessage(Base):
+    """
+    Outbox message model.
+    
+    Background jobs are written to this table in the same transaction as the
+    migration change that requires them, and published later by the outbox
+    dispatcher. A job can therefore never be lost between the commit and the
+    publish.
+    
+    A dispatched message whose completed_at is still empty is a work unit in
+    flight: the fair scheduler uses it to cap concurrent work per user, and
+    the worker sets completed_at when the unit ends. Celery workers set
+    started_at when they pick a unit up, so a duplicate delivery is skipped.
+    """
+    
+    __tablename__ = "outbox_messages"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    migration_id = Column(Integer, ForeignKey("migrations.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(Integer, nullable=False)
+    task_type = Column(String, nullable=False, default="process_migration")
+    payload = Column(JSON, nullable=False)
+    deduplication_id = Column(String, nullable=False, unique=True)
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    dispatched_at = Column(DateTime(timezone=True), nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    
+    # Constraints
+    __table_args__ = (
+        CheckConstraint(
+            "status IN ('pending', 'dispatched', 'failed')",
+            name="check_outbox_status"
+        ),
+        Index("ix_outbox_messages_status_next_attempt", "status", "next_attempt_at"),
+        # In-flight and recently served work per user (fair scheduler)
+        Index("ix_outbox_messages_user_dispatched", "user_id", "dispatched_at"),
+        {"sqlite_autoincrement": True},
+    )
+    
+    @classmethod
+    def for_migration(cls, migration_id: int, user_id: int) -> "OutboxMessage":
+        """Build a process_migration message for a migration."""
+        return cls(
+            migration_id=migration_id,
+            user_id=user_id,
+            task_type="process_migration",
+            payload={"migration_id": migration_id, "user_id": user_id},
+            deduplication_id=f"migration-{migration_id}-{uuid.uuid4().hex}",
+            status="pending",
+            attempts=0,
+        )
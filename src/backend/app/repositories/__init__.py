@@ -1,12 +1,20 @@
 """Data access repositories."""
-from app.repositories.user_repository import UserRepository
-from app.repositories.credential_repository import CredentialRepository
-from app.repositories.migration_repository import MigrationRepository
+from app.repositories.user_repository import UserRepository, AsyncUserRepository
+from app.repositories.credential_repository import CredentialRepository, AsyncCredentialRepository
+from app.repositories.migration_repository import MigrationRepository, AsyncMigrationRepository
+from app.repositories.failed_item_repository import FailedItemRepository, AsyncFailedItemRepository
+from app.repositories.outbox_repository import OutboxRepository
 
 __all__ = [
     "UserRepository",
     "CredentialRepository",
     "MigrationRepository",
+    "AsyncUserRepository",
+    "AsyncCredentialRepository",
+    "AsyncMigrationRepository",
+    "FailedItemRepository",
+    "AsyncFailedItemRepository",
+    "OutboxRepository",
 ]
 
 
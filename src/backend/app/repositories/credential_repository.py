@@ -1,6 +1,8 @@
 """Credential repository."""
 from typing import Optional
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.credential import Credential
 
 
@@ -51,7 +53,48 @@ class CredentialRepository:
         return False
 
 
-
-
-
-
+class AsyncCredentialRepository:
+    """Repository for credential data access with an AsyncSession."""
+    
+    def __init__(self, db: AsyncSession):
+        """Initialize repository with async database session."""
+        self.db = db
+    
+    async def find_by_id(self, credential_id: int) -> Optional[Credential]:
+        """Find credential by ID."""
+        return await self.db.get(Credential, credential_id)
+    
+    async def find_by_user_id(self, user_id: int) -> list[Credential]:
+        """Find all credentials for a user."""
+        result = await self.db.execute(select(Credential).where(Credential.user_id == user_id))
+        return list(result.scalars().all())
+    
+    async def find_by_user_and_service(
+        self,
+        user_id: int,
+        service_type: str,
+    ) -> Optional[Credential]:
+        """Find credential by user and service type."""
+        result = await self.db.execute(
+            select(Credential).where(
+                Credential.user_id == user_id,
+                Credential.service_type == service_type,
+            )
+        )
+        return result.scalars().first()
+    
+    async def create(self, credential: Credential) -> Credential:
+        """Create a new credential."""
+        self.db.add(credential)
+        await self.db.commit()
+        await self.db.refresh(credential)
+        return credential
+    
+    async def delete(self, credential_id: int) -> bool:
+        """Delete credential."""
+        credential = await self.find_by_id(credential_id)
+        if credential:
+            await self.db.delete(credential)
+            await self.db.commit()
+            return True
+        return False
@@ -0,0 +1,113 @@
+"""Failed item repository."""
+from typing import Optional
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update
+from app.models.failed_item import FailedItem
+from app.transfer.providers import SourceItem
+
+
+class FailedItemRepository:
+    """Repository for failed item data access."""
+    
+    def __init__(self, db: Session):
+        """Initialize repository with database session."""
+        self.db = db
+    
+    def record(
+        self,
+        migration_id: int,
+        item: SourceItem,
+        filename: str,
+        error_class: str,
+        error_message: str,
+        attempts: int = 1,
+        retry_of: Optional[int] = None,
+    ) -> FailedItem:
+        """
+        Record (or update) the failure of an item. Not committed.
+        
+        Args:
+            migration_id: Migration ID
+            item: Source item
+            filename: Name used in the destination
+            error_class: Class name of the error
+            error_message: Error message
+            attempts: Upload attempts made in this migration
+            retry_of: Migration this one retries (its attempts are carried over)
+        
+        Returns:
+            Failed item
+        """
+        failed = (
+            self.db.query(FailedItem)
+            .filter(FailedItem.migration_id == migration_id, FailedItem.item_id == item.id)
+            .first()
+        )
+        if failed is None:
+            previous_attempts = 0
+            if retry_of is not None:
+                previous_attempts = (
+                    self.db.query(FailedItem.attempts)
+                    .filter(FailedItem.migration_id == retry_of, FailedItem.item_id == item.id)
+                    .scalar()
+                ) or 0
+            failed = FailedItem(migration_id=migration_id, item_id=item.id, attempts=previous_attempts)
+            self.db.add(failed)
+        
+        failed.filename = filename
+        failed.file_size = item.size or None
+        failed.mime_type = item.mime_type
+        failed.error_class = error_class
+        failed.error_message = error_message
+        failed.attempts = (failed.attempts or 0) + attempts
+        return failed
+    
+    def find_by_retried_migration_id(self, migration_id: int) -> list[FailedItem]:
+        """Find the items a retry migration covers, in a stable order."""
+        return (
+            self.db.query(FailedItem)
+            .filter(FailedItem.retried_migration_id == migration_id)
+            .order_by(FailedItem.id)
+            .all()
+        )
+
+
+class AsyncFailedItemRepository:
+    """Repository for failed item data access with an AsyncSession."""
+    
+    def __init__(self, db: AsyncSession):
+        """Initialize repository with async database session."""
+        self.db = db
+    
+    async def find_by_migration_id(
+        self,
+        migration_id: int,
+        unretried_only: bool = False,
+        limit: Optional[int] = None,
+    ) -> list[FailedItem]:
+        """
+        Find the failed items of a migration.
+        
+        Args:
+            migration_id: Migration ID
+            unretried_only: Skip items already covered by a retry migration
+            limit: Maximum number of items
+        """
+        query = select(FailedItem).where(FailedItem.migration_id == migration_id)
+        if unretried_only:
+            query = query.where(FailedItem.retried_migration_id.is_(None))
+        query = query.order_by(FailedItem.id)
+        if limit:
+            query = query.limit(limit)
+        
+        result = await self.db.execute(query)
+        return list(result.scalars().all())
+    
+    async def mark_retried(self, failed_item_ids: list[int], retry_migration_id: int) -> None:
+        """Link failed items to the migration that retries them. Not committed."""
+        await self.db.execute(
+            update(FailedItem)
+            .where(FailedItem.id.in_(failed_item_ids))
+            .values(retried_migration_id=retry_migration_id)
+        )
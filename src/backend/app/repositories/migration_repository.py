@@ -1,10 +1,56 @@
 """Migration repository."""
+import base64
+from datetime import datetime
 from typing import Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, func, or_, select
 from app.models.migration import Migration
 
 
+def _after_cursor(cursor: str):
+    """
+    Build the keyset condition for rows after a cursor.
+    
+    created_at is compared with the value stored in the cursor's row, not
+    with the datetime decoded from the cursor: SQLite stores server
+    timestamps as 'YYYY-MM-DD HH:MM:SS' while bound datetimes have
+    microseconds, so comparing against the bound value matched the cursor
+    row again. The decoded value is only used if that row was deleted.
+    """
+    created_at, migration_id = decode_cursor(cursor)
+    anchor = aliased(Migration)
+    anchor_created_at = func.coalesce(
+        select(anchor.created_at).where(anchor.id == migration_id).scalar_subquery(),
+        created_at,
+    )
+    return or_(
+        Migration.created_at < anchor_created_at,
+        and_(Migration.created_at == anchor_created_at, Migration.id < migration_id),
+    )
+
+
+def encode_cursor(migration: Migration) -> str:
+    """Encode the keyset position of a migration as an opaque cursor."""
+    raw = f"{migration.created_at.isoformat()}|{migration.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    Decode a cursor produced by encode_cursor.
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, migration_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(migration_id)
+    except Exception:
+        raise ValueError("Cursor inválido")
+
+
 class MigrationRepository:
     """Repository for migration data access."""
     
@@ -16,23 +62,34 @@ class MigrationRepository:
         """Find migration by ID."""
         return self.db.query(Migration).filter(Migration.id == migration_id).first()
     
+    def _user_query(self, user_id: int, status: Optional[str] = None):
+        """Build the base query for a user's migrations."""
+        query = self.db.query(Migration).filter(Migration.user_id == user_id)
+        
+        if status:
+            query = query.filter(Migration.status == status)
+        
+        return query
+    
+    def count_by_user_id(self, user_id: int, status: Optional[str] = None) -> int:
+        """Count migrations for a user."""
+        return self._user_query(user_id, status).count()
+    
     def find_by_user_id(
         self,
         user_id: int,
         status: Optional[str] = None,
         page: int = 1,
         limit: int = 20,
-    ) -> tuple[list[Migration], int]:
-        """Find migrations for a user with pagination."""
-        query = self.db.query(Migration).filter(Migration.user_id == user_id)
+        include_total: bool = True,
+    ) -> tuple[list[Migration], Optional[int]]:
+        """Find migrations for a user with offset pagination."""
+        query = self._user_query(user_id, status)
         
-        if status:
-            query = query.filter(Migration.status == status)
-        
-        total = query.count()
+        total = query.count() if include_total else None
         
         migrations = (
-            query.order_by(Migration.created_at.desc())
+            query.order_by(Migration.created_at.desc(), Migration.id.desc())
             .offset((page - 1) * limit)
             .limit(limit)
             .all()
@@ -40,6 +97,50 @@ class MigrationRepository:
         
         return migrations, total
     
+    def find_by_user_id_keyset(
+        self,
+        user_id: int,
+        status: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 20,
+    ) -> tuple[list[Migration], Optional[str]]:
+        """
+        Find migrations for a user with keyset (cursor) pagination.
+        
+        Seeks directly to the position after the cursor using the
+        (user_id, [status,] created_at, id) indexes instead of scanning
+        OFFSET rows, so the cost of a page does not grow with history size.
+        
+        Args:
+            user_id: User ID
+            status: Optional status filter
+            cursor: Cursor returned by the previous page (None for the first page)
+            limit: Page size
+            
+        Returns:
+            Tuple of (migrations, next_cursor); next_cursor is None on the last page
+            
+        Raises:
+            ValueError: If the cursor is invalid
+        """
+        query = self._user_query(user_id, status)
+        
+        if cursor:
+            query = query.filter(_after_cursor(cursor))
+        
+        migrations = (
+            query.order_by(Migration.created_at.desc(), Migration.id.desc())
+            .limit(limit + 1)
+            .all()
+        )
+        
+        next_cursor = None
+        if len(migrations) > limit:
+            migrations = migrations[:limit]
+            next_cursor = encode_cursor(migrations[-1])
+        
+        return migrations, next_cursor
+    
     def create(self, migration: Migration) -> Migration:
         """Create a new migration."""
         self.db.add(migration)
@@ -54,7 +155,89 @@ class MigrationRepository:
         return migration
 
 
-
-
-
-
+class AsyncMigrationRepository:
+    """Repository for migration data access with an AsyncSession."""
+    
+    def __init__(self, db: AsyncSession):
+        """Initialize repository with async database session."""
+        self.db = db
+    
+    async def find_by_id(self, migration_id: int) -> Optional[Migration]:
+        """Find migration by ID."""
+        return await self.db.get(Migration, migration_id)
+    
+    @staticmethod
+    def _user_filter(user_id: int, status: Optional[str] = None) -> list:
+        """Build the filter for a user's migrations."""
+        conditions = [Migration.user_id == user_id]
+        if status:
+            conditions.append(Migration.status == status)
+        return conditions
+    
+    async def count_by_user_id(self, user_id: int, status: Optional[str] = None) -> int:
+        """Count migrations for a user."""
+        result = await self.db.execute(
+            select(func.count()).select_from(Migration).where(*self._user_filter(user_id, status))
+        )
+        return result.scalar_one()
+    
+    async def count_by_status(self) -> dict[str, int]:
+        """Count all migrations grouped by status."""
+        result = await self.db.execute(
+            select(Migration.status, func.count()).group_by(Migration.status)
+        )
+        return {status: count for status, count in result.all()}
+    
+    async def find_by_user_id(
+        self,
+        user_id: int,
+        status: Optional[str] = None,
+        page: int = 1,
+        limit: int = 20,
+        include_total: bool = True,
+    ) -> tuple[list[Migration], Optional[int]]:
+        """Find migrations for a user with offset pagination."""
+        total = await self.count_by_user_id(user_id, status) if include_total else None
+        
+        result = await self.db.execute(
+            select(Migration)
+            .where(*self._user_filter(user_id, status))
+            .order_by(Migration.created_at.desc(), Migration.id.desc())
+            .offset((page - 1) * limit)
+            .limit(limit)
+        )
+        
+        return list(result.scalars().all()), total
+    
+    async def find_by_user_id_keyset(
+        self,
+        user_id: int,
+        status: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 20,
+    ) -> tuple[list[Migration], Optional[str]]:
+        """Find migrations for a user with keyset (cursor) pagination."""
+        conditions = self._user_filter(user_id, status)
+        if cursor:
+            conditions.append(_after_cursor(cursor))
+        
+        result = await self.db.execute(
+            select(Migration)
+            .where(*conditions)
+            .order_by(Migration.created_at.desc(), Migration.id.desc())
+            .limit(limit + 1)
+        )
+        migrations = list(result.scalars().all())
+        
+        next_cursor = None
+        if len(migrations) > limit:
+            migrations = migrations[:limit]
+            next_cursor = encode_cursor(migrations[-1])
+        
+        return migrations, next_cursor
+    
+    async def update(self, migration: Migration) -> Migration:
+        """Update migration."""
+        await self.db.commit()
+        await self.db.refresh(migration)
+        return migration
@@ -0,0 +1,152 @@
+"""Outbox repository."""
+from datetime import datetime, timezone
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.models.outbox_message import OutboxMessage
+
+
+class OutboxRepository:
+    """Repository for outbox message data access."""
+    
+    def __init__(self, db: Session):
+        """Initialize repository with database session."""
+        self.db = db
+    
+    def add(self, message: OutboxMessage) -> OutboxMessage:
+        """
+        Add a message to the current transaction.
+        
+        Does not commit: the caller commits it together with the change
+        that produced it (works with both Session and AsyncSession).
+        """
+        self.db.add(message)
+        return message
+    
+    def claim_due(self, limit: int) -> list[OutboxMessage]:
+        """
+        Lock and return pending messages that are due for publishing.
+        
+        Rows locked by another dispatcher are skipped (PostgreSQL), so
+        concurrent dispatchers work on disjoint batches.
+        """
+        now = datetime.now(timezone.utc)
+        return (
+            self.db.query(OutboxMessage)
+            .filter(
+                OutboxMessage.status == "pending",
+                OutboxMessage.next_attempt_at <= now,
+            )
+            .order_by(OutboxMessage.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+    
+    def find_by_ids(self, message_ids: list[int]) -> list[OutboxMessage]:
+        """Find messages by ID (one query)."""
+        if not message_ids:
+            return []
+        return self.db.query(OutboxMessage).filter(OutboxMessage.id.in_(message_ids)).all()
+    
+    @staticmethod
+    def _in_flight_filter(lease_cutoff: datetime) -> list:
+        """Dispatched, not completed and with a lease that has not expired."""
+        return [
+            OutboxMessage.status == "dispatched",
+            OutboxMessage.completed_at.is_(None),
+            OutboxMessage.dispatched_at > lease_cutoff,
+        ]
+    
+    def count_in_flight_by_user(self, lease_cutoff: datetime) -> dict[int, int]:
+        """Count work units in flight per user."""
+        rows = (
+            self.db.query(OutboxMessage.user_id, func.count())
+            .filter(*self._in_flight_filter(lease_cutoff))
+            .group_by(OutboxMessage.user_id)
+            .all()
+        )
+        return {user_id: count for user_id, count in rows}
+    
+    def find_in_flight_migration_ids(self, migration_ids: set[int], lease_cutoff: datetime) -> set[int]:
+        """Which of the given migrations have a work unit in flight."""
+        rows = (
+            self.db.query(OutboxMessage.migration_id)
+            .filter(
+                OutboxMessage.migration_id.in_(migration_ids),
+                *self._in_flight_filter(lease_cutoff),
+            )
+            .distinct()
+            .all()
+        )
+        return {migration_id for (migration_id,) in rows}
+    
+    def count_dispatched_by_user(self, since: datetime) -> dict[int, int]:
+        """Count work units dispatched per user since a point in time."""
+        rows = (
+            self.db.query(OutboxMessage.user_id, func.count())
+            .filter(
+                OutboxMessage.status == "dispatched",
+                OutboxMessage.dispatched_at > since,
+            )
+            .group_by(OutboxMessage.user_id)
+            .all()
+        )
+        return {user_id: count for user_id, count in rows}
+    
+    def claim_expired_leases(self, lease_cutoff: datetime) -> list[OutboxMessage]:
+        """Lock dispatched messages whose worker never reported completion."""
+        return (
+            self.db.query(OutboxMessage)
+            .filter(
+                OutboxMessage.status == "dispatched",
+                OutboxMessage.completed_at.is_(None),
+                OutboxMessage.dispatched_at <= lease_cutoff,
+            )
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+    
+    def start_unit(self, deduplication_id: str, resumed: bool = False) -> bool:
+        """
+        Mark a dispatched work unit as started by a worker. Not committed.
+        
+        The update is conditional, so when the same unit is delivered twice
+        only one delivery starts it.
+        
+        Args:
+            deduplication_id: Deduplication ID of the unit's message
+            resumed: The delivery is a retry of a unit that already started
+        
+        Returns:
+            False if the unit is unknown, not dispatched, already completed
+            or already started by another delivery
+        """
+        query = self.db.query(OutboxMessage).filter(
+            OutboxMessage.deduplication_id == deduplication_id,
+            OutboxMessage.status == "dispatched",
+            OutboxMessage.completed_at.is_(None),
+        )
+        if not resumed:
+            query = query.filter(OutboxMessage.started_at.is_(None))
+        return query.update(
+            {OutboxMessage.started_at: datetime.now(timezone.utc)}, synchronize_session=False
+        ) > 0
+    
+    def complete_in_flight(self, migration_id: int) -> int:
+        """
+        Mark the in-flight work units of a migration as completed.
+        
+        Does not commit.
+        
+        Returns:
+            Number of messages updated
+        """
+        return (
+            self.db.query(OutboxMessage)
+            .filter(
+                OutboxMessage.migration_id == migration_id,
+                OutboxMessage.status == "dispatched",
+                OutboxMessage.completed_at.is_(None),
+            )
+            .update({OutboxMessage.completed_at: datetime.now(timezone.utc)}, synchronize_session=False)
+        )
@@ -1,6 +1,8 @@
 """User repository."""
 from typing import Optional
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.user import User
 
 
@@ -33,7 +35,31 @@ class UserRepository:
         return user
 
 
-
-
-
-
+class AsyncUserRepository:
+    """Repository for user data access with an AsyncSession."""
+    
+    def __init__(self, db: AsyncSession):
+        """Initialize repository with async database session."""
+        self.db = db
+    
+    async def find_by_id(self, user_id: int) -> Optional[User]:
+        """Find user by ID."""
+        return await self.db.get(User, user_id)
+    
+    async def find_by_email(self, email: str) -> Optional[User]:
+        """Find user by email."""
+        result = await self.db.execute(select(User).where(User.email == email))
+        return result.scalars().first()
+    
+    async def create(self, user: User) -> User:
+        """Create a new user."""
+        self.db.add(user)
+        await self.db.commit()
+        await self.db.refresh(user)
+        return user
+    
+    async def update(self, user: User) -> User:
+        """Update user."""
+        await self.db.commit()
+        await self.db.refresh(user)
+        return user
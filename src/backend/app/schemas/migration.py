@@ -43,9 +43,33 @@ class MigrationResponse(BaseModel):
 class MigrationList(BaseModel):
     """Migration list response schema."""
     migrations: list[MigrationResponse]
-    total: int
+    total: Optional[int] = None
     page: int
     limit: int
+    next_cursor: Optional[str] = None
+
+
+class FailedItemResponse(BaseModel):
+    """Failed item response schema."""
+    id: int
+    item_id: str
+    filename: str
+    file_size: Optional[int] = None
+    mime_type: Optional[str] = None
+    error_class: str
+    error_message: Optional[str] = None
+    attempts: int
+    retried_migration_id: Optional[int] = None
+    updated_at: Optional[datetime] = None
+    
+    class Config:
+        """Pydantic config."""
+        from_attributes = True
+
+
+class FailedItemList(BaseModel):
+    """Failed item list response schema."""
+    items: list[FailedItemResponse]
 
 
 class MigrationProgress(BaseModel):
@@ -1,15 +1,20 @@
 """Authentication service."""
-from typing import Optional
-from authlib.integrations.httpx_client import AsyncOAuth2Client
+from typing import Optional, TYPE_CHECKING
 from app.config import settings
 
+if TYPE_CHECKING:
+    from authlib.integrations.httpx_client import AsyncOAuth2Client
+
 
 class AuthService:
     """Service for OAuth authentication."""
     
     @staticmethod
-    def get_google_oauth_client() -> AsyncOAuth2Client:
+    def get_google_oauth_client() -> "AsyncOAuth2Client":
         """Get Google OAuth client."""
+        # authlib is only imported when an OAuth flow actually runs
+        from authlib.integrations.httpx_client import AsyncOAuth2Client
+        
         return AsyncOAuth2Client(
             client_id=settings.GOOGLE_CLIENT_ID,
             client_secret=settings.GOOGLE_CLIENT_SECRET,
@@ -1,11 +1,44 @@
 """Credential service."""
-from typing import Optional
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.models.credential import Credential
 from app.models.user import User
 from app.schemas.credential import CredentialCreate
 from app.services.encryption_service import EncryptionService
-from app.repositories.credential_repository import CredentialRepository
+from app.repositories.credential_repository import AsyncCredentialRepository, CredentialRepository
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CredentialContext:
+    """
+    Decrypted credentials of a user.
+    
+    Loaded once per migration by CredentialService.load_credential_context
+    and shared by the iCloud and Google Drive services, so neither has to
+    query and decrypt credentials again.
+    """
+    user_id: int
+    apple_id: Optional[str] = None
+    icloud_password: Optional[str] = None
+    google_access_token: Optional[str] = None
+    google_refresh_token: Optional[str] = None
+    google_expires_at: Optional[datetime] = None
+    
+    @property
+    def has_icloud(self) -> bool:
+        """Whether usable iCloud credentials were loaded."""
+        return bool(self.apple_id and self.icloud_password)
+    
+    @property
+    def has_google_drive(self) -> bool:
+        """Whether Google OAuth tokens were loaded."""
+        return bool(self.google_access_token or self.google_refresh_token)
 
 
 class CredentialService:
@@ -16,6 +49,83 @@ class CredentialService:
         self.db = db
         self.repository = CredentialRepository(db)
     
+    @staticmethod
+    def decrypt_credential(credential: Credential) -> dict:
+        """
+        Decrypt a stored credential.
+        
+        Args:
+            credential: iCloud or Google Drive credential
+        
+        Returns:
+            ``apple_id`` and ``password`` for iCloud; ``access_token``,
+            ``refresh_token`` and ``expires_at`` (timezone-aware) for Google Drive
+        
+        Raises:
+            ValueError: If the service type is not supported
+            Exception: If decryption fails
+        """
+        if credential.service_type == "icloud":
+            decrypted = EncryptionService.decrypt(
+                credential.encrypted_credentials,
+                credential.salt,
+                credential.nonce or "",
+            )
+            apple_id, _, password = decrypted.partition(":")
+            return {"apple_id": apple_id, "password": password}
+        
+        if credential.service_type == "google_drive":
+            tokens = EncryptionService.decrypt_oauth_tokens(
+                credential.encrypted_credentials,
+                credential.salt,
+                credential.nonce or "",
+            )
+            expires_at = credential.expires_at
+            if expires_at and expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            return {**tokens, "expires_at": expires_at}
+        
+        raise ValueError(f"Tipo de credencial não suportado: {credential.service_type}")
+    
+    def _try_decrypt(self, credential: Credential) -> Optional[dict]:
+        """Decrypt a credential, logging failures (without secrets) instead of raising."""
+        try:
+            return self.decrypt_credential(credential)
+        except Exception as e:
+            logger.warning(
+                f"Não foi possível descriptografar a credencial {credential.service_type} "
+                f"(id {credential.id}) do usuário {credential.user_id}: {type(e).__name__}"
+            )
+            return None
+    
+    @staticmethod
+    def encrypt_credential_data(credential_data: CredentialCreate) -> tuple:
+        """
+        Validate and encrypt the secrets of a credential payload.
+        
+        Args:
+            credential_data: Credential data
+        
+        Returns:
+            (encrypted_data, salt, nonce), all None when there is nothing to encrypt
+        
+        Raises:
+            ValueError: If iCloud credentials are missing or invalid
+        """
+        if credential_data.service_type != "icloud":
+            return None, None, None
+        
+        if not credential_data.apple_id or not credential_data.password:
+            raise ValueError("Apple ID e senha são obrigatórios para iCloud")
+        
+        # Validate email format
+        if "@" not in credential_data.apple_id:
+            raise ValueError("Apple ID deve ser um email válido")
+        
+        # Encrypt credentials
+        credentials_str = f"{credential_data.apple_id}:{credential_data.password}"
+        return EncryptionService.encrypt(credentials_str)
+    
     def create_credential(
         self,
         user_id: int,
@@ -27,26 +137,11 @@ class CredentialService:
         Args:
             user_id: User ID
             credential_data: Credential data
-            
+        
         Returns:
             Created credential
         """
-        # Encrypt credentials if provided
-        encrypted_data = None
-        salt = None
-        nonce = None
-        
-        if credential_data.service_type == "icloud":
-            if not credential_data.apple_id or not credential_data.password:
-                raise ValueError("Apple ID e senha são obrigatórios para iCloud")
-            
-            # Validate email format
-            if "@" not in credential_data.apple_id:
-                raise ValueError("Apple ID deve ser um email válido")
-            
-            # Encrypt credentials
-            credentials_str = f"{credential_data.apple_id}:{credential_data.password}"
-            encrypted_data, salt, nonce = EncryptionService.encrypt(credentials_str)
+        encrypted_data, salt, nonce = self.encrypt_credential_data(credential_data)
         
         # Check if credential already exists
         existing = self.repository.find_by_user_and_service(user_id, credential_data.service_type)
@@ -87,7 +182,7 @@ class CredentialService:
             access_token: OAuth access token
             refresh_token: OAuth refresh token
             expires_in: Token expiration time in seconds
-            
+        
         Returns:
             Created or updated credential
         """
@@ -135,7 +230,7 @@ class CredentialService:
         
         Args:
             user_id: User ID
-            
+        
         Returns:
             Dictionary with access_token and refresh_token, or None if not found
         """
@@ -144,16 +239,10 @@ class CredentialService:
         if not credential or not credential.encrypted_credentials:
             return None
         
-        try:
-            tokens = EncryptionService.decrypt_oauth_tokens(
-                credential.encrypted_credentials,
-                credential.salt,
-                credential.nonce or "",
-            )
-            return tokens
-        except Exception as e:
-            # Log error but don't expose details
+        tokens = self._try_decrypt(credential)
+        if tokens is None:
             return None
+        return {"access_token": tokens.get("access_token"), "refresh_token": tokens.get("refresh_token")}
     
     def is_google_token_expired(self, user_id: int) -> bool:
         """
@@ -161,7 +250,7 @@ class CredentialService:
         
         Args:
             user_id: User ID
-            
+        
         Returns:
             True if expired or not found, False if still valid
         """
@@ -173,6 +262,43 @@ class CredentialService:
         from datetime import datetime, timezone
         return datetime.now(timezone.utc) >= credential.expires_at
     
+    def load_credential_context(
+        self,
+        user_id: int,
+        service_types: Optional[Iterable[str]] = None,
+    ) -> CredentialContext:
+        """
+        Load and decrypt a user's credentials with a single query.
+        
+        Args:
+            user_id: User ID
+            service_types: Services to decrypt (defaults to all)
+        
+        Returns:
+            Immutable credential context; services whose credentials are
+            missing or cannot be decrypted (logged) are left empty
+        """
+        wanted = set(service_types) if service_types else {"icloud", "google_drive"}
+        values = {"user_id": user_id}
+        
+        for credential in self.repository.find_by_user_id(user_id):
+            if credential.service_type not in wanted or not credential.encrypted_credentials:
+                continue
+            
+            decrypted = self._try_decrypt(credential)
+            if decrypted is None:
+                continue
+            
+            if credential.service_type == "icloud":
+                values["apple_id"] = decrypted["apple_id"]
+                values["icloud_password"] = decrypted["password"]
+            elif credential.service_type == "google_drive":
+                values["google_access_token"] = decrypted.get("access_token")
+                values["google_refresh_token"] = decrypted.get("refresh_token")
+                values["google_expires_at"] = decrypted["expires_at"]
+        
+        return CredentialContext(**values)
+    
     def get_user_credentials(self, user_id: int) -> list[Credential]:
         """Get all credentials for a user."""
         return self.repository.find_by_user_id(user_id)
@@ -195,16 +321,69 @@ class CredentialService:
             return None
         
         if credential.service_type == "icloud" and credential.encrypted_credentials:
-            decrypted = EncryptionService.decrypt(
-                credential.encrypted_credentials,
-                credential.salt,
-                credential.nonce or "",
-            )
-            parts = decrypted.split(":", 1)
-            return {
-                "apple_id": parts[0] if len(parts) > 0 else "",
-                "password": parts[1] if len(parts) > 1 else "",
-            }
+            return self.decrypt_credential(credential)
         
         return None
 
+
+class AsyncCredentialService:
+    """
+    Credential writes for API routes with an AsyncSession.
+    
+    Routes that refresh Google tokens (listing, verification, OAuth
+    callback) still use CredentialService, since GoogleDriveService stores
+    refreshed tokens through a sync Session.
+    """
+    
+    def __init__(self, db: AsyncSession):
+        """Initialize service with async database session."""
+        self.db = db
+        self.repository = AsyncCredentialRepository(db)
+    
+    async def create_credential(
+        self,
+        user_id: int,
+        credential_data: CredentialCreate,
+    ) -> Credential:
+        """
+        Create or update credential.
+        
+        Args:
+            user_id: User ID
+            credential_data: Credential data
+        
+        Returns:
+            Created credential
+        """
+        encrypted_data, salt, nonce = CredentialService.encrypt_credential_data(credential_data)
+        
+        existing = await self.repository.find_by_user_and_service(user_id, credential_data.service_type)
+        
+        if existing:
+            if encrypted_data:
+                existing.encrypted_credentials = encrypted_data
+                existing.salt = salt
+                existing.nonce = nonce
+            await self.db.commit()
+            await self.db.refresh(existing)
+            return existing
+        
+        credential = Credential(
+            user_id=user_id,
+            service_type=credential_data.service_type,
+            encrypted_credentials=encrypted_data or "",
+            salt=salt or "",
+            nonce=nonce or "",
+        )
+        
+        return await self.repository.create(credential)
+    
+    async def delete_credential(self, credential_id: int, user_id: int) -> bool:
+        """Delete credential."""
+        credential = await self.repository.find_by_id(credential_id)
+        
+        if not credential or credential.user_id != user_id:
+            return False
+        
+        await self.repository.delete(credential_id)
+        return True
@@ -1,15 +1,26 @@
 """Encryption service for credentials."""
 import os
-import hashlib
-from cryptography.hazmat.primitives.ciphers.aead import AESGCM
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from cryptography.hazmat.primitives import hashes
 from app.config import settings
 
 
 class EncryptionService:
     """Service for encrypting and decrypting credentials."""
     
+    @staticmethod
+    def _derive_key(master_key: bytes, salt: bytes) -> bytes:
+        """Derive the AES key from the master key using PBKDF2."""
+        # cryptography is imported on first use to keep API cold starts fast
+        from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+        from cryptography.hazmat.primitives import hashes
+        
+        kdf = PBKDF2HMAC(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=salt,
+            iterations=100000,
+        )
+        return kdf.derive(master_key)
+    
     @staticmethod
     def encrypt(plaintext: str, master_key: bytes | None = None) -> tuple[str, str, str]:
         """
@@ -29,15 +40,10 @@ class EncryptionService:
         salt = os.urandom(32)
         
         # Derive key using PBKDF2
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
-        )
-        key = kdf.derive(master_key)
+        key = EncryptionService._derive_key(master_key, salt)
         
         # Encrypt with AES-GCM
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
         aesgcm = AESGCM(key)
         nonce = os.urandom(12)
         ciphertext = aesgcm.encrypt(nonce, plaintext.encode(), None)
@@ -67,15 +73,10 @@ class EncryptionService:
         nonce = bytes.fromhex(nonce_hex)
         
         # Derive key
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
-        )
-        key = kdf.derive(master_key)
+        key = EncryptionService._derive_key(master_key, salt)
         
         # Decrypt
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
         aesgcm = AESGCM(key)
         plaintext = aesgcm.decrypt(nonce, ciphertext, None)
         
@@ -0,0 +1,147 @@
+"""Fair scheduling of migration work units across users."""
+from collections import defaultdict, deque
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.migration import Migration
+from app.models.outbox_message import OutboxMessage
+from app.repositories.outbox_repository import OutboxRepository
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class FairScheduler:
+    """
+    Chooses which pending work units to publish.
+    
+    Migrations run as a sequence of bounded work units (one outbox message
+    each), so a large library yields the workers between units. Publishing
+    only as many units as there are worker slots keeps the broker queue
+    short, and choosing which units go first here is what makes the queue
+    fair:
+    
+    - Weighted fair queueing: each user's virtual time is the number of units
+      served to them recently (in flight or dispatched within
+      SCHEDULER_FAIRNESS_WINDOW) divided by the weight of their next unit; the
+      user with the lowest virtual time goes next.
+    - Small migrations, and migrations that have not transferred anything
+      yet, weigh SCHEDULER_SMALL_MIGRATION_WEIGHT, which keeps
+      time-to-first-photo low for new users.
+    - SCHEDULER_PER_USER_CAP and SCHEDULER_MAX_IN_FLIGHT cap concurrent units.
+    """
+    
+    def __init__(self, db: Session):
+        """Initialize scheduler with database session."""
+        self.db = db
+        self.repository = OutboxRepository(db)
+    
+    @staticmethod
+    def lease_cutoff(now: datetime) -> datetime:
+        """Units dispatched before this are no longer considered in flight."""
+        return now - timedelta(seconds=settings.SCHEDULER_LEASE_SECONDS)
+    
+    @staticmethod
+    def weight(total_photos: int, processed_photos: int) -> float:
+        """
+        Scheduling weight of a migration's next unit.
+        
+        Args:
+            total_photos: Total photos of the migration (0 or 1 if unknown)
+            processed_photos: Photos already migrated or failed
+        """
+        remaining = max(0, (total_photos or 0) - processed_photos)
+        if processed_photos == 0 or remaining <= settings.SCHEDULER_SMALL_MIGRATION_PHOTOS:
+            return settings.SCHEDULER_SMALL_MIGRATION_WEIGHT
+        return 1.0
+    
+    def select(self, candidates: list[OutboxMessage], limit: int) -> list[OutboxMessage]:
+        """
+        Pick the units to publish now, in fair order.
+        
+        Args:
+            candidates: Due pending messages (locked by the caller)
+            limit: Maximum number of messages to return
+        
+        Returns:
+            Messages to publish; the others stay pending
+        """
+        if not candidates:
+            return []
+        
+        now = datetime.now(timezone.utc)
+        lease_cutoff = self.lease_cutoff(now)
+        in_flight = defaultdict(int, self.repository.count_in_flight_by_user(lease_cutoff))
+        served = defaultdict(int, self.repository.count_dispatched_by_user(
+            now - timedelta(seconds=settings.SCHEDULER_FAIRNESS_WINDOW)
+        ))
+        
+        capacity = limit
+        if settings.SCHEDULER_MAX_IN_FLIGHT > 0:
+            capacity = min(capacity, settings.SCHEDULER_MAX_IN_FLIGHT - sum(in_flight.values()))
+        if capacity <= 0:
+            return []
+        
+        migration_ids = {m.migration_id for m in candidates}
+        progress = {
+            migration_id: (total or 0, (migrated or 0) + (failed or 0))
+            for migration_id, total, migrated, failed in self.db.query(
+                Migration.id, Migration.total_photos, Migration.migrated_photos, Migration.failed_photos
+            ).filter(Migration.id.in_(migration_ids)).all()
+        }
+        
+        # Per-user FIFO queues with at most one unit per migration; units of a
+        # migration run one after the other
+        queues: dict[int, deque] = defaultdict(deque)
+        seen_migrations = self.repository.find_in_flight_migration_ids(migration_ids, lease_cutoff)
+        for message in sorted(candidates, key=lambda m: m.id):
+            if message.migration_id in seen_migrations:
+                continue
+            seen_migrations.add(message.migration_id)
+            queues[message.user_id].append(message)
+        
+        per_user_cap = settings.SCHEDULER_PER_USER_CAP
+        selected = []
+        while len(selected) < capacity:
+            best_user, best_key = None, None
+            for user_id, queue in queues.items():
+                if not queue or (per_user_cap > 0 and in_flight[user_id] >= per_user_cap):
+                    continue
+                message = queue[0]
+                weight = self.weight(*progress.get(message.migration_id, (0, 0)))
+                key = (served[user_id] / weight, message.id)
+                if best_key is None or key < best_key:
+                    best_user, best_key = user_id, key
+            
+            if best_user is None:
+                break
+            
+            selected.append(queues[best_user].popleft())
+            in_flight[best_user] += 1
+            served[best_user] += 1
+        
+        if len(selected) < len(candidates):
+            logger.debug("Fair scheduler deferred %s of %s units", len(candidates) - len(selected), len(candidates))
+        return selected
+    
+    def requeue_expired(self) -> int:
+        """
+        Re-enqueue work units whose worker never reported completion.
+        
+        The lease is released and, if the migration is still running, a new
+        unit is queued so it continues from its saved progress.
+        
+        Returns:
+            Number of units re-enqueued
+        """
+        now = datetime.now(timezone.utc)
+        expired = self.repository.claim_expired_leases(self.lease_cutoff(now))
+        requeued = 0
+        for message in expired:
+            message.completed_at = now
+            migration = self.db.query(Migration).filter(Migration.id == message.migration_id).first()
+            if migration and migration.status in ("pending", "in_progress"):
+                self.repository.add(OutboxMessage.for_migration(migration.id, migration.user_id))
+                requeued += 1
+                logger.warning(f"Work unit lease of migration {migration.id} expired, re-enqueued")
+        return requeued
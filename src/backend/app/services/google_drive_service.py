@@ -1,53 +1,96 @@
 """Google Drive service for file operations."""
-from typing import Optional, BinaryIO
+from datetime import datetime, timedelta, timezone
+from typing import Optional, BinaryIO, AsyncIterator
 import json
 import httpx
 from app.services.auth_service import AuthService
-from app.services.credential_service import CredentialService
+from app.services.credential_service import CredentialService, CredentialContext
+from app.instrumentation.collectors import httpx_event_hooks
+from app.instrumentation.stages import TOKEN_REFRESH, time_stage
+from app.transfer.providers import PhotoSink
 from app.config import settings
 
+# Refresh the access token slightly before it expires to avoid 401 round-trips
+TOKEN_EXPIRY_MARGIN_SECONDS = 60
 
-class GoogleDriveService:
+# Response fields requested on upload (md5Checksum is used to verify transfers)
+UPLOAD_RESPONSE_FIELDS = "id,name,mimeType,size,md5Checksum"
+
+# Files up to this size are sent in a single multipart request; larger ones
+# are streamed through a resumable upload session
+MULTIPART_UPLOAD_MAX_BYTES = 5 * 1024 * 1024
+
+
+class GoogleDriveService(PhotoSink):
     """Service for Google Drive operations."""
     
-    def __init__(self, db_session, user_id: int):
+    def __init__(self, db_session, user_id: int, credentials: Optional[CredentialContext] = None):
         """
         Initialize Google Drive service.
         
         Args:
             db_session: Database session
             user_id: User ID
+            credentials: Preloaded credential context (skips the database lookup)
         """
         self.db = db_session
         self.user_id = user_id
         self.credential_service = CredentialService(db_session)
+        self._credentials = credentials
         self._access_token: Optional[str] = None
+        self._refresh_token: Optional[str] = None
+        self._expires_at: Optional[datetime] = None
+        self._tokens_loaded = False
+    
+    def _load_tokens(self) -> None:
+        """Load OAuth tokens from the credential context (or the database once)."""
+        if self._tokens_loaded:
+            return
+        
+        credentials = self._credentials
+        if credentials is None:
+            credentials = self.credential_service.load_credential_context(
+                self.user_id, service_types=("google_drive",)
+            )
+        
+        self._access_token = credentials.google_access_token
+        self._refresh_token = credentials.google_refresh_token
+        self._expires_at = credentials.google_expires_at
+        self._tokens_loaded = True
+    
+    def _is_token_expired(self) -> bool:
+        """Check if the access token is expired (or about to expire)."""
+        if not self._expires_at:
+            return True
+        margin = timedelta(seconds=TOKEN_EXPIRY_MARGIN_SECONDS)
+        return datetime.now(timezone.utc) >= self._expires_at - margin
     
     async def _get_access_token(self, force_refresh: bool = False) -> str:
         """
         Get valid access token, refreshing if necessary.
         
+        Token state is kept in memory after the first load, so checking for
+        expiry does not touch the database.
+        
         Args:
             force_refresh: Force token refresh even if not expired
             
         Returns:
             Valid access token
         """
-        # Check if token is expired
-        is_expired = self.credential_service.is_google_token_expired(self.user_id)
+        self._load_tokens()
         
-        if force_refresh or is_expired:
-            # Get refresh token
-            tokens = self.credential_service.get_google_oauth_tokens(self.user_id)
-            if not tokens or not tokens.get("refresh_token"):
+        if force_refresh or self._is_token_expired():
+            if not self._refresh_token:
                 raise ValueError("Refresh token não disponível. Refaça a autenticação OAuth.")
             
             # Refresh token
-            new_tokens = await AuthService.refresh_google_token(tokens["refresh_token"])
+            with time_stage(TOKEN_REFRESH):
+                new_tokens = await AuthService.refresh_google_token(self._refresh_token)
             
             # Update credentials with new tokens
             access_token = new_tokens.get("access_token")
-            refresh_token = new_tokens.get("refresh_token", tokens.get("refresh_token"))
+            refresh_token = new_tokens.get("refresh_token", self._refresh_token)
             expires_in = new_tokens.get("expires_in", 3600)
             
             self.credential_service.create_google_oauth_credential(
@@ -58,23 +101,47 @@ class GoogleDriveService:
             )
             
             self._access_token = access_token
+            self._refresh_token = refresh_token
+            self._expires_at = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
             return access_token
         
-        # Use cached token or get from credentials
         if not self._access_token:
-            tokens = self.credential_service.get_google_oauth_tokens(self.user_id)
-            if not tokens:
-                raise ValueError("Credenciais do Google Drive não encontradas. Refaça a autenticação OAuth.")
-            self._access_token = tokens.get("access_token")
+            raise ValueError("Credenciais do Google Drive não encontradas. Refaça a autenticação OAuth.")
         
         return self._access_token
     
+    @staticmethod
+    def _file_metadata(
+        name: str,
+        folder_id: Optional[str],
+        mime_type: str,
+        modified: Optional[datetime] = None,
+        properties: Optional[dict] = None,
+    ) -> dict:
+        """Build the metadata of a file to upload."""
+        metadata = {
+            "name": name,
+            "mimeType": mime_type,
+        }
+        if folder_id:
+            metadata["parents"] = [folder_id]
+        if modified:
+            if modified.tzinfo is None:
+                modified = modified.replace(tzinfo=timezone.utc)
+            metadata["modifiedTime"] = modified.isoformat()
+        if properties:
+            # appProperties are private to this app and hold strings only
+            metadata["appProperties"] = {k: str(v) for k, v in properties.items() if v is not None}
+        return metadata
+    
     async def upload_file(
         self,
         file_data: bytes,
         filename: str,
         folder_id: str = None,
         mime_type: str = "image/jpeg",
+        modified: Optional[datetime] = None,
+        properties: Optional[dict] = None,
     ) -> dict:
         """
         Upload file to Google Drive.
@@ -84,22 +151,19 @@ class GoogleDriveService:
             filename: Name of the file
             folder_id: Optional folder ID to upload to
             mime_type: MIME type of the file
+            modified: Optional modification time to set on the file
+            properties: Optional appProperties to store with the file
             
         Returns:
-            Dictionary with file ID and other metadata
+            Dictionary with file ID, md5Checksum and other metadata
         """
         import json
         access_token = await self._get_access_token()
         
         # Prepare metadata
-        metadata = {
-            "name": filename,
-            "mimeType": mime_type,
-        }
-        if folder_id:
-            metadata["parents"] = [folder_id]
+        metadata = self._file_metadata(filename, folder_id, mime_type, modified, properties)
         
-        async with httpx.AsyncClient(timeout=60.0) as client:
+        async with httpx.AsyncClient(timeout=60.0, event_hooks=httpx_event_hooks("google_drive")) as client:
             # Upload file using multipart upload
             # httpx supports multipart/form-data natively
             files = {
@@ -108,7 +172,7 @@ class GoogleDriveService:
             }
             
             response = await client.post(
-                "https://www.googleapis.com/upload/drive/v3/files?uploadType=multipart",
+                f"https://www.googleapis.com/upload/drive/v3/files?uploadType=multipart&fields={UPLOAD_RESPONSE_FIELDS}",
                 headers={"Authorization": f"Bearer {access_token}"},
                 files=files,
             )
@@ -117,7 +181,7 @@ class GoogleDriveService:
                 # Token expired, try refreshing
                 access_token = await self._get_access_token(force_refresh=True)
                 response = await client.post(
-                    "https://www.googleapis.com/upload/drive/v3/files?uploadType=multipart",
+                    f"https://www.googleapis.com/upload/drive/v3/files?uploadType=multipart&fields={UPLOAD_RESPONSE_FIELDS}",
                     headers={"Authorization": f"Bearer {access_token}"},
                     files=files,
                 )
@@ -145,7 +209,7 @@ class GoogleDriveService:
         if parent_id:
             metadata["parents"] = [parent_id]
         
-        async with httpx.AsyncClient() as client:
+        async with httpx.AsyncClient(event_hooks=httpx_event_hooks("google_drive")) as client:
             response = await client.post(
                 "https://www.googleapis.com/drive/v3/files",
                 headers={
@@ -178,7 +242,7 @@ class GoogleDriveService:
         """
         access_token = await self._get_access_token()
         
-        async with httpx.AsyncClient() as client:
+        async with httpx.AsyncClient(event_hooks=httpx_event_hooks("google_drive")) as client:
             response = await client.get(
                 "https://www.googleapis.com/drive/v3/about?fields=storageQuota",
                 headers={"Authorization": f"Bearer {access_token}"},
@@ -207,3 +271,152 @@ class GoogleDriveService:
         except Exception:
             return False
 
+    
+    async def connect(self) -> None:
+        """
+        Check the Google Drive connection.
+        
+        Raises:
+            ValueError: If the connection is not valid
+        """
+        if not await self.verify_connection():
+            raise ValueError("Conexão com Google Drive inválida. Reconecte sua conta Google.")
+    
+    async def mkdir(self, name: str, parent_id: Optional[str] = None) -> str:
+        """Create a folder and return its ID."""
+        folder = await self.create_folder(name, parent_id)
+        return folder["id"]
+    
+    async def exists(self, name: str, folder_id: Optional[str] = None) -> bool:
+        """
+        Check whether a file with this name exists in a folder.
+        
+        Args:
+            name: File name
+            folder_id: Folder ID (None for the root)
+            
+        Returns:
+            True if a non-trashed file with the name exists
+        """
+        escaped = name.replace("\\", "\\\\").replace("'", "\\'")
+        query = f"name = '{escaped}' and '{folder_id or 'root'}' in parents and trashed = false"
+        params = {"q": query, "fields": "files(id)", "pageSize": 1}
+        access_token = await self._get_access_token()
+        
+        async with httpx.AsyncClient(event_hooks=httpx_event_hooks("google_drive")) as client:
+            response = await client.get(
+                "https://www.googleapis.com/drive/v3/files",
+                headers={"Authorization": f"Bearer {access_token}"},
+                params=params,
+            )
+            
+            if response.status_code == 401:
+                access_token = await self._get_access_token(force_refresh=True)
+                response = await client.get(
+                    "https://www.googleapis.com/drive/v3/files",
+                    headers={"Authorization": f"Bearer {access_token}"},
+                    params=params,
+                )
+            
+            response.raise_for_status()
+            return bool(response.json().get("files"))
+    
+    async def delete(self, file_id: str) -> None:
+        """
+        Delete a file (e.g. a corrupted upload).
+        
+        Args:
+            file_id: File ID
+        """
+        access_token = await self._get_access_token()
+        
+        async with httpx.AsyncClient(event_hooks=httpx_event_hooks("google_drive")) as client:
+            response = await client.delete(
+                f"https://www.googleapis.com/drive/v3/files/{file_id}",
+                headers={"Authorization": f"Bearer {access_token}"},
+            )
+            
+            if response.status_code == 401:
+                access_token = await self._get_access_token(force_refresh=True)
+                response = await client.delete(
+                    f"https://www.googleapis.com/drive/v3/files/{file_id}",
+                    headers={"Authorization": f"Bearer {access_token}"},
+                )
+            
+            if response.status_code != 404:
+                response.raise_for_status()
+    
+    async def upload_stream(
+        self,
+        stream: AsyncIterator[bytes],
+        name: str,
+        folder_id: Optional[str] = None,
+        mime_type: str = "application/octet-stream",
+        size: Optional[int] = None,
+        modified: Optional[datetime] = None,
+        properties: Optional[dict] = None,
+    ) -> dict:
+        """
+        Upload a file from a stream of chunks.
+        
+        Small files (and files of unknown size) are buffered and sent with a
+        single multipart request. Larger files go through a resumable upload
+        session and are streamed without being held in memory.
+        
+        Args:
+            stream: File content
+            name: File name
+            folder_id: Optional folder ID to upload to
+            mime_type: MIME type of the file
+            size: Size in bytes, if known
+            modified: Optional modification time to set on the file
+            properties: Optional appProperties to store with the file
+            
+        Returns:
+            Dictionary with file ID, md5Checksum and other metadata
+        """
+        if not size or size <= MULTIPART_UPLOAD_MAX_BYTES:
+            file_data = b"".join([chunk async for chunk in stream])
+            return await self.upload_file(file_data, name, folder_id, mime_type, modified, properties)
+        
+        metadata = self._file_metadata(name, folder_id, mime_type, modified, properties)
+        
+        access_token = await self._get_access_token()
+        
+        async with httpx.AsyncClient(
+            timeout=httpx.Timeout(60.0, write=300.0),
+            event_hooks=httpx_event_hooks("google_drive"),
+        ) as client:
+            # Start the resumable session (the stream is only consumed once
+            # the session exists, so a token refresh can still be retried here)
+            def start_session(token: str):
+                return client.post(
+                    f"https://www.googleapis.com/upload/drive/v3/files?uploadType=resumable&fields={UPLOAD_RESPONSE_FIELDS}",
+                    headers={
+                        "Authorization": f"Bearer {token}",
+                        "Content-Type": "application/json; charset=UTF-8",
+                        "X-Upload-Content-Type": mime_type,
+                        "X-Upload-Content-Length": str(size),
+                    },
+                    json=metadata,
+                )
+            
+            response = await start_session(access_token)
+            if response.status_code == 401:
+                access_token = await self._get_access_token(force_refresh=True)
+                response = await start_session(access_token)
+            
+            response.raise_for_status()
+            session_url = response.headers["Location"]
+            
+            response = await client.put(
+                session_url,
+                headers={
+                    "Content-Type": mime_type,
+                    "Content-Length": str(size),
+                },
+                content=stream,
+            )
+            
+            response.raise_for_status()
+            return response.json()
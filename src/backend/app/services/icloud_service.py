@@ -1,25 +1,94 @@
 """iCloud service for photo operations."""
-from typing import Optional, List, Dict
-import httpx
-from app.services.credential_service import CredentialService
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Callable, Any, AsyncIterator
+from app.config import settings
+from app.services.credential_service import CredentialService, CredentialContext
+from app.instrumentation.collectors import observe_external_call
+from app.instrumentation.stages import METADATA, time_stage
+from app.transfer.mime import EXTENSIONS, mime_from_uti
+from app.transfer.providers import (
+    DEFAULT_CHUNK_SIZE,
+    EDITED,
+    LIVE_VIDEO,
+    ORIGINAL,
+    PhotoSource,
+    SourceItem,
+    resource_item_id,
+    split_resource_id,
+)
 
+# CloudKit fields of the non-original resources of an asset, as (record,
+# field prefix). The listing already fetched both records of every asset
+# (CPLMaster and CPLAsset); pyicloud keeps them on the PhotoAsset, but its
+# ``versions`` only exposes the original and the thumbnails.
+_RESOURCE_FIELDS = {
+    EDITED: (("asset", "resJPEGFull"), ("asset", "resVidFull")),
+    LIVE_VIDEO: (("master", "resOriginalVidCompl"),),
+}
+# Fallback: version keys used by pyicloud forks that expose these resources
+_RESOURCE_VERSIONS = {
+    EDITED: ("adjusted", "edited"),
+    LIVE_VIDEO: ("originalVideo", "original_video", "live_video"),
+}
+_RESOURCE_DEFAULT_MIME_TYPES = {EDITED: "image/jpeg", LIVE_VIDEO: "video/quicktime"}
 
-class ICloudService:
+
+# pyicloud is fully synchronous and its sessions are not thread-safe, so all
+# blocking iCloud I/O runs on a bounded set of single-threaded executors. A
+# user is always pinned to the same executor (per-user affinity), which keeps
+# calls for one session serialized while different users transfer in parallel.
+_io_executors: List[ThreadPoolExecutor] = []
+_io_executors_lock = threading.Lock()
+
+
+def _get_io_executor(user_id: int) -> ThreadPoolExecutor:
+    """Get the iCloud I/O executor assigned to a user."""
+    if not _io_executors:
+        with _io_executors_lock:
+            if not _io_executors:
+                workers = max(1, settings.ICLOUD_IO_WORKERS)
+                _io_executors.extend(
+                    ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"icloud-io-{i}")
+                    for i in range(workers)
+                )
+    return _io_executors[user_id % len(_io_executors)]
+
+
+def shutdown_io_executors(wait: bool = True) -> None:
+    """Shut down the iCloud I/O executors (called on worker shutdown)."""
+    with _io_executors_lock:
+        for executor in _io_executors:
+            executor.shutdown(wait=wait)
+        _io_executors.clear()
+
+
+class ICloudService(PhotoSource):
     """Service for iCloud photo operations."""
     
-    def __init__(self, db_session, user_id: int):
+    def __init__(self, db_session, user_id: int, credentials: Optional[CredentialContext] = None):
         """
         Initialize iCloud service.
         
         Args:
             db_session: Database session
             user_id: User ID
+            credentials: Preloaded credential context (skips the database lookup)
         """
         self.db = db_session
         self.user_id = user_id
         self.credential_service = CredentialService(db_session)
         self._apple_id: Optional[str] = None
         self._password: Optional[str] = None
+        if credentials is not None and credentials.has_icloud:
+            self._apple_id = credentials.apple_id
+            self._password = credentials.icloud_password
+        self._api = None
+        self._photos: Optional[list] = None
+        self._photos_by_id: Dict[str, Any] = {}
     
     def _get_credentials(self) -> tuple[str, str]:
         """
@@ -56,69 +125,230 @@ class ICloudService:
         
         return self._apple_id, self._password
     
+    async def _run_blocking(self, func: Callable, *args) -> Any:
+        """
+        Run a blocking pyicloud call on this user's I/O executor.
+        
+        Args:
+            func: Blocking callable
+            *args: Positional arguments for the callable
+            
+        Returns:
+            Result of the callable
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _get_io_executor(self.user_id),
+            functools.partial(self._timed_call, func, *args),
+        )
+    
+    @staticmethod
+    def _timed_call(func: Callable, *args) -> Any:
+        """Call func on the I/O thread and record its latency and outcome."""
+        operation = getattr(func, "__name__", "call").strip("_").removesuffix("_sync")
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            return func(*args)
+        except Exception as e:
+            status = type(e).__name__
+            raise
+        finally:
+            observe_external_call("icloud", operation, status, time.perf_counter() - start)
+    
+    def _connect(self):
+        """
+        Connect to iCloud, reusing the session for the lifetime of the service.
+        
+        Must be called from the I/O executor.
+        
+        Raises:
+            NotImplementedError: If pyicloud is not installed
+            ValueError: If 2FA is required
+        """
+        if self._api is not None:
+            return self._api
+        
+        apple_id, password = self._apple_id, self._password
+        
+        try:
+            from pyicloud import PyiCloudService
+        except ImportError:
+            raise NotImplementedError(
+                "Biblioteca pyicloud não instalada. "
+                "Instale com: pip install pyicloud"
+            )
+        
+        api = PyiCloudService(apple_id, password)
+        
+        # Check if 2FA is required
+        if api.requires_2sa:
+            raise ValueError(
+                "Autenticação de dois fatores (2FA) é necessária. "
+                "Por favor, autentique via dispositivo Apple primeiro."
+            )
+        
+        self._api = api
+        return api
+    
+    def _load_photos(self) -> list:
+        """
+        Enumerate the photo library once and cache it by ID.
+        
+        Must be called from the I/O executor.
+        """
+        if self._photos is None:
+            api = self._connect()
+            self._photos = list(api.photos.all)
+            self._photos_by_id = {p.id: p for p in self._photos}
+        return self._photos
+    
+    @staticmethod
+    def _find_resource(photo, resource: str) -> Optional[Dict]:
+        """
+        Locate an asset resource in the records the listing already fetched.
+        
+        Args:
+            photo: pyicloud PhotoAsset
+            resource: ORIGINAL, EDITED or LIVE_VIDEO
+            
+        Returns:
+            ``version`` (pyicloud version key) or ``url``, with ``size``,
+            ``type`` (UTI) and ``filename`` when known; None if the asset
+            lacks the resource
+        """
+        if resource == ORIGINAL:
+            return {"version": "original"}
+        
+        records = {
+            "master": getattr(photo, "_master_record", None) or {},
+            "asset": getattr(photo, "_asset_record", None) or {},
+        }
+        for record, prefix in _RESOURCE_FIELDS.get(resource, ()):
+            fields = records[record].get("fields") or {}
+            res = (fields.get(f"{prefix}Res") or {}).get("value") or {}
+            if res.get("downloadURL"):
+                return {
+                    "url": res["downloadURL"],
+                    "size": res.get("size"),
+                    "type": (fields.get(f"{prefix}FileType") or {}).get("value"),
+                    "filename": None,
+                }
+        
+        versions = getattr(photo, "versions", None) or {}
+        for key in _RESOURCE_VERSIONS.get(resource, ()):
+            if key in versions:
+                return {"version": key, **versions[key]}
+        return None
+    
+    @classmethod
+    def _photo_resources(cls, photo) -> List[Dict]:
+        """
+        Describe the edited and Live Photo video resources of an asset.
+        
+        Read from the CloudKit records already fetched by the listing, so no
+        request is made per resource.
+        """
+        stem = photo.filename.rsplit(".", 1)[0]
+        resources = []
+        for resource in (EDITED, LIVE_VIDEO):
+            version = cls._find_resource(photo, resource)
+            if version is None:
+                continue
+            mime_type = mime_from_uti(version.get("type")) or _RESOURCE_DEFAULT_MIME_TYPES[resource]
+            filename = version.get("filename")
+            if not filename or filename == photo.filename:
+                # Live Photo videos keep the photo's name (IMG_0001.MOV)
+                suffix = "" if resource == LIVE_VIDEO else f"_{resource}"
+                filename = f"{stem}{suffix}.{EXTENSIONS.get(mime_type, 'bin').upper()}"
+            resources.append({
+                "resource": resource,
+                "filename": filename,
+                "size": version.get("size") or 0,
+                "mime_type": mime_type,
+            })
+        return resources
+    
+    @classmethod
+    def _photo_to_dict(cls, photo) -> Dict:
+        """Convert a pyicloud photo asset to a metadata dictionary."""
+        return {
+            "id": photo.id,
+            "filename": photo.filename,
+            "size": getattr(photo, "size", 0),
+            "created": getattr(photo, "created", None),
+            "modified": getattr(photo, "modified", None),
+            "mime_type": getattr(photo, "mime_type", None),
+            "resources": cls._photo_resources(photo),
+        }
+    
+    def _list_photos_sync(self, limit: int, offset: int) -> List[Dict]:
+        """Blocking implementation of list_photos."""
+        photos_list = self._load_photos()
+        return [self._photo_to_dict(p) for p in photos_list[offset:offset + limit]]
+    
+    def _download_photo_sync(self, photo_id: str) -> bytes:
+        """Blocking implementation of download_photo."""
+        self._load_photos()
+        photo = self._photos_by_id.get(photo_id)
+        
+        if not photo:
+            raise ValueError(f"Foto com ID {photo_id} não encontrada no iCloud")
+        
+        return photo.download().read()
+    
+    def _open_download_sync(self, photo_id: str, chunk_size: int):
+        """Start a streamed download of an asset resource and return its chunk iterator."""
+        self._load_photos()
+        asset_id, resource = split_resource_id(photo_id)
+        photo = self._photos_by_id.get(asset_id)
+        
+        if not photo:
+            raise ValueError(f"Foto com ID {asset_id} não encontrada no iCloud")
+        
+        found = self._find_resource(photo, resource)
+        if found is None:
+            response = None
+        elif "version" in found:
+            response = photo.download(found["version"])
+        else:
+            # Same request pyicloud's download() makes for a version URL
+            response = photo._service.session.get(found["url"], stream=True)
+        if response is None:
+            raise ValueError(f"Recurso {resource} não disponível para a foto {asset_id}")
+        
+        return response.iter_content(chunk_size=chunk_size)
+    
+    def _get_photo_metadata_sync(self, photo_id: str) -> Dict:
+        """Blocking implementation of get_photo_metadata."""
+        self._load_photos()
+        photo = self._photos_by_id.get(split_resource_id(photo_id)[0])
+        
+        if not photo:
+            return {}
+        
+        metadata = self._photo_to_dict(photo)
+        del metadata["id"]
+        return metadata
+    
     async def list_photos(self, limit: int = 100, offset: int = 0) -> List[Dict]:
         """
         List photos from iCloud.
         
+        The library is enumerated once per service instance and paginated
+        from the cached listing on subsequent calls.
+        
         Args:
             limit: Maximum number of photos to return
             offset: Offset for pagination
             
         Returns:
             List of photo dictionaries with metadata
-            
-        Note:
-            This is a placeholder implementation. In production, this would
-            use the iCloud API (pyicloud library or similar) to actually
-            connect and list photos.
         """
-        apple_id, password = self._get_credentials()
+        self._get_credentials()
         
         try:
-            # Try to import pyicloud
-            try:
-                from pyicloud import PyiCloudService
-            except ImportError:
-                # If pyicloud is not installed, raise informative error
-                raise NotImplementedError(
-                    "Biblioteca pyicloud não instalada. "
-                    "Instale com: pip install pyicloud"
-                )
-            
-            # Connect to iCloud
-            api = PyiCloudService(apple_id, password)
-            
-            # Check if 2FA is required
-            if api.requires_2sa:
-                raise ValueError(
-                    "Autenticação de dois fatores (2FA) é necessária. "
-                    "Por favor, autentique via dispositivo Apple primeiro."
-                )
-            
-            # Get photos
-            photos = api.photos.all
-            
-            # Convert to list and apply pagination
-            photos_list = list(photos)
-            total = len(photos_list)
-            
-            # Apply pagination
-            paginated_photos = photos_list[offset:offset + limit]
-            
-            # Convert to dictionary format
-            result = []
-            for photo in paginated_photos:
-                result.append({
-                    "id": photo.id,
-                    "filename": photo.filename,
-                    "size": getattr(photo, "size", 0),
-                    "created": getattr(photo, "created", None),
-                    "modified": getattr(photo, "modified", None),
-                    "mime_type": getattr(photo, "mime_type", "image/jpeg"),
-                })
-            
-            return result
-            
+            return await self._run_blocking(self._list_photos_sync, limit, offset)
         except NotImplementedError:
             # If pyicloud is not available, raise to inform user
             raise
@@ -141,33 +371,12 @@ class ICloudService:
         Raises:
             ValueError: If photo cannot be downloaded
         """
-        apple_id, password = self._get_credentials()
+        self._get_credentials()
         
         try:
-            from pyicloud import PyiCloudService
-            
-            # Connect to iCloud
-            api = PyiCloudService(apple_id, password)
-            
-            # Find photo by ID
-            photo = None
-            for p in api.photos.all:
-                if p.id == photo_id:
-                    photo = p
-                    break
-            
-            if not photo:
-                raise ValueError(f"Foto com ID {photo_id} não encontrada no iCloud")
-            
-            # Download photo
-            photo_data = photo.download().read()
-            return photo_data
-            
-        except ImportError:
-            raise NotImplementedError(
-                "Biblioteca pyicloud não instalada. "
-                "Instale com: pip install pyicloud"
-            )
+            return await self._run_blocking(self._download_photo_sync, photo_id)
+        except NotImplementedError:
+            raise
         except Exception as e:
             raise ValueError(f"Erro ao baixar foto do iCloud: {str(e)}")
     
@@ -181,31 +390,11 @@ class ICloudService:
         Returns:
             Dictionary with photo metadata (filename, size, date, mime_type, etc.)
         """
-        apple_id, password = self._get_credentials()
+        self._get_credentials()
         
         try:
-            from pyicloud import PyiCloudService
-            
-            # Connect to iCloud
-            api = PyiCloudService(apple_id, password)
-            
-            # Find photo by ID
-            photo = None
-            for p in api.photos.all:
-                if p.id == photo_id:
-                    photo = p
-                    break
-            
-            if not photo:
-                return {}
-            
-            return {
-                "filename": photo.filename,
-                "size": getattr(photo, "size", 0),
-                "created": getattr(photo, "created", None),
-                "modified": getattr(photo, "modified", None),
-                "mime_type": getattr(photo, "mime_type", "image/jpeg"),
-            }
+            with time_stage(METADATA):
+                return await self._run_blocking(self._get_photo_metadata_sync, photo_id)
         except Exception:
             return {}
     
@@ -223,18 +412,17 @@ class ICloudService:
                 return False
             
             try:
-                from pyicloud import PyiCloudService
-                
-                # Try to connect to iCloud
-                api = PyiCloudService(apple_id, password)
-                
                 # If 2FA is required, credentials are valid but need 2FA
                 # For now, we consider it valid if we can connect
+                await self._run_blocking(self._connect)
                 return True
                 
-            except ImportError:
+            except NotImplementedError:
                 # If pyicloud is not installed, just check if credentials exist
                 return bool(apple_id and password)
+            except ValueError:
+                # 2FA pending - credentials themselves were accepted
+                return True
             except Exception:
                 # Authentication failed
                 return False
@@ -250,25 +438,93 @@ class ICloudService:
             Total number of photos
         """
         try:
-            apple_id, password = self._get_credentials()
-            
-            try:
-                from pyicloud import PyiCloudService
-                
-                # Connect to iCloud
-                api = PyiCloudService(apple_id, password)
-                
-                # Get all photos and count
-                photos = api.photos.all
-                return len(list(photos))
-                
-            except ImportError:
-                # If pyicloud is not installed, return 0
-                return 0
-            except Exception as e:
-                # Error connecting, return 0
-                return 0
-                
+            self._get_credentials()
+            photos = await self._run_blocking(self._load_photos)
+            return len(photos)
         except Exception:
             return 0
-
+    
+    @staticmethod
+    def _to_source_item(metadata: Dict) -> SourceItem:
+        """Convert a metadata dictionary to a source item (with its companion resources)."""
+        asset_id = metadata["id"]
+        return SourceItem(
+            id=asset_id,
+            filename=metadata.get("filename") or asset_id,
+            size=metadata.get("size") or 0,
+            mime_type=metadata.get("mime_type"),
+            created=metadata.get("created"),
+            modified=metadata.get("modified"),
+            companions=[
+                SourceItem(
+                    id=resource_item_id(asset_id, resource["resource"]),
+                    filename=resource["filename"],
+                    size=resource["size"],
+                    mime_type=resource["mime_type"],
+                    created=metadata.get("created"),
+                    modified=metadata.get("modified"),
+                    resource=resource["resource"],
+                    asset_id=asset_id,
+                )
+                for resource in metadata.get("resources", ())
+            ],
+        )
+    
+    async def connect(self) -> None:
+        """
+        Log in to iCloud.
+        
+        Raises:
+            ValueError: If credentials are invalid
+        """
+        if not await self.verify_credentials():
+            raise ValueError("Credenciais do iCloud inválidas. Verifique suas credenciais.")
+    
+    async def count(self) -> Optional[int]:
+        """Total number of photos (None if unknown)."""
+        return await self.get_total_photos_count() or None
+    
+    async def enumerate(self, batch_size: int = 50, offset: int = 0) -> AsyncIterator[List[SourceItem]]:
+        """Enumerate photos in batches from the cached listing."""
+        while True:
+            photos = await self.list_photos(limit=batch_size, offset=offset)
+            if not photos:
+                break
+            yield [self._to_source_item(p) for p in photos]
+            offset += len(photos)
+            if len(photos) < batch_size:
+                break
+    
+    async def stat(self, item_id: str) -> Optional[SourceItem]:
+        """Describe a photo, or one of its companion resources."""
+        asset_id, resource = split_resource_id(item_id)
+        metadata = await self.get_photo_metadata(asset_id)
+        if not metadata:
+            return None
+        item = self._to_source_item({"id": asset_id, **metadata})
+        if resource == ORIGINAL:
+            return item
+        return next((c for c in item.companions if c.resource == resource), None)
+    
+    async def open_stream(self, item: SourceItem, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """
+        Stream a photo from iCloud without buffering it whole.
+        
+        Raises:
+            ValueError: If the photo cannot be downloaded
+        """
+        self._get_credentials()
+        
+        try:
+            chunks = await self._run_blocking(self._open_download_sync, item.id, chunk_size)
+        except NotImplementedError:
+            raise
+        except Exception as e:
+            raise ValueError(f"Erro ao baixar foto do iCloud: {str(e)}")
+        
+        while True:
+            chunk = await self._run_blocking(next, chunks, None)
+            if chunk is None:
+                break
+            if chunk:
+                yield chunk
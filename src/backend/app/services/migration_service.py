@@ -1,27 +1,42 @@
 """Migration service."""
 from typing import Optional
 from datetime import datetime
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.failed_item import FailedItem
 from app.models.migration import Migration
+from app.models.outbox_message import OutboxMessage
 from app.schemas.migration import MigrationCreate
-from app.repositories.migration_repository import MigrationRepository
-from app.config import settings
+from app.repositories.credential_repository import AsyncCredentialRepository
+from app.repositories.failed_item_repository import AsyncFailedItemRepository
+from app.repositories.migration_repository import AsyncMigrationRepository
+from app.repositories.outbox_repository import OutboxRepository
+from app.instrumentation.profiler import normalize_profile_request
+from app.transfer.export import resolve_export_path
+from app.transfer.providers import parse_resources
 import logging
 
 logger = logging.getLogger(__name__)
 
 
 class MigrationService:
-    """Service for managing migrations."""
+    """
+    Service for managing migrations.
     
-    def __init__(self, db: Session):
-        """Initialize service with database session."""
+    Used by the API with an AsyncSession so database calls do not block the
+    event loop; workers access migrations through MigrationRepository.
+    """
+    
+    def __init__(self, db: AsyncSession):
+        """Initialize service with async database session."""
         self.db = db
-        self.repository = MigrationRepository(db)
+        self.repository = AsyncMigrationRepository(db)
+        self.credential_repository = AsyncCredentialRepository(db)
+        self.failed_item_repository = AsyncFailedItemRepository(db)
+        self.outbox = OutboxRepository(db)
     
-    def create_migration(self, user_id: int, migration_data: MigrationCreate) -> Migration:
+    async def create_migration(self, user_id: int, migration_data: MigrationCreate) -> Migration:
         """
-        Create a new migration.
+        Create a new migration and record its background job in the outbox.
         
         Args:
             user_id: User ID
@@ -31,95 +46,195 @@ class MigrationService:
             Created migration
             
         Raises:
-            ValueError: If credentials are not configured
+            ValueError: If credentials are not configured or options are invalid
         """
-        from app.services.credential_service import CredentialService
+        options = dict(migration_data.options or {})
+        # Only set by retry_failed_items
+        options.pop("retry_of", None)
         
-        # Verify credentials exist before creating migration
-        credential_service = CredentialService(self.db)
+        migration = await self._new_migration(user_id, options)
+        
+        # The migration row and its job are committed in one transaction;
+        # the outbox dispatcher publishes the job afterwards
+        self.db.add(migration)
+        await self.db.flush()
+        self.outbox.add(OutboxMessage.for_migration(migration.id, user_id))
+        await self.db.commit()
+        await self.db.refresh(migration)
+        
+        return migration
+    
+    async def _new_migration(self, user_id: int, options: dict) -> Migration:
+        """
+        Validate migration options and build an unsaved migration.
         
-        icloud_credential = credential_service.repository.find_by_user_and_service(user_id, "icloud")
-        google_credential = credential_service.repository.find_by_user_and_service(user_id, "google_drive")
+        Raises:
+            ValueError: If credentials are not configured or options are invalid
+        """
+        source = options.setdefault("source", "icloud")
+        
+        if source == "local_export":
+            # Fail fast on paths outside LOCAL_EXPORT_ROOT or missing exports
+            resolve_export_path(options.get("export_path", ""))
+        elif source != "icloud":
+            raise ValueError(f"Origem de migração inválida: {source}")
+        
+        if "profile" in options:
+            options["profile"] = normalize_profile_request(options["profile"])
+        
+        if "resources" in options:
+            options["resources"] = parse_resources(options["resources"])
+        
+        # Verify credentials exist before creating migration
+        credentials = {
+            c.service_type: c
+            for c in await self.credential_repository.find_by_user_id(user_id)
+        }
+        icloud_credential = credentials.get("icloud")
+        google_credential = credentials.get("google_drive")
         
-        if not icloud_credential or not icloud_credential.encrypted_credentials:
+        if source == "icloud" and (not icloud_credential or not icloud_credential.encrypted_credentials):
             raise ValueError("Credenciais do iCloud não encontradas. Configure suas credenciais primeiro.")
         
         if not google_credential or not google_credential.encrypted_credentials:
             raise ValueError("Credenciais do Google Drive não encontradas. Conecte sua conta Google primeiro.")
         
-        migration = Migration(
+        return Migration(
             user_id=user_id,
             status="pending",
             total_photos=0,
             migrated_photos=0,
             failed_photos=0,
+            options=options,
         )
+    
+    async def get_failed_items(self, migration_id: int, user_id: int, limit: int = 100) -> Optional[list[FailedItem]]:
+        """
+        Get the failed items of a migration.
         
-        migration = self.repository.create(migration)
-        
-        # Queue background job using QStash or Celery
-        if settings.QSTASH_TOKEN:
-            # Use QStash
-            try:
-                from app.services.qstash_service import get_qstash_service
-                import asyncio
-                
-                qstash_service = get_qstash_service()
-                # QStash service needs to be async, but we're in sync context
-                # We'll use asyncio to run it
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                try:
-                    loop.run_until_complete(
-                        qstash_service.publish_migration_task(migration.id, user_id)
-                    )
-                    logger.info(f"Migration {migration.id} queued via QStash")
-                finally:
-                    loop.close()
-            except Exception as e:
-                logger.error(f"Failed to queue migration via QStash: {str(e)}")
-                # Fallback to Celery if available
-                try:
-                    from app.workers.tasks import process_migration_task
-                    process_migration_task.delay(migration.id, user_id)
-                    logger.info(f"Migration {migration.id} queued via Celery (fallback)")
-                except Exception as celery_error:
-                    logger.error(f"Failed to queue migration via Celery: {str(celery_error)}")
-                    raise ValueError("Failed to queue migration task")
-        else:
-            # Use Celery (legacy)
-            try:
-                from app.workers.tasks import process_migration_task
-                process_migration_task.delay(migration.id, user_id)
-                logger.info(f"Migration {migration.id} queued via Celery")
-            except Exception as e:
-                logger.error(f"Failed to queue migration via Celery: {str(e)}")
-                raise ValueError("Failed to queue migration task. Configure QSTASH_TOKEN or Celery.")
+        Returns:
+            Failed items, or None if the migration is not found
+        """
+        migration = await self.get_migration(migration_id, user_id)
+        if not migration:
+            return None
+        return await self.failed_item_repository.find_by_migration_id(migration.id, limit=limit)
+    
+    async def retry_failed_items(self, migration_id: int, user_id: int) -> Optional[Migration]:
+        """
+        Create a migration that transfers only the failed items of another.
         
+        The new migration uses the same source and reads the items from the
+        failed_items table instead of enumerating the library again. Items
+        already covered by an earlier retry are not included.
+        
+        Args:
+            migration_id: Migration whose failed items are retried
+            user_id: User ID
+            
+        Returns:
+            The retry migration, or None if the migration is not found
+            
+        Raises:
+            ValueError: If the migration is still running, has no failed
+                items left to retry, or credentials are not configured
+        """
+        migration = await self.get_migration(migration_id, user_id)
+        if not migration:
+            return None
+        
+        if migration.status in ("pending", "in_progress"):
+            raise ValueError("A migração ainda está em andamento")
+        
+        failed_items = await self.failed_item_repository.find_by_migration_id(migration.id, unretried_only=True)
+        if not failed_items:
+            raise ValueError("Nenhum item com falha para reprocessar")
+        
+        # Same source as the original migration
+        options = {
+            key: value
+            for key, value in (migration.options or {}).items()
+            if key in ("source", "export_path")
+        }
+        options["retry_of"] = migration.id
+        retry = await self._new_migration(user_id, options)
+        retry.total_photos = len(failed_items)
+        
+        # The items are linked in the same transaction as the job, so the
+        # worker always sees them
+        self.db.add(retry)
+        await self.db.flush()
+        await self.failed_item_repository.mark_retried([item.id for item in failed_items], retry.id)
+        self.outbox.add(OutboxMessage.for_migration(retry.id, user_id))
+        await self.db.commit()
+        await self.db.refresh(retry)
+        
+        return retry
+    
+    async def request_profile(self, migration_id: int, seconds: Optional[int] = None) -> Optional[Migration]:
+        """
+        Ask the worker running a migration to capture a profile.
+        
+        The request is stored in the migration options; the worker picks it
+        up the next time it refreshes the migration.
+        
+        Args:
+            migration_id: Migration ID
+            seconds: Length of the profiling window (defaults to PROFILE_DEFAULT_SECONDS)
+            
+        Returns:
+            Updated migration, or None if not found
+        """
+        migration = await self.repository.find_by_id(migration_id)
+        if not migration:
+            return None
+        
+        request = normalize_profile_request({"seconds": seconds} if seconds else True)
+        request["requested_at"] = datetime.utcnow().isoformat()
+        
+        # Assign a new dict so SQLAlchemy detects the change to the JSON column
+        migration.options = {**(migration.options or {}), "profile": request}
+        await self.db.commit()
+        await self.db.refresh(migration)
         return migration
     
-    def get_migration(self, migration_id: int, user_id: int) -> Optional[Migration]:
+    async def get_migration(self, migration_id: int, user_id: int) -> Optional[Migration]:
         """Get migration by ID."""
-        migration = self.repository.find_by_id(migration_id)
+        migration = await self.repository.find_by_id(migration_id)
         
         if migration and migration.user_id == user_id:
             return migration
         
         return None
     
-    def get_user_migrations(
+    async def get_user_migrations(
         self,
         user_id: int,
         status: Optional[str] = None,
         page: int = 1,
         limit: int = 20,
-    ) -> tuple[list[Migration], int]:
-        """Get user migrations with pagination."""
-        return self.repository.find_by_user_id(user_id, status, page, limit)
+        include_total: bool = True,
+    ) -> tuple[list[Migration], Optional[int]]:
+        """Get user migrations with offset pagination."""
+        return await self.repository.find_by_user_id(user_id, status, page, limit, include_total)
+    
+    async def count_user_migrations(self, user_id: int, status: Optional[str] = None) -> int:
+        """Count user migrations."""
+        return await self.repository.count_by_user_id(user_id, status)
+    
+    async def get_user_migrations_after(
+        self,
+        user_id: int,
+        status: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 20,
+    ) -> tuple[list[Migration], Optional[str]]:
+        """Get user migrations with cursor pagination."""
+        return await self.repository.find_by_user_id_keyset(user_id, status, cursor, limit)
     
-    def get_migration_progress(self, migration_id: int, user_id: int) -> Optional[dict]:
+    async def get_migration_progress(self, migration_id: int, user_id: int) -> Optional[dict]:
         """Get migration progress."""
-        migration = self.get_migration(migration_id, user_id)
+        migration = await self.get_migration(migration_id, user_id)
         
         if not migration:
             return None
@@ -141,65 +256,33 @@ class MigrationService:
             "estimated_time_remaining_minutes": None,  # Would be calculated
         }
     
-    def pause_migration(self, migration_id: int, user_id: int) -> bool:
+    async def pause_migration(self, migration_id: int, user_id: int) -> bool:
         """Pause a migration."""
-        migration = self.get_migration(migration_id, user_id)
+        migration = await self.get_migration(migration_id, user_id)
         
         if not migration or migration.status != "in_progress":
             return False
         
         migration.status = "paused"
-        self.db.commit()
+        await self.db.commit()
         return True
     
-    def resume_migration(self, migration_id: int, user_id: int) -> bool:
+    async def resume_migration(self, migration_id: int, user_id: int) -> bool:
         """Resume a paused migration."""
-        migration = self.get_migration(migration_id, user_id)
+        migration = await self.get_migration(migration_id, user_id)
         
         if not migration or migration.status != "paused":
             return False
         
         migration.status = "pending"
-        self.db.commit()
-        
-        # Queue background job using QStash or Celery
-        if settings.QSTASH_TOKEN:
-            # Use QStash
-            try:
-                from app.services.qstash_service import get_qstash_service
-                import asyncio
-                
-                qstash_service = get_qstash_service()
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                try:
-                    loop.run_until_complete(
-                        qstash_service.publish_migration_task(migration.id, user_id)
-                    )
-                    logger.info(f"Migration {migration.id} resumed via QStash")
-                finally:
-                    loop.close()
-            except Exception as e:
-                logger.error(f"Failed to resume migration via QStash: {str(e)}")
-                # Fallback to Celery
-                try:
-                    from app.workers.tasks import process_migration_task
-                    process_migration_task.delay(migration.id, user_id)
-                except Exception:
-                    pass
-        else:
-            # Use Celery (legacy)
-            try:
-                from app.workers.tasks import process_migration_task
-                process_migration_task.delay(migration.id, user_id)
-            except Exception:
-                pass
+        self.outbox.add(OutboxMessage.for_migration(migration.id, user_id))
+        await self.db.commit()
         
         return True
     
-    def cancel_migration(self, migration_id: int, user_id: int) -> bool:
+    async def cancel_migration(self, migration_id: int, user_id: int) -> bool:
         """Cancel a migration."""
-        migration = self.get_migration(migration_id, user_id)
+        migration = await self.get_migration(migration_id, user_id)
         
         if not migration or migration.status in ("completed", "failed"):
             return False
@@ -207,8 +290,6 @@ class MigrationService:
         migration.status = "failed"
         migration.error_message = "Cancelled by user"
         migration.completed_at = datetime.utcnow()
-        self.db.commit()
+        await self.db.commit()
         
         return True
-
-
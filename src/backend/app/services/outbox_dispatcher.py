@@ -0,0 +1,215 @@
+"""Outbox dispatcher for migration background jobs."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.outbox_message import OutboxMessage
+from app.repositories.outbox_repository import OutboxRepository
+from app.services.fair_scheduler import FairScheduler
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxDispatcher:
+    """Publishes pending outbox messages to QStash or Celery."""
+    
+    def __init__(self, db: Session):
+        """Initialize dispatcher with database session."""
+        self.db = db
+        self.repository = OutboxRepository(db)
+        self.scheduler = FairScheduler(db)
+    
+    async def dispatch_pending(self, limit: Optional[int] = None) -> int:
+        """
+        Publish one batch of due outbox messages.
+        
+        Expired work-unit leases are re-enqueued first. Among the due messages,
+        the fair scheduler picks which ones to publish within the global and
+        per-user capacity; the rest stay pending for the next run. Successful
+        messages stay dispatched; failed ones are rescheduled with
+        exponential backoff until OUTBOX_MAX_ATTEMPTS, after which the message
+        and its migration are marked as failed.
+        
+        Args:
+            limit: Maximum number of messages to publish (defaults to OUTBOX_BATCH_SIZE)
+            
+        Returns:
+            Number of messages dispatched
+        """
+        # The session is synchronous: its work runs in a thread so the
+        # caller's event loop (the API's, for background tasks) is not blocked
+        jobs = await asyncio.to_thread(self._claim, limit or settings.OUTBOX_BATCH_SIZE)
+        if not jobs:
+            return 0
+        
+        errors = await self._publish(jobs)
+        return await asyncio.to_thread(self._record, jobs, errors)
+    
+    def _claim(self, limit: int) -> list[dict]:
+        """
+        Pick the messages to publish and mark them as dispatched.
+        
+        The claim is committed before anything is published, so the row
+        locks taken by claim_due are not held during network calls and the
+        units already count as in flight for concurrent dispatchers. Messages
+        that fail to publish are put back by _record; if the process dies in
+        between, their lease expires and the units are re-enqueued.
+        
+        Returns:
+            Jobs to publish (plain dictionaries, usable after the commit)
+        """
+        if self.scheduler.requeue_expired():
+            self.db.flush()
+        
+        # Look past the first `limit` messages so one user's backlog cannot
+        # hide everybody else's from the scheduler
+        candidates = self.repository.claim_due(limit * 10)
+        messages = self.scheduler.select(candidates, limit)
+        
+        now = datetime.now(timezone.utc)
+        jobs = []
+        for message in messages:
+            message.status = "dispatched"
+            message.dispatched_at = now
+            jobs.append({
+                "id": message.id,
+                "migration_id": message.payload["migration_id"],
+                "user_id": message.payload["user_id"],
+                "deduplication_id": message.deduplication_id,
+            })
+        self.db.commit()
+        return jobs
+    
+    def _record(self, jobs: list[dict], errors: list[Optional[Exception]]) -> int:
+        """
+        Record the publish results of claimed jobs.
+        
+        Returns:
+            Number of messages dispatched
+        """
+        now = datetime.now(timezone.utc)
+        messages = {m.id: m for m in self.repository.find_by_ids([job["id"] for job in jobs])}
+        dispatched = 0
+        for job, error in zip(jobs, errors):
+            message = messages.get(job["id"])
+            if message is None:
+                continue
+            
+            message.attempts = (message.attempts or 0) + 1
+            if error is None:
+                message.last_error = None
+                dispatched += 1
+                continue
+            
+            # Not published: release the claim
+            message.dispatched_at = None
+            message.last_error = str(error)[:500]
+            if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                message.status = "failed"
+                self._fail_migration(message)
+                logger.error(
+                    f"Outbox message {message.id} for migration {message.migration_id} "
+                    f"failed after {message.attempts} attempts: {message.last_error}"
+                )
+            else:
+                backoff = min(2 ** message.attempts, 300)
+                message.status = "pending"
+                message.next_attempt_at = now + timedelta(seconds=backoff)
+                logger.warning(
+                    f"Outbox message {message.id} for migration {message.migration_id} "
+                    f"failed (attempt {message.attempts}), retrying in {backoff}s: {message.last_error}"
+                )
+        
+        self.db.commit()
+        logger.info(f"Outbox dispatched {dispatched}/{len(jobs)} messages")
+        return dispatched
+    
+    async def _publish(self, jobs: list[dict]) -> list[Optional[Exception]]:
+        """
+        Publish a batch of jobs.
+        
+        Returns:
+            One entry per job: None on success or the publish error
+        """
+        if settings.QSTASH_TOKEN:
+            from app.services.qstash_service import get_qstash_service
+            
+            qstash_service = get_qstash_service()
+            try:
+                # The timeout applies to each chunk request, so chunks that
+                # were accepted are recorded as dispatched even if a later
+                # one times out
+                results = await qstash_service.publish_batch(
+                    [
+                        {
+                            "migration_id": job["migration_id"],
+                            "user_id": job["user_id"],
+                            "deduplication_id": job["deduplication_id"],
+                        }
+                        for job in jobs
+                    ],
+                    timeout=settings.QSTASH_PUBLISH_TIMEOUT,
+                )
+            except Exception as e:
+                return [e] * len(jobs)
+            
+            return [
+                ValueError(result["error"]) if result.get("error") else None
+                for result in results
+            ]
+        
+        # Use Celery (legacy). The deduplication id doubles as the task id;
+        # Celery does not deduplicate by it, so the task checks it against
+        # the outbox before running (OutboxRepository.start_unit)
+        from app.workers.tasks import process_migration_task
+        
+        errors: list[Optional[Exception]] = []
+        for job in jobs:
+            try:
+                await asyncio.to_thread(
+                    process_migration_task.apply_async,
+                    args=(job["migration_id"], job["user_id"]),
+                    task_id=job["deduplication_id"],
+                )
+                errors.append(None)
+            except Exception as e:
+                errors.append(e)
+        return errors
+    
+    def _fail_migration(self, message: OutboxMessage) -> None:
+        """Mark the migration of an undeliverable message as failed."""
+        from app.models.migration import Migration
+        
+        migration = self.db.query(Migration).filter(Migration.id == message.migration_id).first()
+        if migration and migration.status == "pending":
+            migration.status = "failed"
+            migration.error_message = "Falha ao enfileirar a migração"
+            migration.completed_at = datetime.now(timezone.utc)
+
+
+async def flush_outbox(limit: Optional[int] = None, role: str = "api") -> int:
+    """
+    Dispatch pending outbox messages using a dedicated session.
+    
+    Used as a FastAPI background task after requests that write to the
+    outbox, and by the periodic Celery task that catches anything left
+    behind (e.g. if the API process died right after committing). Database
+    work runs in a thread, so this can be awaited on the API event loop.
+    
+    Args:
+        limit: Maximum number of messages to publish
+        role: Database pool role of the calling process
+    """
+    from app.database import get_sessionmaker
+    
+    db = get_sessionmaker(role)()
+    try:
+        return await OutboxDispatcher(db).dispatch_pending(limit)
+    except Exception as e:
+        await asyncio.to_thread(db.rollback)
+        logger.error(f"Error dispatching outbox: {str(e)}")
+        return 0
+    finally:
+        await asyncio.to_thread(db.close)
@@ -1,8 +1,12 @@
 """QStash service for background task processing."""
+import asyncio
 import json
+import os
+import urllib.parse
 import httpx
-from typing import Optional
+from typing import List, Optional
 from app.config import settings
+from app.instrumentation.collectors import httpx_event_hooks
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,17 +22,74 @@ class QStashService:
         
         self.token = settings.QSTASH_TOKEN
         self.base_url = settings.QSTASH_URL
+        # QSTASH_URL aponta para o endpoint de publish; a API v2 fica um nível acima
+        self.api_url = self.base_url.rstrip("/").rsplit("/publish", 1)[0]
         self.webhook_url = None  # Será configurado com a URL base da aplicação
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
     
     def set_webhook_url(self, base_url: str):
         """Set the webhook URL for receiving tasks."""
         self.webhook_url = f"{base_url.rstrip('/')}/api/v1/webhooks/qstash"
     
+    def _get_client(self) -> httpx.AsyncClient:
+        """
+        Get the shared HTTP client for the running event loop.
+        
+        The client keeps a pool of connections to QStash alive between
+        publishes. httpx clients are bound to the loop that created them, so
+        a new one is created if the service is used from another loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(
+                timeout=30.0,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                headers={"Authorization": f"Bearer {self.token}"},
+                event_hooks=httpx_event_hooks("qstash"),
+            )
+            self._client_loop = loop
+            
+            from app.workers.event_loop import get_loop_runner
+            get_loop_runner().add_shutdown_hook(self.aclose)
+        return self._client
+    
+    async def aclose(self):
+        """Close the shared HTTP client."""
+        if self._client is not None and self._client_loop is asyncio.get_running_loop():
+            await self._client.aclose()
+        self._client = None
+        self._client_loop = None
+    
+    @staticmethod
+    def _message_headers(
+        delay_seconds: Optional[int] = None,
+        deduplication_id: Optional[str] = None,
+    ) -> dict:
+        """Build the per-message Upstash headers."""
+        headers = {}
+        if delay_seconds:
+            headers["Upstash-Delay"] = f"{int(delay_seconds)}s"
+        if deduplication_id:
+            headers["Upstash-Deduplication-Id"] = deduplication_id
+        return headers
+    
+    @staticmethod
+    def _error_detail(error: httpx.HTTPError):
+        """Extract the most useful detail from an HTTP error."""
+        if hasattr(error, 'response') and error.response is not None:
+            try:
+                return error.response.json()
+            except Exception:
+                return error.response.text
+        return str(error)
+    
     async def publish_migration_task(
         self,
         migration_id: int,
         user_id: int,
         delay_seconds: Optional[int] = None,
+        deduplication_id: Optional[str] = None,
     ) -> dict:
         """
         Publish a migration task to QStash.
@@ -37,6 +98,7 @@ class QStashService:
             migration_id: Migration ID
             user_id: User ID
             delay_seconds: Optional delay in seconds before executing
+            deduplication_id: Optional ID used by QStash to drop duplicate publishes
             
         Returns:
             Response from QStash
@@ -49,47 +111,93 @@ class QStashService:
             "user_id": user_id,
         }
         
-        # QStash API endpoint - formato: https://qstash.upstash.io/v2/publish/{destination}
-        qstash_api_url = "https://qstash.upstash.io/v2/publish"
-        
-        # QStash precisa do destino codificado na URL
-        import urllib.parse
+        # QStash precisa do destino codificado na URL:
+        # https://qstash.upstash.io/v2/publish/{destination}
         encoded_destination = urllib.parse.quote(self.webhook_url, safe='')
-        url = f"{qstash_api_url}/{encoded_destination}"
+        url = f"{self.api_url}/publish/{encoded_destination}"
         
-        headers = {
-            "Authorization": f"Bearer {self.token}",
-            "Content-Type": "application/json",
-        }
+        headers = {"Content-Type": "application/json"}
+        headers.update(self._message_headers(delay_seconds, deduplication_id))
         
-        # Adicionar delay se especificado
-        if delay_seconds:
-            headers["Upstash-Delay"] = str(delay_seconds)
+        try:
+            response = await self._get_client().post(url, json=payload, headers=headers)
+            response.raise_for_status()
+            
+            result = response.json()
+            message_id = result.get("messageId") or result.get("id")
+            logger.info(f"Task published to QStash for migration {migration_id}: {message_id}")
+            return result
+            
+        except httpx.HTTPError as e:
+            error_detail = self._error_detail(e)
+            logger.error(f"Error publishing task to QStash: {error_detail}")
+            raise ValueError(f"Erro ao publicar tarefa no QStash: {error_detail}")
+    
+    async def publish_batch(self, messages: List[dict], timeout: Optional[float] = None) -> List[dict]:
+        """
+        Publish many migration tasks using the QStash batch endpoint.
+        
+        Messages are sent in chunks of QSTASH_BATCH_SIZE, one ``/v2/batch``
+        request per chunk over the shared client. Each chunk succeeds or
+        fails on its own: a failed or timed-out chunk does not affect the
+        chunks already accepted.
+        
+        Args:
+            messages: Dictionaries with migration_id, user_id and optionally
+                delay_seconds and deduplication_id
+            timeout: Seconds allowed for each chunk request (None = client default)
+            
+        Returns:
+            One result per message, in order. Each result has a ``messageId``
+            on success or an ``error`` describing why it was not published.
+        """
+        if not self.webhook_url:
+            raise ValueError("Webhook URL não configurado. Chame set_webhook_url() primeiro.")
+        
+        results: List[dict] = []
+        chunk_size = max(1, settings.QSTASH_BATCH_SIZE)
         
-        async with httpx.AsyncClient() as client:
+        for start in range(0, len(messages), chunk_size):
+            chunk = messages[start:start + chunk_size]
+            body = []
+            for message in chunk:
+                headers = {"Content-Type": "application/json"}
+                headers.update(self._message_headers(
+                    message.get("delay_seconds"),
+                    message.get("deduplication_id"),
+                ))
+                body.append({
+                    "destination": self.webhook_url,
+                    "headers": headers,
+                    "body": json.dumps({
+                        "migration_id": message["migration_id"],
+                        "user_id": message["user_id"],
+                    }),
+                })
+            
             try:
-                response = await client.post(
-                    url,
-                    json=payload,
-                    headers=headers,
-                    timeout=30.0,
+                response = await asyncio.wait_for(
+                    self._get_client().post(f"{self.api_url}/batch", json=body),
+                    timeout=timeout,
                 )
                 response.raise_for_status()
-                
-                result = response.json()
-                message_id = result.get("messageId") or result.get("id")
-                logger.info(f"Task published to QStash for migration {migration_id}: {message_id}")
-                return result
-                
+                chunk_results = response.json()
+            except asyncio.TimeoutError:
+                logger.error(f"QStash batch request exceeded {timeout}s")
+                chunk_results = [{"error": f"Publicação no QStash excedeu {timeout}s"}] * len(chunk)
             except httpx.HTTPError as e:
-                error_detail = str(e)
-                if hasattr(e, 'response') and e.response is not None:
-                    try:
-                        error_detail = e.response.json()
-                    except:
-                        error_detail = e.response.text
-                logger.error(f"Error publishing task to QStash: {error_detail}")
-                raise ValueError(f"Erro ao publicar tarefa no QStash: {error_detail}")
+                error_detail = self._error_detail(e)
+                logger.error(f"Error publishing batch to QStash: {error_detail}")
+                chunk_results = [{"error": str(error_detail)}] * len(chunk)
+            
+            if not isinstance(chunk_results, list) or len(chunk_results) != len(chunk):
+                chunk_results = [{"error": f"Resposta inesperada do QStash: {chunk_results}"}] * len(chunk)
+            
+            results.extend(chunk_results)
+        
+        published = sum(1 for r in results if not r.get("error"))
+        logger.info(f"Batch published to QStash: {published}/{len(messages)} messages")
+        return results
     
     def verify_signature(self, body: bytes, signature: str, signing_key: Optional[str] = None) -> bool:
         """
@@ -138,6 +246,10 @@ def get_qstash_service() -> QStashService:
     
     if _qstash_service is None:
         _qstash_service = QStashService()
+        # Determine base URL from environment or use default
+        base_url = os.getenv("BASE_URL") or os.getenv("RENDER_EXTERNAL_URL") or "http://localhost:8000"
+        _qstash_service.set_webhook_url(base_url)
+        logger.info(f"QStash webhook URL configured: {_qstash_service.webhook_url}")
     
     return _qstash_service
 
@@ -0,0 +1,17 @@
+"""Transfer engine building blocks (sources, destinations)."""
+from app.transfer.providers import PhotoSource, PhotoSink, SourceItem
+from app.transfer.local import LocalFolderSource, LocalFolderSink
+from app.transfer.archive import ZipArchiveSource
+from app.transfer.export import build_export_source
+from app.transfer.selection import SelectedItemsSource
+
+__all__ = [
+    "PhotoSource",
+    "PhotoSink",
+    "SourceItem",
+    "LocalFolderSource",
+    "LocalFolderSink",
+    "ZipArchiveSource",
+    "build_export_source",
+    "SelectedItemsSource",
+]
@@ -0,0 +1,144 @@
+"""Zip archive source (iCloud Photos download archives)."""
+import asyncio
+import os
+import struct
+import zipfile
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional
+from app.transfer.local import MEDIA_EXTENSIONS, iter_file_range
+from app.transfer.providers import DEFAULT_CHUNK_SIZE, PhotoSource, SourceItem
+
+# Local file header: signature, versions, flags, method, time, date, crc,
+# sizes, then the file name and extra field lengths
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+
+
+class ZipArchiveSource(PhotoSource):
+    """
+    Photos read directly from one or more zip archives, without extraction.
+    
+    iCloud exports are split into several archives ("iCloud Photos Part 1 of
+    N.zip"); items are enumerated archive by archive in name order. Stored
+    (uncompressed) members, which is how photo exports are usually written,
+    are streamed as a byte range of the archive file; compressed members are
+    decompressed on the fly.
+    """
+    
+    def __init__(self, paths: list[str]):
+        """
+        Initialize source.
+        
+        Args:
+            paths: Archive paths
+        """
+        self.paths = [os.path.abspath(p) for p in paths]
+        self._archives: list[zipfile.ZipFile] = []
+        self._members: Optional[list[tuple[int, zipfile.ZipInfo]]] = None
+        self._by_id: dict[str, tuple[int, zipfile.ZipInfo]] = {}
+    
+    @staticmethod
+    def _item_id(archive_index: int, info: zipfile.ZipInfo) -> str:
+        """Build an item ID from the archive index and member name."""
+        return f"{archive_index}:{info.filename}"
+    
+    def _open_sync(self) -> list[tuple[int, zipfile.ZipInfo]]:
+        """Read the central directories of all archives once."""
+        if self._members is None:
+            members = []
+            for archive_index, path in enumerate(self.paths):
+                archive = zipfile.ZipFile(path)
+                self._archives.append(archive)
+                for info in archive.infolist():
+                    if info.is_dir():
+                        continue
+                    if os.path.splitext(info.filename)[1].lower() not in MEDIA_EXTENSIONS:
+                        continue
+                    members.append((archive_index, info))
+                    self._by_id[self._item_id(archive_index, info)] = (archive_index, info)
+            self._members = members
+        return self._members
+    
+    def _to_item(self, archive_index: int, info: zipfile.ZipInfo) -> SourceItem:
+        """Convert a zip member to a source item."""
+        try:
+            modified = datetime(*info.date_time, tzinfo=timezone.utc)
+        except ValueError:
+            modified = None
+        return SourceItem(
+            id=self._item_id(archive_index, info),
+            filename=os.path.basename(info.filename),
+            size=info.file_size,
+            modified=modified,
+        )
+    
+    def _data_offset_sync(self, archive_index: int, info: zipfile.ZipInfo) -> int:
+        """Offset of a member's data in the archive file."""
+        with open(self.paths[archive_index], "rb") as f:
+            f.seek(info.header_offset)
+            header = _LOCAL_HEADER.unpack(f.read(_LOCAL_HEADER.size))
+        if header[0] != zipfile.stringFileHeader:
+            raise ValueError(f"Arquivo zip corrompido: {info.filename}")
+        name_length, extra_length = header[-2], header[-1]
+        return info.header_offset + _LOCAL_HEADER.size + name_length + extra_length
+    
+    async def connect(self) -> None:
+        """Open the archives."""
+        for path in self.paths:
+            if not zipfile.is_zipfile(path):
+                raise ValueError(f"Arquivo zip inválido: {path}")
+        await asyncio.to_thread(self._open_sync)
+    
+    async def count(self) -> Optional[int]:
+        """Number of media files in the archives."""
+        return len(await asyncio.to_thread(self._open_sync))
+    
+    async def enumerate(self, batch_size: int = 50, offset: int = 0) -> AsyncIterator[list[SourceItem]]:
+        """Enumerate media files in batches."""
+        members = await asyncio.to_thread(self._open_sync)
+        for start in range(offset, len(members), batch_size):
+            yield [self._to_item(i, info) for i, info in members[start:start + batch_size]]
+    
+    async def stat(self, item_id: str) -> Optional[SourceItem]:
+        """Describe a member."""
+        await asyncio.to_thread(self._open_sync)
+        member = self._by_id.get(item_id)
+        return self._to_item(*member) if member else None
+    
+    async def open_stream(self, item: SourceItem, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """
+        Stream a member from its archive.
+        
+        Raises:
+            ValueError: If the member does not exist
+        """
+        await asyncio.to_thread(self._open_sync)
+        member = self._by_id.get(item.id)
+        if not member:
+            raise ValueError(f"Arquivo {item.id} não encontrado na exportação")
+        archive_index, info = member
+        
+        if info.compress_type == zipfile.ZIP_STORED and not info.flag_bits & 0x1:
+            offset = await asyncio.to_thread(self._data_offset_sync, archive_index, info)
+            async for chunk in iter_file_range(
+                self.paths[archive_index], offset, info.file_size, chunk_size
+            ):
+                yield chunk
+            return
+        
+        f = await asyncio.to_thread(self._archives[archive_index].open, info)
+        try:
+            while True:
+                chunk = await asyncio.to_thread(f.read, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            f.close()
+    
+    def close(self) -> None:
+        """Close the archives."""
+        for archive in self._archives:
+            archive.close()
+        self._archives.clear()
+        self._members = None
+        self._by_id.clear()
@@ -0,0 +1,248 @@
+"""Bandwidth governor shared by all transfers of a process (and optionally a host)."""
+import asyncio
+import socket
+import threading
+import time
+from typing import AsyncIterator, Optional
+from app.config import settings
+from app.instrumentation.collectors import BANDWIDTH_WAIT_SECONDS
+import logging
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD = "download"
+UPLOAD = "upload"
+
+# GCRA on the Redis server clock, so every process of the host paces
+# against the same timeline. Returns the delay as a string (Lua numbers are
+# truncated to integers in replies).
+_HOST_RESERVE_SCRIPT = """
+redis.replicate_commands()
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1]) or '0')
+if tat < now then tat = now end
+tat = tat + tonumber(ARGV[3]) / rate
+redis.call('SET', KEYS[1], tostring(tat), 'EX', math.ceil(tat - now + burst) + 1)
+return tostring(math.max(0, tat - now - burst))
+"""
+
+
+class TokenBucket:
+    """
+    Token bucket in the GCRA form: a reservation pushes a theoretical
+    arrival time forward by ``nbytes / rate`` and the caller sleeps for
+    whatever exceeds the burst allowance.
+    """
+    
+    def __init__(self, rate: float, burst_seconds: float):
+        """
+        Initialize bucket.
+        
+        Args:
+            rate: Bytes per second
+            burst_seconds: Seconds of traffic that may be sent without pacing
+        """
+        self.rate = float(rate)
+        self.burst_seconds = max(0.0, burst_seconds)
+        self._tat = 0.0
+        self._lock = threading.Lock()
+    
+    def reserve(self, nbytes: int) -> float:
+        """
+        Reserve bandwidth for a chunk.
+        
+        Returns:
+            Seconds to wait before the chunk may proceed
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tat = max(self._tat, now) + nbytes / self.rate
+            return max(0.0, self._tat - now - self.burst_seconds)
+
+
+class HostTokenBucket:
+    """
+    Token bucket shared by every process of this host, kept in Redis.
+    
+    If Redis is unavailable the host limit is skipped (fail open) and only
+    the process limit applies.
+    """
+    
+    def __init__(self, direction: str, rate: float, burst_seconds: float):
+        """
+        Initialize bucket.
+        
+        Args:
+            direction: DOWNLOAD or UPLOAD
+            rate: Bytes per second for the whole host
+            burst_seconds: Seconds of traffic that may be sent without pacing
+        """
+        self.key = f"bandwidth:{socket.gethostname()}:{direction}"
+        self.rate = float(rate)
+        self.burst_seconds = max(0.0, burst_seconds)
+        self._client = None
+        self._script = None
+        self._warned = False
+    
+    def _get_script(self):
+        """Create the Redis client lazily (on the loop that uses it)."""
+        if self._script is None:
+            import redis.asyncio as redis
+            
+            self._client = redis.Redis.from_url(settings.REDIS_URL)
+            self._script = self._client.register_script(_HOST_RESERVE_SCRIPT)
+        return self._script
+    
+    async def reserve(self, nbytes: int) -> float:
+        """
+        Reserve bandwidth for a chunk.
+        
+        Returns:
+            Seconds to wait before the chunk may proceed
+        """
+        try:
+            delay = await self._get_script()(
+                keys=[self.key], args=[self.rate, self.burst_seconds, nbytes]
+            )
+        except Exception as e:
+            if not self._warned:
+                logger.warning(f"Limite de banda do host indisponível ({self.key}): {str(e)}")
+                self._warned = True
+            return 0.0
+        self._warned = False
+        return float(delay)
+
+
+class ThrottledStream:
+    """
+    Wrap a chunk stream, pacing it through the governor.
+    
+    Each chunk is reserved after it is read and before it is handed on, so
+    the consumer (and through backpressure, the network) never runs ahead of
+    the configured rate.
+    """
+    
+    def __init__(self, stream: AsyncIterator[bytes], governor: "BandwidthGovernor", direction: str):
+        """
+        Initialize wrapper.
+        
+        Args:
+            stream: Chunk stream to wrap
+            governor: Governor to reserve bandwidth from
+            direction: DOWNLOAD or UPLOAD
+        """
+        self._stream = stream
+        self._governor = governor
+        self._direction = direction
+    
+    def __aiter__(self) -> "ThrottledStream":
+        return self
+    
+    async def __anext__(self) -> bytes:
+        chunk = await self._stream.__anext__()
+        await self._governor.acquire(self._direction, len(chunk))
+        return chunk
+    
+    async def aclose(self) -> None:
+        """Close the wrapped stream."""
+        aclose = getattr(self._stream, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+class BandwidthGovernor:
+    """
+    Meters download and upload bytes across all active migrations.
+    
+    Every transfer of the process reserves its chunks from the same
+    per-direction buckets; a stream has at most one reservation pending, so
+    reservations are served round-robin between streams and concurrent
+    migrations get equal shares of the limit. With a host limit the
+    reservation is also taken from a Redis bucket shared by every worker
+    process of the host, and the longer of the two waits applies.
+    """
+    
+    def __init__(
+        self,
+        limits: Optional[dict] = None,
+        host_limits: Optional[dict] = None,
+        burst_seconds: float = 1.0,
+    ):
+        """
+        Initialize governor.
+        
+        Args:
+            limits: Bytes per second per direction for this process (0 = unlimited)
+            host_limits: Bytes per second per direction for the whole host (0 = unlimited)
+            burst_seconds: Seconds of traffic that may be sent without pacing
+        """
+        self._buckets = {
+            direction: TokenBucket(rate, burst_seconds)
+            for direction, rate in (limits or {}).items() if rate and rate > 0
+        }
+        self._host_buckets = {
+            direction: HostTokenBucket(direction, rate, burst_seconds)
+            for direction, rate in (host_limits or {}).items() if rate and rate > 0
+        }
+    
+    def limited(self, direction: str) -> bool:
+        """Whether a direction has any limit configured."""
+        return direction in self._buckets or direction in self._host_buckets
+    
+    async def acquire(self, direction: str, nbytes: int) -> None:
+        """
+        Wait until ``nbytes`` may be transferred in a direction.
+        
+        Args:
+            direction: DOWNLOAD or UPLOAD
+            nbytes: Size of the chunk
+        """
+        delay = 0.0
+        bucket = self._buckets.get(direction)
+        if bucket is not None:
+            delay = bucket.reserve(nbytes)
+        host_bucket = self._host_buckets.get(direction)
+        if host_bucket is not None:
+            delay = max(delay, await host_bucket.reserve(nbytes))
+        if delay > 0:
+            BANDWIDTH_WAIT_SECONDS.inc(delay, direction=direction)
+            await asyncio.sleep(delay)
+    
+    def throttle(self, stream: AsyncIterator[bytes], direction: str) -> AsyncIterator[bytes]:
+        """
+        Pace a chunk stream (returned unchanged when the direction is unlimited).
+        
+        Args:
+            stream: Chunk stream
+            direction: DOWNLOAD or UPLOAD
+        """
+        if not self.limited(direction):
+            return stream
+        return ThrottledStream(stream, self, direction)
+
+
+_governor: Optional[BandwidthGovernor] = None
+_governor_lock = threading.Lock()
+
+
+def get_bandwidth_governor() -> BandwidthGovernor:
+    """Get the process-wide governor built from the BANDWIDTH_* settings."""
+    global _governor
+    if _governor is None:
+        with _governor_lock:
+            if _governor is None:
+                _governor = BandwidthGovernor(
+                    limits={
+                        DOWNLOAD: settings.BANDWIDTH_DOWNLOAD_LIMIT,
+                        UPLOAD: settings.BANDWIDTH_UPLOAD_LIMIT,
+                    },
+                    host_limits={
+                        DOWNLOAD: settings.BANDWIDTH_HOST_DOWNLOAD_LIMIT,
+                        UPLOAD: settings.BANDWIDTH_HOST_UPLOAD_LIMIT,
+                    },
+                    burst_seconds=settings.BANDWIDTH_BURST_SECONDS,
+                )
+    return _governor
@@ -0,0 +1,68 @@
+"""Local iCloud export (folder or zip archives) as a migration source."""
+import os
+from app.config import settings
+from app.transfer.archive import ZipArchiveSource
+from app.transfer.local import LocalFolderSource
+from app.transfer.providers import PhotoSource
+
+
+def resolve_export_path(path: str) -> str:
+    """
+    Resolve a user-supplied export path inside LOCAL_EXPORT_ROOT.
+    
+    Args:
+        path: Folder or .zip path, relative to LOCAL_EXPORT_ROOT
+    
+    Returns:
+        Absolute path
+    
+    Raises:
+        ValueError: If local import is disabled or the path is not valid
+    """
+    if not settings.LOCAL_EXPORT_ROOT:
+        raise ValueError("Importação de exportação local não está habilitada.")
+    
+    root = os.path.realpath(settings.LOCAL_EXPORT_ROOT)
+    resolved = os.path.realpath(os.path.join(root, path or ""))
+    
+    if os.path.commonpath([resolved, root]) != root:
+        raise ValueError("Caminho da exportação fora do diretório permitido.")
+    
+    if not os.path.exists(resolved):
+        raise ValueError(f"Exportação não encontrada: {path}")
+    
+    return resolved
+
+
+def build_export_source(path: str) -> PhotoSource:
+    """
+    Build the source for a local export.
+    
+    A .zip file is read as an archive; a folder containing .zip files is read
+    as a multi-part archive export; any other folder is read file by file.
+    
+    Args:
+        path: Folder or .zip path, relative to LOCAL_EXPORT_ROOT
+    
+    Returns:
+        Photo source
+    
+    Raises:
+        ValueError: If the path is not valid
+    """
+    resolved = resolve_export_path(path)
+    
+    if os.path.isfile(resolved):
+        if not resolved.lower().endswith(".zip"):
+            raise ValueError("A exportação deve ser uma pasta ou um arquivo .zip.")
+        return ZipArchiveSource([resolved])
+    
+    archives = sorted(
+        os.path.join(resolved, name)
+        for name in os.listdir(resolved)
+        if name.lower().endswith(".zip") and os.path.isfile(os.path.join(resolved, name))
+    )
+    if archives:
+        return ZipArchiveSource(archives)
+    
+    return LocalFolderSource(resolved)
@@ -0,0 +1,80 @@
+"""Integrity checks for transferred files."""
+import hashlib
+from typing import AsyncIterator, Optional
+from app.transfer.mime import SNIFF_BYTES
+
+
+class ChecksumMismatchError(ValueError):
+    """The destination reported a different checksum than the bytes sent."""
+
+
+def verify_md5(local_md5: Optional[str], remote_md5: Optional[str]) -> None:
+    """
+    Compare a local MD5 with the checksum reported by the destination.
+    
+    Args:
+        local_md5: Hex MD5 of the bytes sent
+        remote_md5: Hex MD5 from the destination (None skips the check)
+        
+    Raises:
+        ChecksumMismatchError: If the checksums differ
+    """
+    if remote_md5 and remote_md5.lower() != local_md5:
+        raise ChecksumMismatchError(
+            f"Checksum divergente (local {local_md5}, destino {remote_md5})"
+        )
+
+
+class HashingStream:
+    """
+    Wrap a chunk stream, computing its MD5 and size as chunks pass through.
+    
+    The digest is computed on the same buffers that are uploaded, so
+    verification needs no second read of the data.
+    """
+    
+    def __init__(self, stream: AsyncIterator[bytes]):
+        """
+        Initialize wrapper.
+        
+        Args:
+            stream: Chunk stream to wrap
+        """
+        self._stream = stream
+        self._md5 = hashlib.md5(usedforsecurity=False)
+        self.size = 0
+        self.head = b""  # Leading bytes, for MIME sniffing
+    
+    def __aiter__(self) -> "HashingStream":
+        return self
+    
+    async def __anext__(self) -> bytes:
+        chunk = await self._stream.__anext__()
+        if not self.size:
+            self.head = chunk[:SNIFF_BYTES]
+        self._md5.update(chunk)
+        self.size += len(chunk)
+        return chunk
+    
+    async def aclose(self) -> None:
+        """Close the wrapped stream."""
+        aclose = getattr(self._stream, "aclose", None)
+        if aclose is not None:
+            await aclose()
+    
+    @property
+    def md5(self) -> str:
+        """Hex MD5 of the bytes read so far."""
+        return self._md5.hexdigest()
+    
+    def verify(self, remote_md5: Optional[str]) -> None:
+        """
+        Compare against the checksum reported by the destination.
+        
+        Args:
+            remote_md5: Hex MD5 from the destination (None skips the check)
+            
+        Raises:
+            ChecksumMismatchError: If the checksums differ
+        """
+        verify_md5(self.md5, remote_md5)
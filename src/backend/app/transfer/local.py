@@ -0,0 +1,213 @@
+"""Local filesystem source and destination."""
+import asyncio
+import mmap
+import os
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional
+from app.config import settings
+from app.transfer.mime import MIME_TYPES
+from app.transfer.providers import DEFAULT_CHUNK_SIZE, PhotoSink, PhotoSource, SourceItem
+
+# Extensions treated as photos/videos when enumerating a folder
+MEDIA_EXTENSIONS = {f".{ext}" for ext in MIME_TYPES}
+
+
+async def iter_file_range(
+    path: str,
+    offset: int = 0,
+    length: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> AsyncIterator[bytes]:
+    """
+    Stream a byte range of a file in chunks.
+    
+    Ranges of at least LOCAL_EXPORT_MMAP_THRESHOLD bytes are memory-mapped,
+    so chunks are copied straight from the page cache instead of going
+    through read() calls and an intermediate buffer.
+    
+    Args:
+        path: File path
+        offset: Start of the range
+        length: Size of the range (None reads to the end of the file)
+        chunk_size: Size of each yielded chunk
+    """
+    f = await asyncio.to_thread(open, path, "rb")
+    try:
+        if length is None:
+            length = os.fstat(f.fileno()).st_size - offset
+        
+        if length >= settings.LOCAL_EXPORT_MMAP_THRESHOLD:
+            # mmap offsets must be aligned to the allocation granularity
+            start = offset - offset % mmap.ALLOCATIONGRANULARITY
+            skip = offset - start
+            mapped = mmap.mmap(f.fileno(), skip + length, access=mmap.ACCESS_READ, offset=start)
+            try:
+                if hasattr(mapped, "madvise"):
+                    mapped.madvise(mmap.MADV_SEQUENTIAL)
+                for position in range(skip, skip + length, chunk_size):
+                    end = min(position + chunk_size, skip + length)
+                    yield await asyncio.to_thread(mapped.__getitem__, slice(position, end))
+            finally:
+                mapped.close()
+        else:
+            f.seek(offset)
+            remaining = length
+            while remaining > 0:
+                chunk = await asyncio.to_thread(f.read, min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+    finally:
+        f.close()
+
+
+class LocalFolderSource(PhotoSource):
+    """Photos stored in a local directory tree (e.g. an iCloud export)."""
+    
+    def __init__(self, root: str):
+        """
+        Initialize source.
+        
+        Args:
+            root: Directory to read from
+        """
+        self.root = os.path.abspath(root)
+        self._paths: Optional[list[str]] = None
+    
+    async def connect(self) -> None:
+        """Check that the directory exists."""
+        if not os.path.isdir(self.root):
+            raise ValueError(f"Diretório não encontrado: {self.root}")
+    
+    def _scan(self) -> list[str]:
+        """List media files (relative paths) in a stable order."""
+        if self._paths is None:
+            paths = []
+            for dirpath, dirnames, filenames in os.walk(self.root):
+                dirnames.sort()
+                for filename in sorted(filenames):
+                    if os.path.splitext(filename)[1].lower() in MEDIA_EXTENSIONS:
+                        paths.append(os.path.relpath(os.path.join(dirpath, filename), self.root))
+            self._paths = paths
+        return self._paths
+    
+    def _resolve(self, item_id: str) -> str:
+        """Resolve an item ID to a path inside the root."""
+        path = os.path.abspath(os.path.join(self.root, item_id))
+        if os.path.commonpath([path, self.root]) != self.root:
+            raise ValueError(f"Caminho fora do diretório de origem: {item_id}")
+        return path
+    
+    def _stat_sync(self, item_id: str) -> Optional[SourceItem]:
+        """Blocking implementation of stat."""
+        path = self._resolve(item_id)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return SourceItem(
+            id=item_id,
+            filename=os.path.basename(path),
+            size=st.st_size,
+            modified=datetime.fromtimestamp(st.st_mtime, tz=timezone.utc),
+        )
+    
+    async def count(self) -> Optional[int]:
+        """Number of media files."""
+        return len(await asyncio.to_thread(self._scan))
+    
+    async def enumerate(self, batch_size: int = 50, offset: int = 0) -> AsyncIterator[list[SourceItem]]:
+        """Enumerate media files in batches."""
+        paths = await asyncio.to_thread(self._scan)
+        for start in range(offset, len(paths), batch_size):
+            batch = await asyncio.to_thread(
+                lambda ids: [self._stat_sync(i) for i in ids],
+                paths[start:start + batch_size],
+            )
+            yield [item for item in batch if item is not None]
+    
+    async def stat(self, item_id: str) -> Optional[SourceItem]:
+        """Describe a file."""
+        return await asyncio.to_thread(self._stat_sync, item_id)
+    
+    async def open_stream(self, item: SourceItem, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Stream a file in chunks."""
+        async for chunk in iter_file_range(self._resolve(item.id), chunk_size=chunk_size):
+            yield chunk
+
+
+class LocalFolderSink(PhotoSink):
+    """Writes migrated files into a local directory."""
+    
+    def __init__(self, root: str):
+        """
+        Initialize sink.
+        
+        Args:
+            root: Directory to write to (created if needed)
+        """
+        self.root = os.path.abspath(root)
+    
+    async def connect(self) -> None:
+        """Create the root directory."""
+        await asyncio.to_thread(os.makedirs, self.root, exist_ok=True)
+    
+    def _folder_path(self, folder_id: Optional[str]) -> str:
+        """Path of a folder ID (folder IDs are paths relative to the root)."""
+        path = os.path.abspath(os.path.join(self.root, folder_id or ""))
+        if os.path.commonpath([path, self.root]) != self.root:
+            raise ValueError(f"Pasta fora do diretório de destino: {folder_id}")
+        return path
+    
+    async def mkdir(self, name: str, parent_id: Optional[str] = None) -> str:
+        """Create a folder."""
+        folder_id = os.path.join(parent_id or "", name.replace(os.sep, "_"))
+        await asyncio.to_thread(os.makedirs, self._folder_path(folder_id), exist_ok=True)
+        return folder_id
+    
+    async def exists(self, name: str, folder_id: Optional[str] = None) -> bool:
+        """Whether the file exists."""
+        return os.path.exists(os.path.join(self._folder_path(folder_id), name))
+    
+    async def delete(self, file_id: str) -> None:
+        """Delete a file."""
+        path = self._folder_path(file_id)
+        if os.path.isfile(path):
+            await asyncio.to_thread(os.unlink, path)
+    
+    async def upload_stream(
+        self,
+        stream: AsyncIterator[bytes],
+        name: str,
+        folder_id: Optional[str] = None,
+        mime_type: str = "application/octet-stream",
+        size: Optional[int] = None,
+        modified: Optional[datetime] = None,
+        properties: Optional[dict] = None,
+    ) -> dict:
+        """
+        Write a stream to a file (atomically, through a temporary name).
+        
+        The modification time is set on the file; properties are not stored.
+        """
+        path = os.path.join(self._folder_path(folder_id), os.path.basename(name))
+        tmp_path = f"{path}.part"
+        written = 0
+        
+        f = await asyncio.to_thread(open, tmp_path, "wb")
+        try:
+            async for chunk in stream:
+                await asyncio.to_thread(f.write, chunk)
+                written += len(chunk)
+        except BaseException:
+            f.close()
+            os.unlink(tmp_path)
+            raise
+        f.close()
+        if modified:
+            timestamp = modified.timestamp()
+            await asyncio.to_thread(os.utime, tmp_path, (timestamp, timestamp))
+        await asyncio.to_thread(os.replace, tmp_path, path)
+        
+        return {"id": os.path.relpath(path, self.root), "name": name, "size": written}
@@ -0,0 +1,142 @@
+"""MIME type detection for transferred media (extension table and magic bytes)."""
+from typing import Optional
+
+DEFAULT_MIME_TYPE = "application/octet-stream"
+
+# Bytes of the first chunk kept for sniffing
+SNIFF_BYTES = 64
+
+# Media file types found in iCloud libraries and exports, by extension
+MIME_TYPES = {
+    # Photos
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+    "gif": "image/gif",
+    "heic": "image/heic",
+    "heif": "image/heif",
+    "avif": "image/avif",
+    "webp": "image/webp",
+    "tif": "image/tiff",
+    "tiff": "image/tiff",
+    "bmp": "image/bmp",
+    # RAW (TIFF containers)
+    "dng": "image/x-adobe-dng",
+    "cr2": "image/x-canon-cr2",
+    "nef": "image/x-nikon-nef",
+    "arw": "image/x-sony-arw",
+    # Videos (including Live Photo companions)
+    "mov": "video/quicktime",
+    "mp4": "video/mp4",
+    "m4v": "video/x-m4v",
+    "avi": "video/x-msvideo",
+    "3gp": "video/3gpp",
+}
+
+# Uniform Type Identifiers reported by iCloud for asset resources
+UTI_TYPES = {
+    "public.jpeg": "image/jpeg",
+    "public.png": "image/png",
+    "com.compuserve.gif": "image/gif",
+    "public.heic": "image/heic",
+    "public.heif": "image/heif",
+    "public.tiff": "image/tiff",
+    "com.adobe.raw-image": "image/x-adobe-dng",
+    "com.apple.quicktime-movie": "video/quicktime",
+    "public.mpeg-4": "video/mp4",
+}
+
+# Preferred extension of each MIME type (the first listed in MIME_TYPES)
+EXTENSIONS = {mime_type: ext for ext, mime_type in reversed(MIME_TYPES.items())}
+
+# ISO base media file brands (the "ftyp" box) of HEIF images and MP4/QuickTime videos
+_FTYP_BRANDS = {
+    b"heic": "image/heic",
+    b"heix": "image/heic",
+    b"hevc": "image/heic",
+    b"hevx": "image/heic",
+    b"heim": "image/heic",
+    b"heis": "image/heic",
+    b"mif1": "image/heif",
+    b"msf1": "image/heif",
+    b"avif": "image/avif",
+    b"qt  ": "video/quicktime",
+    b"isom": "video/mp4",
+    b"iso2": "video/mp4",
+    b"mp41": "video/mp4",
+    b"mp42": "video/mp4",
+    b"avc1": "video/mp4",
+    b"M4V ": "video/x-m4v",
+    b"3gp4": "video/3gpp",
+    b"3gp5": "video/3gpp",
+    b"3gp6": "video/3gpp",
+}
+
+# Leading signatures, checked in order
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+    (b"BM", "image/bmp"),
+)
+
+# Extensions stored in a TIFF container: the extension is more precise than the magic
+_TIFF_BASED = {MIME_TYPES[ext] for ext in ("dng", "cr2", "nef", "arw")}
+
+
+def mime_from_filename(filename: str) -> Optional[str]:
+    """MIME type for a filename's extension, or None if unknown."""
+    _, dot, ext = filename.rpartition(".")
+    return MIME_TYPES.get(ext.lower()) if dot else None
+
+
+def mime_from_uti(uti: Optional[str]) -> Optional[str]:
+    """MIME type for a Uniform Type Identifier, or None if unknown."""
+    return UTI_TYPES.get(uti) if uti else None
+
+
+def sniff_mime(head: bytes) -> Optional[str]:
+    """
+    Detect the MIME type from the first bytes of a file.
+    
+    Args:
+        head: Leading bytes (SNIFF_BYTES are enough)
+    
+    Returns:
+        MIME type, or None if the format is not recognized
+    """
+    if head[4:8] == b"ftyp":
+        return _FTYP_BRANDS.get(head[8:12])
+    if head[:4] == b"RIFF":
+        if head[8:12] == b"WEBP":
+            return "image/webp"
+        if head[8:12] == b"AVI ":
+            return "video/x-msvideo"
+        return None
+    for signature, mime_type in _SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+    return None
+
+
+def resolve_mime(filename: str, head: bytes = b"", declared: Optional[str] = None) -> str:
+    """
+    Choose the MIME type sent to the destination.
+    
+    The content wins over the name, except for RAW files, whose TIFF magic
+    is less precise than their extension. Then come the extension, the type
+    declared by the source and finally application/octet-stream.
+    
+    Args:
+        filename: File name
+        head: Leading bytes of the content
+        declared: MIME type reported by the source
+    """
+    by_name = mime_from_filename(filename)
+    sniffed = sniff_mime(head) if head else None
+    if sniffed and not (sniffed == "image/tiff" and by_name in _TIFF_BASED):
+        return sniffed
+    return by_name or declared or DEFAULT_MIME_TYPE
@@ -0,0 +1,181 @@
+"""Source and destination provider interfaces for the transfer engine."""
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+# Default chunk size for streamed reads and uploads
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# Resources of a photo asset: the original file, the edited rendition and
+# the video component of a Live Photo
+ORIGINAL = "original"
+EDITED = "edited"
+LIVE_VIDEO = "live_video"
+RESOURCES = (ORIGINAL, EDITED, LIVE_VIDEO)
+
+# Companion resources have item IDs of the form "<asset id>#<resource>"
+_RESOURCE_SEPARATOR = "#"
+
+
+def resource_item_id(asset_id: str, resource: str) -> str:
+    """Item ID of a resource of an asset."""
+    if resource == ORIGINAL:
+        return asset_id
+    return f"{asset_id}{_RESOURCE_SEPARATOR}{resource}"
+
+
+def split_resource_id(item_id: str) -> tuple[str, str]:
+    """Split an item ID into (asset ID, resource)."""
+    asset_id, _, resource = item_id.partition(_RESOURCE_SEPARATOR)
+    return asset_id, resource or ORIGINAL
+
+
+def parse_resources(value) -> list[str]:
+    """
+    Parse the companion resources chosen for a migration.
+    
+    The original is always transferred, so it is accepted but not returned.
+    
+    Args:
+        value: List of resource names, or a comma-separated string
+        
+    Raises:
+        ValueError: If a resource name is unknown
+    """
+    if isinstance(value, str):
+        value = value.split(",")
+    if not isinstance(value, (list, tuple)):
+        raise ValueError("Recursos inválidos: informe uma lista de recursos")
+    resources = []
+    for name in value:
+        name = str(name).strip()
+        if not name or name == ORIGINAL:
+            continue
+        if name not in RESOURCES:
+            raise ValueError(f"Recurso inválido: {name} (use {', '.join(RESOURCES)})")
+        if name not in resources:
+            resources.append(name)
+    return resources
+
+
+@dataclass
+class SourceItem:
+    """
+    A file exposed by a photo source.
+    
+    Sources with multi-resource assets (iCloud Live Photos, edited photos)
+    expose the original as the item and the other resources of the same
+    asset as its companions, each a transferable item of its own.
+    """
+    id: str
+    filename: str
+    size: int = 0
+    mime_type: Optional[str] = None
+    created: Optional[datetime] = None
+    modified: Optional[datetime] = None
+    resource: str = ORIGINAL
+    asset_id: Optional[str] = None  # Asset the resource belongs to (None: the item itself)
+    companions: list["SourceItem"] = field(default_factory=list)
+
+
+class PhotoSource(ABC):
+    """
+    Where photos are migrated from.
+    
+    Implementations enumerate items in a stable order (so a migration can
+    resume from an offset), describe them and stream their content.
+    """
+    
+    async def connect(self) -> None:
+        """
+        Authenticate / check that the source is reachable.
+        
+        Raises:
+            ValueError: If the source cannot be used
+        """
+    
+    async def count(self) -> Optional[int]:
+        """Total number of items, or None if unknown."""
+        return None
+    
+    @abstractmethod
+    def enumerate(self, batch_size: int = 50, offset: int = 0) -> AsyncIterator[list[SourceItem]]:
+        """
+        Enumerate items in batches.
+        
+        Args:
+            batch_size: Items per batch
+            offset: Number of items to skip
+        """
+    
+    @abstractmethod
+    async def stat(self, item_id: str) -> Optional[SourceItem]:
+        """Describe a single item, or None if it does not exist."""
+    
+    @abstractmethod
+    def open_stream(self, item: SourceItem, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Stream the content of an item in chunks."""
+    
+    async def read(self, item: SourceItem) -> bytes:
+        """Read the whole content of an item."""
+        return b"".join([chunk async for chunk in self.open_stream(item)])
+
+
+class PhotoSink(ABC):
+    """Where photos are migrated to."""
+    
+    async def connect(self) -> None:
+        """
+        Authenticate / check that the destination is reachable.
+        
+        Raises:
+            ValueError: If the destination cannot be used
+        """
+    
+    @abstractmethod
+    async def mkdir(self, name: str, parent_id: Optional[str] = None) -> str:
+        """Create a folder and return its ID."""
+    
+    @abstractmethod
+    async def exists(self, name: str, folder_id: Optional[str] = None) -> bool:
+        """Whether a file with this name already exists in the folder."""
+    
+    @abstractmethod
+    async def upload_stream(
+        self,
+        stream: AsyncIterator[bytes],
+        name: str,
+        folder_id: Optional[str] = None,
+        mime_type: str = "application/octet-stream",
+        size: Optional[int] = None,
+        modified: Optional[datetime] = None,
+        properties: Optional[dict] = None,
+    ) -> dict:
+        """
+        Upload a file from a stream of chunks.
+        
+        Args:
+            stream: File content
+            name: File name
+            folder_id: Destination folder ID (None for the root)
+            mime_type: MIME type of the file
+            size: Size in bytes, if known
+            modified: Modification time to set on the file
+            properties: String key/values stored with the file, where supported
+            
+        Returns:
+            Dictionary with at least the uploaded file ``id``, and
+            ``md5Checksum`` when the destination computes one
+        """
+    
+    async def delete(self, file_id: str) -> None:
+        """Delete an uploaded file (used to discard corrupted uploads)."""
+        raise NotImplementedError
+
+
+async def iter_bytes(data: bytes, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Expose an in-memory payload as a chunk stream."""
+    view = memoryview(data)
+    for start in range(0, len(view), chunk_size):
+        yield bytes(view[start:start + chunk_size])
@@ -0,0 +1,152 @@
+"""Per-item upload retries from a retained copy of the downloaded bytes."""
+import hashlib
+import random
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+import httpx
+from app.config import settings
+from app.transfer.integrity import ChecksumMismatchError, verify_md5
+from app.transfer.mime import SNIFF_BYTES
+from app.transfer.providers import DEFAULT_CHUNK_SIZE
+
+# Destination responses worth another attempt with the same bytes
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+CHECKSUM = "checksum"
+TRANSIENT = "transient"
+
+
+class ItemTransferError(Exception):
+    """An item could not be transferred, after all the attempts allowed."""
+    
+    def __init__(self, error: BaseException, attempts: int):
+        """
+        Initialize error.
+        
+        Args:
+            error: Last error raised
+            attempts: Upload attempts made (1 if the download failed)
+        """
+        super().__init__(str(error))
+        self.error = error
+        self.attempts = attempts
+    
+    @property
+    def error_class(self) -> str:
+        """Class name of the last error (e.g. ``HTTPStatusError``)."""
+        return type(self.error).__name__
+
+
+def retry_reason(error: BaseException) -> Optional[str]:
+    """
+    Classify an upload error.
+    
+    Returns:
+        CHECKSUM, TRANSIENT, or None if retrying would not help
+    """
+    if isinstance(error, ChecksumMismatchError):
+        return CHECKSUM
+    if isinstance(error, httpx.TransportError):
+        return TRANSIENT
+    if isinstance(error, httpx.HTTPStatusError):
+        response = error.response
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            return TRANSIENT
+        # Drive reports per-user rate limits as 403
+        if response.status_code == 403 and "ateLimitExceeded" in response.text:
+            return TRANSIENT
+    return None
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How many times, and how far apart, an item's upload is retried."""
+    checksum_retries: int
+    transient_retries: int
+    backoff: float
+    max_backoff: float
+    
+    @classmethod
+    def from_settings(cls) -> "RetryPolicy":
+        """Build the policy from the TRANSFER_* settings."""
+        return cls(
+            checksum_retries=max(0, settings.TRANSFER_CHECKSUM_RETRIES),
+            transient_retries=max(0, settings.TRANSFER_UPLOAD_RETRIES),
+            backoff=settings.TRANSFER_RETRY_BACKOFF,
+            max_backoff=settings.TRANSFER_RETRY_MAX_BACKOFF,
+        )
+    
+    def allows(self, reason: Optional[str], retries: int) -> bool:
+        """
+        Whether another attempt is allowed.
+        
+        Args:
+            reason: Result of retry_reason()
+            retries: Retries already made for this reason
+        """
+        if reason == CHECKSUM:
+            return retries < self.checksum_retries
+        if reason == TRANSIENT:
+            return retries < self.transient_retries
+        return False
+    
+    def delay(self, retries: int) -> float:
+        """Exponential backoff with full jitter before retry number ``retries + 1``."""
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** retries))
+
+
+class MemoryPayload:
+    """
+    A small downloaded item kept in memory, so its upload can be retried
+    without downloading it again.
+    """
+    
+    def __init__(self):
+        """Initialize an empty payload."""
+        self.chunks: list[bytes] = []
+        self.size = 0
+        self._md5 = hashlib.md5(usedforsecurity=False)
+    
+    @classmethod
+    async def read(cls, stream: AsyncIterator[bytes]) -> "MemoryPayload":
+        """
+        Download a stream into memory.
+        
+        Args:
+            stream: Chunk stream
+        """
+        payload = cls()
+        try:
+            async for chunk in stream:
+                payload.chunks.append(chunk)
+                payload.size += len(chunk)
+                payload._md5.update(chunk)
+        finally:
+            aclose = getattr(stream, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        return payload
+    
+    @property
+    def md5(self) -> str:
+        """Hex MD5 of the payload."""
+        return self._md5.hexdigest()
+    
+    @property
+    def head(self) -> bytes:
+        """Leading bytes, for MIME sniffing."""
+        return self.chunks[0][:SNIFF_BYTES] if self.chunks else b""
+    
+    async def open(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Stream the payload again."""
+        for chunk in self.chunks:
+            yield chunk
+    
+    def verify(self, remote_md5: Optional[str]) -> None:
+        """
+        Compare against the checksum reported by the destination.
+        
+        Raises:
+            ChecksumMismatchError: If the checksums differ
+        """
+        verify_md5(self.md5, remote_md5)
@@ -0,0 +1,46 @@
+"""Source restricted to a known list of items."""
+from typing import AsyncIterator, Optional
+from app.transfer.providers import DEFAULT_CHUNK_SIZE, PhotoSource, SourceItem
+
+
+class SelectedItemsSource(PhotoSource):
+    """
+    A fixed list of items of another source (e.g. the failed items of a
+    migration being retried).
+    
+    The items are already described, so the wrapped source is only used to
+    connect and to stream content; nothing is enumerated or looked up.
+    """
+    
+    def __init__(self, source: PhotoSource, items: list[SourceItem]):
+        """
+        Initialize source.
+        
+        Args:
+            source: Source the items belong to
+            items: Items to expose, in order
+        """
+        self.source = source
+        self.items = items
+        self._by_id = {item.id: item for item in items}
+    
+    async def connect(self) -> None:
+        """Connect the wrapped source."""
+        await self.source.connect()
+    
+    async def count(self) -> Optional[int]:
+        """Number of selected items."""
+        return len(self.items)
+    
+    async def enumerate(self, batch_size: int = 50, offset: int = 0) -> AsyncIterator[list[SourceItem]]:
+        """Enumerate the selected items in batches."""
+        for start in range(offset, len(self.items), batch_size):
+            yield self.items[start:start + batch_size]
+    
+    async def stat(self, item_id: str) -> Optional[SourceItem]:
+        """Describe a selected item."""
+        return self._by_id.get(item_id)
+    
+    def open_stream(self, item: SourceItem, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Stream an item from the wrapped source."""
+        return self.source.open_stream(item, chunk_size)
@@ -0,0 +1,211 @@
+"""Bounded on-disk spool between the download and upload stages."""
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+from app.config import settings
+from app.transfer.integrity import HashingStream, verify_md5
+from app.transfer.local import iter_file_range
+from app.transfer.providers import DEFAULT_CHUNK_SIZE
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SpoolEntry:
+    """A spooled item."""
+    key: str
+    path: str
+    reserved: int
+    size: int = 0
+    md5: Optional[str] = None
+    head: bytes = b""
+    ready: bool = False
+    completed: bool = False
+    
+    def open(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Stream the spooled file from disk."""
+        return iter_file_range(self.path, 0, self.size, chunk_size)
+    
+    def verify(self, remote_md5: Optional[str]) -> None:
+        """
+        Compare against the checksum reported by the destination.
+        
+        Raises:
+            ChecksumMismatchError: If the checksums differ
+        """
+        verify_md5(self.md5, remote_md5)
+
+
+class Spool:
+    """
+    Files downloaded ahead of the upload stage, bounded by SPOOL_MAX_BYTES.
+    
+    Space is reserved when a download starts, in request order, and a
+    download waits while the spool is full. Entries whose upload completed
+    stay on disk (a later retry reads them instead of downloading again)
+    until their space is needed; they are evicted least recently used first.
+    Entries still waiting for upload are never evicted.
+    """
+    
+    def __init__(self, directory: str, max_bytes: int):
+        """
+        Initialize spool.
+        
+        Args:
+            directory: Directory for spooled files (emptied on startup)
+            max_bytes: Maximum bytes on disk
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.used = 0
+        self._entries: "OrderedDict[str, SpoolEntry]" = OrderedDict()
+        self._waiters: deque = deque()
+        self._changed = asyncio.Condition()
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+    
+    def fits(self, size: Optional[int]) -> bool:
+        """Whether an item of this size can be spooled (unknown sizes cannot)."""
+        return bool(size) and size <= self.max_bytes
+    
+    def get(self, key: str) -> Optional[SpoolEntry]:
+        """
+        Get a ready entry and pin it again until it is completed.
+        
+        Args:
+            key: Entry key
+        """
+        entry = self._entries.get(key)
+        if entry is None or not entry.ready:
+            return None
+        entry.completed = False
+        self._entries.move_to_end(key)
+        return entry
+    
+    def _evict_one(self) -> bool:
+        """Delete the least recently used completed entry."""
+        for entry in self._entries.values():
+            if entry.completed:
+                self._remove(entry)
+                return True
+        return False
+    
+    def _remove(self, entry: SpoolEntry) -> None:
+        """Delete an entry and release its space."""
+        if self._entries.get(entry.key) is entry:
+            del self._entries[entry.key]
+            self.used -= entry.reserved
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+    
+    async def allocate(self, key: str, size: int) -> SpoolEntry:
+        """
+        Reserve space for an item, waiting while the spool is full.
+        
+        Requests are served in order, so a large item is not starved by
+        smaller ones requested after it.
+        
+        Args:
+            key: Entry key
+            size: Expected size in bytes
+        """
+        ticket = object()
+        async with self._changed:
+            self._waiters.append(ticket)
+            try:
+                while True:
+                    if self._waiters[0] is ticket:
+                        while self.used + size > self.max_bytes and self._evict_one():
+                            pass
+                        if self.used + size <= self.max_bytes:
+                            break
+                    await self._changed.wait()
+            finally:
+                self._waiters.remove(ticket)
+                self._changed.notify_all()
+            
+            previous = self._entries.get(key)
+            if previous is not None:
+                self._remove(previous)
+            entry = SpoolEntry(key, os.path.join(self.directory, uuid.uuid4().hex), size)
+            self._entries[key] = entry
+            self.used += size
+            return entry
+    
+    async def fill(self, entry: SpoolEntry, stream: AsyncIterator[bytes]) -> SpoolEntry:
+        """
+        Write a downloaded stream to an allocated entry.
+        
+        Args:
+            entry: Entry from allocate()
+            stream: Chunk stream
+        """
+        hashing = HashingStream(stream)
+        f = await asyncio.to_thread(open, entry.path, "wb")
+        try:
+            async for chunk in hashing:
+                await asyncio.to_thread(f.write, chunk)
+        finally:
+            await asyncio.to_thread(f.close)
+            await hashing.aclose()
+        
+        async with self._changed:
+            # Account for the real size (the listed size may be off)
+            if self._entries.get(entry.key) is entry:
+                self.used += hashing.size - entry.reserved
+            entry.reserved = hashing.size
+            entry.size = hashing.size
+            entry.md5 = hashing.md5
+            entry.head = hashing.head
+            entry.ready = True
+            self._changed.notify_all()
+        return entry
+    
+    def open(self, entry: SpoolEntry, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Stream a ready entry from disk."""
+        return entry.open(chunk_size)
+    
+    async def complete(self, entry: SpoolEntry) -> None:
+        """Mark an entry as uploaded, making it evictable."""
+        async with self._changed:
+            entry.completed = True
+            if self._entries.get(entry.key) is entry:
+                self._entries.move_to_end(entry.key)
+            self._changed.notify_all()
+    
+    async def discard(self, entry: SpoolEntry) -> None:
+        """Delete an entry right away (e.g. an interrupted download)."""
+        async with self._changed:
+            self._remove(entry)
+            self._changed.notify_all()
+
+
+_spool: Optional[Spool] = None
+_spool_lock = threading.Lock()
+
+
+def get_spool() -> Optional[Spool]:
+    """
+    Get the process-wide spool (None when SPOOL_MAX_BYTES is 0).
+    
+    Each process spools into its own subdirectory of SPOOL_DIR.
+    """
+    global _spool
+    if settings.SPOOL_MAX_BYTES <= 0:
+        return None
+    if _spool is None:
+        with _spool_lock:
+            if _spool is None:
+                root = settings.SPOOL_DIR or os.path.join(tempfile.gettempdir(), "cloud-migrate-spool")
+                _spool = Spool(os.path.join(root, str(os.getpid())), settings.SPOOL_MAX_BYTES)
+                logger.info(f"Spool em {_spool.directory} (até {settings.SPOOL_MAX_BYTES} bytes)")
+    return _spool
@@ -1,6 +1,8 @@
 """Celery application configuration."""
 from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
 from app.config import settings
+from app.workers.event_loop import get_loop_runner
 
 celery_app = Celery(
     "cloud_migrate",
@@ -18,10 +20,52 @@ celery_app.conf.update(
     task_track_started=True,
     task_time_limit=30 * 60,  # 30 minutes
     task_soft_time_limit=25 * 60,  # 25 minutes
+    beat_schedule={
+        # Safety net for outbox messages not flushed by the API
+        "dispatch-outbox": {
+            "task": "app.workers.tasks.dispatch_outbox_task",
+            "schedule": float(settings.OUTBOX_DISPATCH_INTERVAL),
+        },
+    },
 )
 
 
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    """Start the per-process event loop shared by all tasks."""
+    from app.database import dispose_engines
+    
+    # Connections inherited from the parent process must not be reused
+    dispose_engines(close=False)
+    runner = get_loop_runner()
+    runner.start()
+    
+    if settings.METRICS_ENABLED:
+        import asyncio
+        from app.instrumentation.collectors import monitor_event_loop_lag
+        
+        asyncio.run_coroutine_threadsafe(
+            monitor_event_loop_lag("worker", settings.EVENT_LOOP_LAG_INTERVAL),
+            runner.loop,
+        )
+        
+        if settings.METRICS_WORKER_PORT:
+            from billiard.process import current_process
+            from app.instrumentation.exporter import start_exporter
+            
+            # One port per pool process: base port + prefork process index
+            index = getattr(current_process(), "index", 0) or 0
+            start_exporter(settings.METRICS_WORKER_PORT + index)
 
 
-
-
+@worker_process_shutdown.connect
+def shutdown_worker_process(**kwargs):
+    """Tear down the per-process event loop and iCloud I/O threads."""
+    from app.services.icloud_service import shutdown_io_executors
+    from app.database import dispose_engines
+    from app.instrumentation.exporter import stop_exporter
+    
+    stop_exporter()
+    get_loop_runner().stop()
+    shutdown_io_executors(wait=False)
+    dispose_engines()
@@ -0,0 +1,137 @@
+"""Long-lived event loop shared by the sync -> async bridges of a process."""
+import asyncio
+import os
+import threading
+from typing import Any, Awaitable, Callable, Coroutine, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class LoopRunner:
+    """
+    Run coroutines on a single event loop owned by a background thread.
+    
+    Creating a new event loop per task throws away every loop-bound resource
+    (pooled HTTP clients, token caches, iCloud sessions). The runner keeps
+    one loop alive for the whole process so those resources survive between
+    tasks, and sync code submits coroutines to it with ``run()``.
+    """
+    
+    def __init__(self):
+        """Initialize runner (the loop is started lazily)."""
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._shutdown_hooks: List[Callable[[], Awaitable[None]]] = []
+    
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """Get the runner loop, starting it if needed."""
+        self.start()
+        return self._loop
+    
+    def start(self) -> None:
+        """Start the loop thread if it is not running in this process."""
+        with self._lock:
+            # A loop inherited through fork() has no thread behind it
+            if self._loop is not None and self._pid == os.getpid():
+                return
+            if self._pid is not None and self._pid != os.getpid():
+                self._shutdown_hooks = []
+            
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+            
+            def _run():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+            
+            thread = threading.Thread(target=_run, name="event-loop-runner", daemon=True)
+            thread.start()
+            ready.wait()
+            
+            self._loop = loop
+            self._thread = thread
+            self._pid = os.getpid()
+            logger.info(f"Event loop runner started in process {self._pid}")
+    
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """
+        Run a coroutine on the runner loop and wait for its result.
+        
+        Args:
+            coro: Coroutine to run
+            timeout: Optional timeout in seconds
+            
+        Returns:
+            Result of the coroutine
+            
+        Raises:
+            RuntimeError: If called from the runner loop itself
+        """
+        loop = self.loop
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("LoopRunner.run() cannot be called from the runner loop")
+        
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+    
+    def add_shutdown_hook(self, hook: Callable[[], Awaitable[None]]) -> None:
+        """Register an async callback run on the loop before it stops."""
+        if hook not in self._shutdown_hooks:
+            self._shutdown_hooks.append(hook)
+    
+    def stop(self, timeout: float = 10.0) -> None:
+        """Run shutdown hooks, cancel pending tasks and close the loop."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            if loop is None or self._pid != os.getpid():
+                return
+            
+            async def _shutdown():
+                for hook in self._shutdown_hooks:
+                    try:
+                        await hook()
+                    except Exception as e:
+                        logger.warning(f"Event loop shutdown hook failed: {str(e)}")
+                current = asyncio.current_task()
+                tasks = [t for t in asyncio.all_tasks() if t is not current]
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+            
+            try:
+                asyncio.run_coroutine_threadsafe(_shutdown(), loop).result(timeout)
+            except Exception as e:
+                logger.warning(f"Event loop shutdown did not complete cleanly: {str(e)}")
+            
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout)
+            loop.close()
+            
+            self._loop = None
+            self._thread = None
+            self._shutdown_hooks = []
+            logger.info(f"Event loop runner stopped in process {self._pid}")
+
+
+# Singleton instance
+_loop_runner = LoopRunner()
+
+
+def get_loop_runner() -> LoopRunner:
+    """Get the process-wide loop runner."""
+    return _loop_runner
+
+
+def run_async(coro: Coroutine, timeout: Optional[float] = None) -> Any:
+    """Run a coroutine on the process-wide loop from sync code."""
+    return _loop_runner.run(coro, timeout)
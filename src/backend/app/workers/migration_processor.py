@@ -0,0 +1,747 @@
+"""Migration processing (the transfer loop run by workers and the QStash webhook)."""
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Optional, Union
+from app.config import settings
+from app.instrumentation import stages
+from app.instrumentation.collectors import BYTES_TRANSFERRED, ITEMS_TRANSFERRED, MIGRATIONS_FINISHED, UPLOAD_RETRIES
+from app.instrumentation.profiler import MigrationProfiler
+from app.instrumentation.stages import TimedStream, maybe_log_summary, observe_stage, time_stage
+from app.models.migration_log import MigrationLog
+from app.models.outbox_message import OutboxMessage
+from app.repositories.failed_item_repository import FailedItemRepository
+from app.repositories.migration_repository import MigrationRepository
+from app.repositories.outbox_repository import OutboxRepository
+from app.services.icloud_service import ICloudService
+from app.services.google_drive_service import GoogleDriveService
+from app.services.credential_service import CredentialService
+from app.transfer.bandwidth import DOWNLOAD, UPLOAD, get_bandwidth_governor
+from app.transfer.export import build_export_source
+from app.transfer.integrity import ChecksumMismatchError, HashingStream
+from app.transfer.mime import SNIFF_BYTES, resolve_mime
+from app.transfer.providers import PhotoSource, PhotoSink, SourceItem, parse_resources, split_resource_id
+from app.transfer.retry import ItemTransferError, MemoryPayload, RetryPolicy, retry_reason
+from app.transfer.selection import SelectedItemsSource
+from app.transfer.spool import Spool, SpoolEntry, get_spool
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SpoolPrefetcher:
+    """
+    Downloads upcoming items into the spool while the current one uploads.
+    
+    Up to SPOOL_PREFETCH_ITEMS downloads run ahead of the upload stage, so a
+    slow source and a throttled destination each run at their own speed;
+    the spool's byte cap provides the backpressure.
+    """
+    
+    def __init__(self, source: PhotoSource, spool: Spool, migration_id: int, depth: int):
+        """
+        Initialize prefetcher.
+        
+        Args:
+            source: Source to download from
+            spool: Spool to download into
+            migration_id: Migration ID (spool keys are per migration)
+            depth: Maximum items downloaded ahead
+        """
+        self.source = source
+        self.spool = spool
+        self.migration_id = migration_id
+        self.depth = max(1, depth)
+        self._tasks: dict[str, asyncio.Task] = {}
+    
+    def _key(self, item: SourceItem) -> str:
+        return f"{self.migration_id}:{item.id}"
+    
+    def schedule(self, items: list[SourceItem]) -> None:
+        """
+        Start downloading the given upcoming items (in order) if there is room.
+        
+        Items of unknown size or larger than the spool are streamed directly
+        instead.
+        """
+        for item in items:
+            if len(self._tasks) >= self.depth:
+                break
+            if item.id in self._tasks or not self.spool.fits(item.size):
+                continue
+            self._tasks[item.id] = asyncio.create_task(self._download(item))
+    
+    async def _download(self, item: SourceItem) -> SpoolEntry:
+        """Download one item into the spool."""
+        entry = self.spool.get(self._key(item))
+        if entry is not None:
+            return entry
+        
+        entry = await self.spool.allocate(self._key(item), item.size)
+        download = TimedStream(get_bandwidth_governor().throttle(self.source.open_stream(item), DOWNLOAD))
+        try:
+            await self.spool.fill(entry, download)
+        except BaseException:
+            await self.spool.discard(entry)
+            raise
+        finally:
+            observe_stage(stages.DOWNLOAD, download.seconds)
+        return entry
+    
+    async def take(self, item: SourceItem) -> Optional[SpoolEntry]:
+        """
+        Wait for an item's download.
+        
+        Returns:
+            The spooled item, or None if it was not prefetched
+            
+        Raises:
+            Exception: Whatever the download raised
+        """
+        task = self._tasks.pop(item.id, None)
+        if task is None:
+            return None
+        return await task
+    
+    async def close(self) -> None:
+        """Cancel downloads that will not be used; finished ones stay evictable in the spool."""
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                entry = await task
+            except BaseException:
+                continue
+            await self.spool.complete(entry)
+
+
+def _file_metadata(item: SourceItem) -> dict:
+    """
+    Metadata set on an uploaded file.
+    
+    All resources of an asset carry the asset's date and ID, so the files
+    of a Live Photo or an edited photo can be matched in the destination.
+    """
+    return {
+        "modified": item.created or item.modified,
+        "properties": {"asset_id": item.asset_id or item.id, "resource": item.resource},
+    }
+
+
+async def _upload_payload(
+    sink: PhotoSink,
+    payload: Union[SpoolEntry, MemoryPayload],
+    item: SourceItem,
+    filename: str,
+    folder_id: Optional[str],
+    mime_type: Optional[str],
+) -> dict:
+    """Upload a retained (spooled or in-memory) item."""
+    with time_stage(stages.UPLOAD):
+        return await sink.upload_stream(
+            get_bandwidth_governor().throttle(payload.open(), UPLOAD),
+            filename,
+            folder_id=folder_id,
+            mime_type=resolve_mime(filename, payload.head, mime_type),
+            size=payload.size,
+            **_file_metadata(item),
+        )
+
+
+async def _stream_item(
+    source: PhotoSource,
+    sink: PhotoSink,
+    item: SourceItem,
+    filename: str,
+    folder_id: Optional[str],
+    mime_type: Optional[str],
+) -> tuple[dict, HashingStream]:
+    """Stream an item from the source straight into the destination."""
+    governor = get_bandwidth_governor()
+    download = TimedStream(governor.throttle(source.open_stream(item), DOWNLOAD))
+    stream = HashingStream(download)
+    start = time.perf_counter()
+    try:
+        # The first chunk is read before the upload starts, to sniff the type
+        first = await anext(stream, b"")
+        
+        async def chunks():
+            if first:
+                yield first
+            async for chunk in stream:
+                yield chunk
+        
+        result = await sink.upload_stream(
+            governor.throttle(chunks(), UPLOAD),
+            filename,
+            folder_id=folder_id,
+            mime_type=resolve_mime(filename, first[:SNIFF_BYTES], mime_type),
+            size=item.size or None,
+            **_file_metadata(item),
+        )
+    finally:
+        await stream.aclose()
+        # Download and upload are interleaved: time spent waiting for
+        # source chunks is download, the rest is upload
+        elapsed = time.perf_counter() - start
+        observe_stage(stages.DOWNLOAD, download.seconds)
+        observe_stage(stages.UPLOAD, max(0.0, elapsed - download.seconds))
+    return result, stream
+
+
+async def _retain_in_memory(source: PhotoSource, item: SourceItem) -> MemoryPayload:
+    """Download a small item into memory."""
+    download = TimedStream(get_bandwidth_governor().throttle(source.open_stream(item), DOWNLOAD))
+    try:
+        return await MemoryPayload.read(download)
+    finally:
+        observe_stage(stages.DOWNLOAD, download.seconds)
+
+
+async def _delete_upload(sink: PhotoSink, result: dict) -> None:
+    """Delete a corrupted upload, logging failures."""
+    try:
+        await sink.delete(result["id"])
+    except Exception as delete_error:
+        logger.warning(f"Could not delete corrupted upload {result.get('id')}: {delete_error}")
+
+
+async def transfer_item(
+    source: PhotoSource,
+    sink: PhotoSink,
+    item: SourceItem,
+    filename: str,
+    folder_id: Optional[str],
+    mime_type: Optional[str] = None,
+    prefetcher: Optional[SpoolPrefetcher] = None,
+) -> tuple[dict, Union[HashingStream, SpoolEntry, MemoryPayload]]:
+    """
+    Transfer one item into the destination and verify its checksum.
+    
+    The MIME type sent is detected from the first downloaded bytes, then
+    the file extension, then ``mime_type`` (the type declared by the
+    source); see app.transfer.mime.resolve_mime. The file gets the item's
+    date, and its asset ID and resource as properties.
+    
+    The downloaded bytes are retained so a failed upload costs one more
+    upload, not another download: items prefetched into the spool are
+    uploaded from disk, other items up to TRANSFER_MEMORY_RETAIN_BYTES are
+    downloaded into memory first. Larger items that could not be spooled
+    are streamed from the source straight into the destination, and
+    downloaded again if their upload is retried.
+    
+    The MD5 is computed on the downloaded bytes and compared with the
+    md5Checksum returned by the destination; a corrupted upload is deleted
+    and sent again, up to TRANSFER_CHECKSUM_RETRIES times. Transient upload
+    errors (network errors, 408/429/5xx, Drive rate limits) are retried up
+    to TRANSFER_UPLOAD_RETRIES times with exponential backoff. Both
+    directions are paced by the process-wide bandwidth governor.
+    
+    Returns:
+        Tuple of (upload result, payload with md5 and size)
+        
+    Raises:
+        ItemTransferError: Wrapping the download error, or the last upload
+            error when not retryable or out of retries
+    """
+    policy = RetryPolicy.from_settings()
+    retries = {}
+    
+    try:
+        entry = await prefetcher.take(item) if prefetcher else None
+        payload = entry
+        if payload is None and item.size and item.size <= settings.TRANSFER_MEMORY_RETAIN_BYTES:
+            payload = await _retain_in_memory(source, item)
+    except Exception as e:
+        raise ItemTransferError(e, attempts=1) from e
+    
+    try:
+        while True:
+            try:
+                if payload is not None:
+                    sent = payload
+                    result = await _upload_payload(sink, payload, item, filename, folder_id, mime_type)
+                else:
+                    result, sent = await _stream_item(source, sink, item, filename, folder_id, mime_type)
+                
+                try:
+                    sent.verify(result.get("md5Checksum"))
+                except ChecksumMismatchError:
+                    await _delete_upload(sink, result)
+                    raise
+                return result, sent
+            
+            except Exception as e:
+                reason = retry_reason(e)
+                attempt = retries.get(reason, 0)
+                if not policy.allows(reason, attempt):
+                    raise ItemTransferError(e, attempts=1 + sum(retries.values())) from e
+                retries[reason] = attempt + 1
+                UPLOAD_RETRIES.inc(reason=reason)
+                delay = policy.delay(attempt)
+                logger.warning(f"{filename}: {e} (retrying upload in {delay:.1f}s, {reason} retry {attempt + 1})")
+                await asyncio.sleep(delay)
+    finally:
+        if entry is not None:
+            await prefetcher.spool.complete(entry)
+
+
+def build_default_providers(db, user_id: int, options: Optional[dict] = None) -> tuple[PhotoSource, PhotoSink]:
+    """
+    Build the source and Google Drive destination for a migration.
+    
+    The source is the user's iCloud library, or a local export when the
+    migration options say ``{"source": "local_export", "export_path": ...}``.
+    
+    Args:
+        db: Database session
+        user_id: User ID
+        options: Migration options
+        
+    Returns:
+        Tuple of (source, sink)
+        
+    Raises:
+        ValueError: If credentials are missing or the export is not valid
+    """
+    options = options or {}
+    local_export = options.get("source") == "local_export"
+    
+    # Load and decrypt all credentials once (single query)
+    credential_service = CredentialService(db)
+    credentials = credential_service.load_credential_context(
+        user_id, service_types=("google_drive",) if local_export else None
+    )
+    
+    if local_export:
+        source = build_export_source(options.get("export_path", ""))
+    else:
+        if not credentials.has_icloud:
+            raise ValueError("Credenciais do iCloud não encontradas. Configure suas credenciais primeiro.")
+        source = ICloudService(db, user_id, credentials=credentials)
+    
+    if not credentials.has_google_drive:
+        raise ValueError("Credenciais do Google Drive não encontradas. Conecte sua conta Google primeiro.")
+    
+    return source, GoogleDriveService(db, user_id, credentials=credentials)
+
+
+async def process_migration_async(
+    migration_id: int,
+    user_id: int,
+    db,
+    source: Optional[PhotoSource] = None,
+    sink: Optional[PhotoSink] = None,
+):
+    """
+    Async function to process migration.
+    
+    This function:
+    1. Connects to the source and destination
+    2. Enumerates items from the source
+    3. Streams each item from the source
+    4. Uploads it to the destination
+    5. Updates progress
+    
+    Each call is one bounded work unit (SCHEDULER_CHUNK_ITEMS /
+    SCHEDULER_CHUNK_SECONDS). Progress counters double as the cursor: the
+    unit resumes at migrated + failed photos, and when it runs out of budget
+    it queues a continuation through the outbox and returns "continued", so
+    the fair scheduler can interleave other users' work in between.
+    
+    Args:
+        migration_id: Migration ID
+        user_id: User ID
+        db: Database session
+        source: Where photos are read from (defaults to the user's iCloud,
+            or the local export named in the migration options)
+        sink: Where photos are written to (defaults to the user's Google Drive)
+    """
+    repository = MigrationRepository(db)
+    migration = repository.find_by_id(migration_id)
+    
+    if not migration:
+        raise ValueError("Migration not found")
+    
+    # Units of paused, cancelled or finished migrations end right away
+    if migration.status not in ("pending", "in_progress"):
+        logger.info(f"Skipping work unit of migration {migration_id} ({migration.status})")
+        complete_work_unit(db, migration)
+        return {"status": "skipped", "migration_id": migration_id}
+    
+    migration.status = "in_progress"
+    migration.started_at = migration.started_at or datetime.utcnow()
+    db.commit()
+    
+    profiler = MigrationProfiler(migration_id)
+    prefetcher = None
+    result = None
+    try:
+        if source is None or sink is None:
+            default_source, default_sink = build_default_providers(db, user_id, migration.options)
+            source = source or default_source
+            sink = sink or default_sink
+        
+        if (migration.options or {}).get("retry_of") is not None:
+            source = build_retry_source(db, migration.id, source)
+        
+        spool = get_spool()
+        if spool is not None:
+            prefetcher = SpoolPrefetcher(source, spool, migration_id, settings.SPOOL_PREFETCH_ITEMS)
+        
+        # Profiling requested at creation starts now; requests made through the
+        # admin endpoint are picked up when the migration is refreshed
+        check_profile_request(db, migration, profiler)
+        result = await _transfer_photos(migration, db, source, sink, profiler, prefetcher)
+    except ValueError:
+        # Not retried: release the unit so the user's slot is freed
+        db.rollback()
+        complete_work_unit(db, migration)
+        raise
+    finally:
+        if prefetcher is not None:
+            await prefetcher.close()
+        # A window keeps running (up to its own length) across a unit that
+        # yields to the next one, and ends with the migration
+        if result is None or result["status"] != "continued":
+            profiler.stop()
+    
+    complete_work_unit(db, migration, continued=result["status"] == "continued")
+    return result
+
+
+def check_profile_request(db, migration, profiler: MigrationProfiler) -> None:
+    """
+    Start a profiling window requested in the migration options.
+    
+    A handled request is stored back with ``handled_at``, so the work units
+    that follow (each with its own profiler) do not start it again.
+    
+    Args:
+        db: Database session
+        migration: Migration, with options freshly loaded
+        profiler: Profiler of the current work unit
+    """
+    request = profiler.check(migration.options)
+    if request is None:
+        return
+    
+    handled = {**request, "handled_at": datetime.now(timezone.utc).isoformat()}
+    migration.options = {**(migration.options or {}), "profile": handled}
+    db.commit()
+
+
+def build_retry_source(db, migration_id: int, source: PhotoSource) -> SelectedItemsSource:
+    """
+    Restrict a source to the failed items a retry migration covers.
+    
+    Args:
+        db: Database session
+        migration_id: ID of the retry migration
+        source: Source of the original migration
+    """
+    items = []
+    for failed in FailedItemRepository(db).find_by_retried_migration_id(migration_id):
+        # Failed companion resources are retried on their own
+        asset_id, resource = split_resource_id(failed.item_id)
+        items.append(SourceItem(
+            id=failed.item_id,
+            filename=failed.filename,
+            size=failed.file_size or 0,
+            mime_type=failed.mime_type,
+            resource=resource,
+            asset_id=asset_id,
+        ))
+    return SelectedItemsSource(source, items)
+
+
+def complete_work_unit(db, migration, continued: bool = False) -> None:
+    """
+    Release the work unit of a migration and optionally queue the next one.
+    
+    Other exceptions keep the unit in flight: Celery retries it, and the
+    dispatcher re-enqueues it once its lease expires.
+    
+    Args:
+        db: Database session
+        migration: Migration
+        continued: Queue a continuation unit (picked up by the outbox dispatcher)
+    """
+    outbox = OutboxRepository(db)
+    outbox.complete_in_flight(migration.id)
+    if continued:
+        outbox.add(OutboxMessage.for_migration(migration.id, migration.user_id))
+    db.commit()
+
+
+def mark_migration_failed(db, migration_id: int, error_message: str) -> None:
+    """
+    Mark a running migration as failed after a non-retryable error.
+    
+    Args:
+        db: Database session
+        migration_id: Migration ID
+        error_message: Error shown to the user
+    """
+    migration = MigrationRepository(db).find_by_id(migration_id)
+    if migration and migration.status in ("pending", "in_progress"):
+        migration.status = "failed"
+        migration.error_message = error_message
+        migration.completed_at = datetime.utcnow()
+        db.commit()
+
+
+def _asset_resources(item: SourceItem, extra_resources: list[str]) -> list[SourceItem]:
+    """The item followed by its companion resources chosen for the migration."""
+    return [item] + [c for c in item.companions if c.resource in extra_resources]
+
+
+def _unit_exhausted(items: int, started: float) -> bool:
+    """Whether a work unit used up its item or time budget."""
+    if settings.SCHEDULER_CHUNK_ITEMS > 0 and items >= settings.SCHEDULER_CHUNK_ITEMS:
+        return True
+    if settings.SCHEDULER_CHUNK_SECONDS > 0 and time.monotonic() - started >= settings.SCHEDULER_CHUNK_SECONDS:
+        return True
+    return False
+
+
+async def _transfer_photos(
+    migration,
+    db,
+    source: PhotoSource,
+    sink: PhotoSink,
+    profiler: MigrationProfiler,
+    prefetcher: Optional[SpoolPrefetcher] = None,
+) -> dict:
+    """Run the transfer loop of process_migration_async."""
+    migration_id = migration.id
+    
+    # Verify connections
+    logger.info(f"Connecting to source for migration {migration_id}")
+    with time_stage(stages.LOGIN):
+        await source.connect()
+    
+    logger.info(f"Connecting to destination for migration {migration_id}")
+    with time_stage(stages.LOGIN):
+        await sink.connect()
+    
+    # Get total photos count (0 if the source cannot tell up front)
+    logger.info(f"Getting total photos count for migration {migration_id}")
+    try:
+        with time_stage(stages.ENUMERATE):
+            total_photos = await source.count() or 0
+    except Exception as e:
+        logger.warning(f"Could not get photos count: {str(e)}. Will try to process in batches.")
+        total_photos = 0
+    
+    if total_photos > 0:
+        migration.total_photos = total_photos
+    elif not migration.total_photos:
+        migration.total_photos = 1  # At least 1 to avoid division by zero
+    db.commit()
+    
+    logger.info(f"Starting migration {migration_id}: {total_photos if total_photos > 0 else 'unknown'} photos to migrate")
+    
+    # Create a destination folder for this migration (once, on the first unit)
+    folder_id = migration.destination_folder_id
+    if folder_id is None:
+        folder_name = f"iCloud Migration {migration.created_at.strftime('%Y-%m-%d %H:%M')}"
+        try:
+            folder_id = await sink.mkdir(folder_name)
+            migration.destination_folder_id = folder_id
+            db.commit()
+            logger.info(f"Created destination folder: {folder_id}")
+        except Exception as e:
+            logger.warning(f"Could not create folder, uploading to root: {str(e)}")
+            folder_id = None
+    
+    # Process photos in batches, resuming after the photos already processed
+    batch_size = 50
+    migrated_count = migration.migrated_photos or 0
+    failed_count = migration.failed_photos or 0
+    offset = migrated_count + failed_count
+    photo_index = offset
+    
+    failed_items = FailedItemRepository(db)
+    retry_of = (migration.options or {}).get("retry_of")
+    
+    # Companion resources (Live Photo video, edited version) sent with each photo
+    extra_resources = parse_resources(
+        (migration.options or {}).get("resources", settings.ICLOUD_EXTRA_RESOURCES)
+    )
+    
+    # Budget of this work unit
+    unit_started = time.monotonic()
+    unit_items = 0
+    
+    batches = source.enumerate(batch_size=batch_size, offset=offset)
+    
+    while True:
+        # Check if migration was paused or cancelled. Only the fields
+        # changed by the API are reloaded: a full refresh would discard the
+        # progress counters not yet committed, and the next unit would
+        # resume from a stale offset and upload those photos again.
+        db.refresh(migration, ["status", "options"])
+        check_profile_request(db, migration, profiler)
+        if migration.status == "paused":
+            logger.info(f"Migration {migration_id} paused at {migrated_count} photos")
+            MIGRATIONS_FINISHED.inc(outcome="paused")
+            return {"status": "paused", "progress": migrated_count / migration.total_photos if migration.total_photos > 0 else 0}
+        
+        if migration.status == "failed":
+            logger.info(f"Migration {migration_id} cancelled")
+            MIGRATIONS_FINISHED.inc(outcome="cancelled")
+            return {"status": "cancelled"}
+        
+        # Get batch of photos
+        try:
+            with time_stage(stages.ENUMERATE):
+                photos = await batches.__anext__()
+        except StopAsyncIteration:
+            # No more photos
+            break
+        except Exception as e:
+            logger.error(f"Error listing photos: {str(e)}")
+            # If we can't list photos, break the loop
+            break
+        
+        if not photos:
+            continue
+        
+        # Update total if we didn't know it before
+        if total_photos == 0 and len(photos) > 0:
+            # Try to get a better estimate
+            estimated_total = offset + len(photos) + (batch_size * 10)  # Rough estimate
+            migration.total_photos = estimated_total
+            total_photos = estimated_total
+            db.commit()
+        
+        for position, photo in enumerate(photos):
+            
+            # Check if migration was paused or cancelled (inside loop)
+            db.refresh(migration, ["status", "options"])
+            check_profile_request(db, migration, profiler)
+            if migration.status == "paused":
+                logger.info(f"Migration {migration_id} paused at photo {photo_index}")
+                MIGRATIONS_FINISHED.inc(outcome="paused")
+                return {"status": "paused", "progress": migrated_count / migration.total_photos if migration.total_photos > 0 else 0}
+            
+            if migration.status == "failed":
+                logger.info(f"Migration {migration_id} cancelled")
+                MIGRATIONS_FINISHED.inc(outcome="cancelled")
+                return {"status": "cancelled"}
+            
+            if _unit_exhausted(unit_items, unit_started):
+                with time_stage(stages.DB_FLUSH):
+                    db.commit()
+                logger.info(f"Migration {migration_id} yielding after {unit_items} photos ({migrated_count + failed_count} processed)")
+                MIGRATIONS_FINISHED.inc(outcome="continued")
+                return {
+                    "status": "continued",
+                    "migration_id": migration_id,
+                    "migrated_photos": migrated_count,
+                    "failed_photos": failed_count,
+                }
+            
+            photo_index += 1
+            unit_items += 1
+            
+            resources = _asset_resources(photo, extra_resources)
+            if prefetcher is not None:
+                upcoming = photos[position:position + prefetcher.depth]
+                prefetcher.schedule([r for item in upcoming for r in _asset_resources(item, extra_resources)])
+            
+            # The resources of an asset are transferred concurrently; the
+            # asset counts as migrated only if all of them succeed
+            filename = photo.filename or f"photo_{photo_index}.jpg"
+            names = [filename] + [r.filename for r in resources[1:]]
+            logger.debug("Transferring photo %s/%s: %s", photo_index, migration.total_photos or "?", ", ".join(names))
+            outcomes = await asyncio.gather(
+                *(
+                    transfer_item(source, sink, resource, name, folder_id, resource.mime_type, prefetcher)
+                    for resource, name in zip(resources, names)
+                ),
+                return_exceptions=True,
+            )
+            
+            failed = False
+            for resource, name, outcome in zip(resources, names, outcomes):
+                if isinstance(outcome, BaseException):
+                    if not isinstance(outcome, Exception):
+                        raise outcome
+                    failed = True
+                    db.add(MigrationLog(
+                        migration_id=migration_id,
+                        photo_name=name,
+                        photo_path=resource.id,
+                        status="failed",
+                        file_size=resource.size or None,
+                        error_message=str(outcome),
+                    ))
+                    # Dead-letter record, used by POST /migrations/{id}/retry-failed
+                    failed_items.record(
+                        migration_id,
+                        resource,
+                        name,
+                        error_class=getattr(outcome, "error_class", type(outcome).__name__),
+                        error_message=str(outcome),
+                        attempts=getattr(outcome, "attempts", 1),
+                        retry_of=retry_of,
+                    )
+                    logger.error(f"Failed to migrate photo {photo_index} ({resource.resource}): {str(outcome)}")
+                    continue
+                
+                result, stream = outcome
+                BYTES_TRANSFERRED.inc(stream.size)
+                db.add(MigrationLog(
+                    migration_id=migration_id,
+                    photo_name=name,
+                    photo_path=resource.id,
+                    status="completed",
+                    file_size=stream.size,
+                    checksum=stream.md5,
+                ))
+                logger.debug("Migrated photo %s (%s): %s", photo_index, resource.resource, result.get("id"))
+            
+            # Continue with next photo instead of failing entire migration
+            if failed:
+                failed_count += 1
+                migration.failed_photos = failed_count
+                ITEMS_TRANSFERRED.inc(result="failed")
+            else:
+                migrated_count += 1
+                migration.migrated_photos = migrated_count
+                ITEMS_TRANSFERRED.inc(result="migrated")
+            
+            # Update progress every 10 photos or at the end
+            if (migrated_count + failed_count) % 10 == 0:
+                with time_stage(stages.DB_FLUSH):
+                    db.commit()
+                logger.info(f"Progress: {migrated_count}/{migration.total_photos if migration.total_photos > 0 else '?'} migrated, {failed_count} failed")
+                maybe_log_summary()
+        
+        offset += len(photos)
+    
+    # Update final total if we discovered it during processing
+    if migration.total_photos == 1 and total_photos == 0:
+        migration.total_photos = migrated_count + failed_count
+    
+    # Complete migration
+    migration.status = "completed"
+    migration.completed_at = datetime.utcnow()
+    with time_stage(stages.DB_FLUSH):
+        db.commit()
+    
+    logger.info(f"Migration {migration_id} completed: {migrated_count} migrated, {failed_count} failed")
+    MIGRATIONS_FINISHED.inc(outcome="completed")
+    maybe_log_summary(force=True)
+    
+    return {
+        "status": "completed",
+        "migration_id": migration_id,
+        "total_photos": migration.total_photos,
+        "migrated_photos": migrated_count,
+        "failed_photos": failed_count,
+    }
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the API entry points.
+
+Measures, in fresh interpreters, how long it takes to import each entry
+point (app.main for uvicorn/Render, api.index for Vercel) and to serve the
+first request, and compares the medians with the budgets recorded in
+benchmarks/budgets.json. Exits with status 1 when a budget is exceeded.
+
+budgets.json keeps, per entry point and metric, the measured median
+("baseline") and the budget derived from it (baseline plus the recorded
+headroom, at least --min-headroom-ms), along with where and how the
+baseline was measured.
+
+Usage:
+    python benchmarks/cold_start.py              # check against budgets
+    python benchmarks/cold_start.py --record     # record new baselines and budgets
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import date
+
+# Diretório raiz do backend
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGETS_FILE = os.path.join(BACKEND_DIR, "benchmarks", "budgets.json")
+
+ENTRY_POINTS = ["app.main", "api.index"]
+
+# Runs in a fresh interpreter: import the entry point, then send the first
+# request in-process through the ASGI interface (no server, no network)
+PROBE = """
+import asyncio, json, time
+start = time.perf_counter()
+import {module} as entry
+imported = time.perf_counter()
+
+import httpx
+
+async def first_request():
+    transport = httpx.ASGITransport(app=entry.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.get("/health")
+        response.raise_for_status()
+
+asyncio.run(first_request())
+served = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - start) * 1000,
+    "first_request_ms": (served - imported) * 1000,
+}}))
+"""
+
+
+def probe(module: str) -> dict:
+    """Measure one cold start of an entry point."""
+    env = dict(os.environ)
+    # Serverless-like settings; nothing is created at import time
+    env.setdefault("ENVIRONMENT", "production")
+    env.setdefault("DATABASE_URL", "sqlite:///./benchmark_cold_start.db")
+    
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module)],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Falha ao medir {module}:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def measure(module: str, runs: int) -> dict:
+    """Median import and first-request latency over several cold starts."""
+    samples = [probe(module) for _ in range(runs)]
+    return {
+        metric: round(statistics.median(s[metric] for s in samples), 1)
+        for metric in ("import_ms", "first_request_ms")
+    }
+
+
+def load_budgets() -> dict:
+    """Load recorded baselines and budgets."""
+    if not os.path.exists(BUDGETS_FILE):
+        return {}
+    with open(BUDGETS_FILE, "r") as f:
+        return json.load(f)
+
+
+def record_budgets(results: dict, runs: int, headroom: float, min_headroom_ms: float) -> dict:
+    """Write measured medians as baselines, with budgets of baseline + headroom."""
+    recorded = {
+        "recorded": {
+            "date": date.today().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "runs": runs,
+            "headroom": headroom,
+            "min_headroom_ms": min_headroom_ms,
+        },
+        "entry_points": {
+            module: {
+                metric: {"baseline": value, "budget": round(value + max(value * headroom, min_headroom_ms))}
+                for metric, value in metrics.items()
+            }
+            for module, metrics in results.items()
+        },
+    }
+    with open(BUDGETS_FILE, "w") as f:
+        json.dump(recorded, f, indent=2)
+        f.write("\n")
+    return recorded
+
+
+def main() -> int:
+    """Run the benchmark and check (or record) budgets."""
+    parser = argparse.ArgumentParser(description="Cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="Cold starts per entry point")
+    parser.add_argument("--record", action="store_true", help="Record budgets from this run")
+    parser.add_argument(
+        "--headroom",
+        type=float,
+        default=0.5,
+        help="Margin added to measurements when recording budgets (0.5 = +50%%)",
+    )
+    parser.add_argument(
+        "--min-headroom-ms",
+        type=float,
+        default=25,
+        help="Minimum margin in ms, so millisecond-scale metrics do not fail on noise",
+    )
+    args = parser.parse_args()
+    
+    budgets = load_budgets()
+    results = {module: measure(module, args.runs) for module in ENTRY_POINTS}
+    
+    if args.record:
+        budgets = record_budgets(results, args.runs, args.headroom, args.min_headroom_ms)
+        print(f"Baselines e budgets gravados em {BUDGETS_FILE}")
+    
+    recorded = budgets.get("recorded")
+    if recorded:
+        print(
+            f"Baseline de {recorded['date']} (Python {recorded['python']}, {recorded['runs']} execuções, "
+            f"margem de {recorded['headroom']:.0%}, mínimo {recorded['min_headroom_ms']:.0f}ms)"
+        )
+    
+    failures = 0
+    print(f"{'entry point':<12} {'metric':<18} {'median':>10} {'baseline':>10} {'budget':>10}")
+    for module, metrics in results.items():
+        for metric, value in metrics.items():
+            entry = budgets.get("entry_points", {}).get(module, {}).get(metric, {})
+            baseline, budget = entry.get("baseline"), entry.get("budget")
+            over = budget is not None and value > budget
+            failures += over
+            baseline_text = f"{baseline:.1f}" if baseline is not None else "-"
+            budget_text = f"{budget:.0f}" if budget is not None else "-"
+            flag = "  EXCEEDED" if over else ""
+            print(f"{module:<12} {metric:<18} {value:>8.1f}ms {baseline_text:>8}ms {budget_text:>8}ms{flag}")
+    
+    if failures:
+        print()
+        print("Budget excedido. Veja o que pesa no import com:")
+        print("    python scripts/report_import_time.py app.main")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
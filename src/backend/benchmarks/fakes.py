@@ -0,0 +1,210 @@
+"""
+Local stand-ins for the iCloud photo library and the Google Drive API.
+
+They implement the PhotoSource / PhotoSink interfaces that
+process_migration_async uses, with configurable latency, bandwidth, error
+rates and file-size distribution, so migrations can be benchmarked offline.
+
+Errors are injected only into per-item transfers (downloads and uploads),
+and are raised as httpx errors like the real clients, so the upload retry
+policy (app.transfer.retry) is exercised. Login, listing and folder calls
+never fail.
+"""
+import asyncio
+import random
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+import httpx
+from app.transfer.providers import DEFAULT_CHUNK_SIZE, PhotoSink, PhotoSource, SourceItem
+
+
+@dataclass
+class NetworkProfile:
+    """Simulated characteristics of a remote endpoint."""
+    latency_ms: float = 50.0  # Per request
+    bandwidth_mbps: float = 100.0  # Megabits per second, per transfer
+    error_rate: float = 0.0  # Probability of a failed item transfer
+    
+    async def transfer(self, size: int = 0) -> None:
+        """Wait for one request carrying size bytes."""
+        seconds = self.latency_ms / 1000
+        if size and self.bandwidth_mbps > 0:
+            seconds += size * 8 / (self.bandwidth_mbps * 1_000_000)
+        await asyncio.sleep(seconds)
+    
+    def maybe_fail(self, rng: random.Random, method: str, url: str) -> None:
+        """
+        Raise a simulated transient error with probability error_rate.
+        
+        Half are network errors (httpx.ConnectError), half 503 responses
+        (httpx.HTTPStatusError); both are retryable by the upload policy.
+        """
+        if not self.error_rate or rng.random() >= self.error_rate:
+            return
+        request = httpx.Request(method, url)
+        if rng.random() < 0.5:
+            raise httpx.ConnectError("Simulated network error", request=request)
+        response = httpx.Response(503, request=request)
+        raise httpx.HTTPStatusError("Simulated 503 Service Unavailable", request=request, response=response)
+    
+    async def transfer_chunk(self, size: int) -> None:
+        """Wait for the bandwidth cost of one chunk of an ongoing transfer."""
+        if self.bandwidth_mbps > 0:
+            await asyncio.sleep(size * 8 / (self.bandwidth_mbps * 1_000_000))
+
+
+@dataclass
+class FakePhotoLibrary:
+    """A generated photo library with a log-normal file-size distribution."""
+    count: int = 200
+    size_median_mb: float = 2.5
+    size_sigma: float = 0.8
+    video_ratio: float = 0.05
+    seed: int = 42
+    photos: List[Dict] = field(default_factory=list)
+    
+    def __post_init__(self):
+        """Generate the library."""
+        rng = random.Random(self.seed)
+        median = self.size_median_mb * 1024 * 1024
+        for index in range(self.count):
+            is_video = rng.random() < self.video_ratio
+            size = int(rng.lognormvariate(0, self.size_sigma) * median)
+            extension = "MOV" if is_video else rng.choice(["HEIC", "JPG", "PNG"])
+            self.photos.append({
+                "id": f"asset-{index:07d}",
+                "filename": f"IMG_{index:05d}.{extension}",
+                "size": max(size, 1024),
+                "created": None,
+                "modified": None,
+                "mime_type": None,
+            })
+    
+    @property
+    def total_bytes(self) -> int:
+        """Total size of the library in bytes."""
+        return sum(p["size"] for p in self.photos)
+
+
+class FakeICloudService(PhotoSource):
+    """Stand-in for the iCloud source backed by a FakePhotoLibrary."""
+    
+    def __init__(self, library: FakePhotoLibrary, network: Optional[NetworkProfile] = None, seed: int = 1):
+        """Initialize fake service."""
+        self.library = library
+        self.network = network or NetworkProfile()
+        self.rng = random.Random(seed)
+        self._by_id = {p["id"]: p for p in library.photos}
+    
+    @staticmethod
+    def _to_item(photo: Dict) -> SourceItem:
+        """Convert a library entry to a source item."""
+        return SourceItem(id=photo["id"], filename=photo["filename"], size=photo["size"])
+    
+    async def connect(self) -> None:
+        """Simulate login."""
+        await self.network.transfer()
+    
+    async def count(self) -> Optional[int]:
+        """Return library size."""
+        await self.network.transfer()
+        return self.library.count
+    
+    async def enumerate(self, batch_size: int = 50, offset: int = 0) -> AsyncIterator[List[SourceItem]]:
+        """Return the library one page at a time."""
+        for start in range(offset, self.library.count, batch_size):
+            await self.network.transfer()
+            yield [self._to_item(p) for p in self.library.photos[start:start + batch_size]]
+    
+    async def stat(self, item_id: str) -> Optional[SourceItem]:
+        """Return photo metadata."""
+        await self.network.transfer()
+        photo = self._by_id.get(item_id)
+        return self._to_item(photo) if photo else None
+    
+    async def open_stream(self, item: SourceItem, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Simulate downloading a photo in chunks."""
+        photo = self._by_id[item.id]
+        await self.network.transfer()
+        self.network.maybe_fail(self.rng, "GET", f"https://icloud.invalid/assets/{item.id}")
+        remaining = photo["size"]
+        while remaining > 0:
+            size = min(chunk_size, remaining)
+            await self.network.transfer_chunk(size)
+            remaining -= size
+            # Content does not matter; a fresh buffer mirrors a real download's allocation
+            yield bytes(size)
+
+
+class FakeGoogleDriveService(PhotoSink):
+    """Stand-in for the Google Drive destination."""
+    
+    def __init__(self, network: Optional[NetworkProfile] = None, seed: int = 2):
+        """Initialize fake service."""
+        self.network = network or NetworkProfile()
+        self.rng = random.Random(seed)
+        self.files: Dict[str, Dict] = {}
+        self.bytes_uploaded = 0
+        self._next_id = 0
+    
+    def _new_id(self) -> str:
+        """Generate a Drive-like file ID."""
+        self._next_id += 1
+        return f"drive-{self._next_id:08d}"
+    
+    async def connect(self) -> None:
+        """Simulate the quota call used to verify the connection."""
+        await self.network.transfer()
+    
+    async def mkdir(self, name: str, parent_id: Optional[str] = None) -> str:
+        """Create a folder."""
+        await self.network.transfer()
+        folder_id = self._new_id()
+        self.files[folder_id] = {"name": name, "parents": [parent_id] if parent_id else []}
+        return folder_id
+    
+    async def exists(self, name: str, folder_id: Optional[str] = None) -> bool:
+        """Look a file up by name."""
+        await self.network.transfer()
+        return any(
+            f["name"] == name and folder_id in f.get("parents", [])
+            for f in self.files.values()
+        )
+    
+    async def delete(self, file_id: str) -> None:
+        """Delete a file."""
+        await self.network.transfer()
+        removed = self.files.pop(file_id, None)
+        if removed and "size" in removed:
+            self.bytes_uploaded -= removed["size"]
+    
+    async def upload_stream(
+        self,
+        stream: AsyncIterator[bytes],
+        name: str,
+        folder_id: Optional[str] = None,
+        mime_type: str = "application/octet-stream",
+        size: Optional[int] = None,
+        modified: Optional[datetime] = None,
+        properties: Optional[dict] = None,
+    ) -> dict:
+        """Simulate an upload, consuming the stream at the configured bandwidth."""
+        await self.network.transfer()
+        written = 0
+        async for chunk in stream:
+            await self.network.transfer_chunk(len(chunk))
+            written += len(chunk)
+        # Fails after sending the bytes, like a dropped connection or a 503 on the last chunk
+        self.network.maybe_fail(self.rng, "PUT", "https://www.googleapis.invalid/upload/drive/v3/files")
+        file_id = self._new_id()
+        self.files[file_id] = {
+            "name": name,
+            "size": written,
+            "mimeType": mime_type,
+            "parents": [folder_id] if folder_id else [],
+            "modifiedTime": modified,
+            "appProperties": properties or {},
+        }
+        self.bytes_uploaded += written
+        return {"id": file_id, "name": name}
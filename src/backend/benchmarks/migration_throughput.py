@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+End-to-end migration throughput benchmark (offline).
+
+Runs process_migration_async against local stand-ins for iCloud and Google
+Drive (benchmarks/fakes.py) on a throwaway SQLite database and reports
+photos/sec, MB/sec, peak RSS and the number of database queries.
+
+The migration runs as a sequence of work units (SCHEDULER_CHUNK_ITEMS per
+unit, one session each, like the Celery task). The run fails (exit code 1)
+if a photo is uploaded more than once, so it doubles as a regression check
+for resuming between units.
+
+Usage:
+    python benchmarks/migration_throughput.py --photos 500 --latency-ms 20
+    python benchmarks/migration_throughput.py --photos 40 --chunk-items 15
+    python benchmarks/migration_throughput.py --json > result.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Migration throughput benchmark")
+    parser.add_argument("--photos", type=int, default=200, help="Photos in the fake library")
+    parser.add_argument("--size-median-mb", type=float, default=2.5, help="Median file size (MB)")
+    parser.add_argument("--size-sigma", type=float, default=0.8, help="Log-normal sigma of file sizes")
+    parser.add_argument("--video-ratio", type=float, default=0.05, help="Fraction of videos")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Per-request latency")
+    parser.add_argument("--icloud-mbps", type=float, default=200.0, help="iCloud bandwidth (Mbit/s)")
+    parser.add_argument("--drive-mbps", type=float, default=100.0, help="Drive bandwidth (Mbit/s)")
+    parser.add_argument("--icloud-error-rate", type=float, default=0.0, help="iCloud download error rate (per item)")
+    parser.add_argument("--drive-error-rate", type=float, default=0.0, help="Drive upload error rate (per attempt)")
+    parser.add_argument("--chunk-items", type=int, default=None, help="Photos per work unit (SCHEDULER_CHUNK_ITEMS)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+    return parser.parse_args()
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def main() -> int:
+    """Run the benchmark."""
+    args = parse_args()
+    
+    # The database must be configured before the app modules are imported
+    workdir = tempfile.mkdtemp(prefix="migration-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ.setdefault("ENVIRONMENT", "benchmark")
+    if args.chunk_items is not None:
+        os.environ["SCHEDULER_CHUNK_ITEMS"] = str(args.chunk_items)
+    
+    from sqlalchemy import event
+    from app.database import init_db, engine, SessionLocal
+    from app.models.user import User
+    from app.models.migration import Migration
+    from app.workers.migration_processor import process_migration_async
+    from app.instrumentation.stages import STAGE_SECONDS
+    from fakes import FakePhotoLibrary, FakeICloudService, FakeGoogleDriveService, NetworkProfile
+    
+    init_db()
+    
+    db = SessionLocal()
+    user = User(email="benchmark@example.com")
+    db.add(user)
+    db.commit()
+    migration = Migration(user_id=user.id, status="in_progress", total_photos=0, migrated_photos=0, failed_photos=0)
+    db.add(migration)
+    db.commit()
+    
+    library = FakePhotoLibrary(
+        count=args.photos,
+        size_median_mb=args.size_median_mb,
+        size_sigma=args.size_sigma,
+        video_ratio=args.video_ratio,
+        seed=args.seed,
+    )
+    icloud = FakeICloudService(
+        library,
+        NetworkProfile(args.latency_ms, args.icloud_mbps, args.icloud_error_rate),
+        seed=args.seed + 1,
+    )
+    drive = FakeGoogleDriveService(
+        NetworkProfile(args.latency_ms, args.drive_mbps, args.drive_error_rate),
+        seed=args.seed + 2,
+    )
+    
+    queries = {"count": 0}
+    
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_query(*_):
+        queries["count"] += 1
+    
+    migration_id, user_id = migration.id, user.id
+    db.close()
+    
+    async def run_units() -> tuple[dict, int]:
+        """Run work units until the migration stops continuing."""
+        units = 0
+        while True:
+            unit_db = SessionLocal()
+            try:
+                result = await process_migration_async(migration_id, user_id, unit_db, source=icloud, sink=drive)
+            finally:
+                unit_db.close()
+            units += 1
+            if result.get("status") != "continued":
+                return result, units
+    
+    start = time.perf_counter()
+    result, units = asyncio.run(run_units())
+    elapsed = time.perf_counter() - start
+    
+    uploads: dict[str, int] = {}
+    for uploaded in drive.files.values():
+        if "size" in uploaded:
+            uploads[uploaded["name"]] = uploads.get(uploaded["name"], 0) + 1
+    duplicate_uploads = sum(count - 1 for count in uploads.values())
+    
+    megabytes = drive.bytes_uploaded / (1024 * 1024)
+    report = {
+        "photos": args.photos,
+        "status": result.get("status"),
+        "work_units": units,
+        "migrated": result.get("migrated_photos"),
+        "failed": result.get("failed_photos"),
+        "duplicate_uploads": duplicate_uploads,
+        "elapsed_s": round(elapsed, 3),
+        "photos_per_s": round((result.get("migrated_photos") or 0) / elapsed, 2),
+        "mb_per_s": round(megabytes / elapsed, 2),
+        "mb_uploaded": round(megabytes, 1),
+        "library_mb": round(library.total_bytes / (1024 * 1024), 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "db_queries": queries["count"],
+        "db_queries_per_photo": round(queries["count"] / max(args.photos, 1), 2),
+        # Total seconds spent per stage (download and upload overlap the loop)
+        "stage_seconds": {
+            sample["labels"]["stage"]: round(sample["sum"], 3)
+            for sample in STAGE_SECONDS.snapshot()["samples"]
+        },
+    }
+    
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        width = max(len(key) for key in report)
+        for key, value in report.items():
+            print(f"{key:<{width}}  {value}")
+    
+    if duplicate_uploads:
+        print(f"❌ {duplicate_uploads} fotos enviadas mais de uma vez", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Script para verificar a paginação por cursor de GET /migrations.
+
+Cria um usuário temporário com migrações (várias no mesmo segundo, para
+exercitar empates em created_at), percorre todas as páginas com os
+repositórios síncrono e assíncrono e confere que cada migração aparece uma
+única vez, na ordem (created_at DESC, id DESC). Os dados criados são
+removidos ao final.
+
+Usa o banco de DATABASE_URL (SQLite ou PostgreSQL):
+
+    DATABASE_URL=sqlite:///./check.db python scripts/check_cursor_pagination.py
+    DATABASE_URL=postgresql://... python scripts/check_cursor_pagination.py
+"""
+import sys
+import os
+import asyncio
+import time
+import uuid
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal, get_async_sessionmaker, init_db
+from app.config import settings
+from app.models.migration import Migration
+from app.models.user import User
+from app.repositories.migration_repository import AsyncMigrationRepository, MigrationRepository
+
+MIGRATIONS = 11
+PAGE_SIZE = 3
+
+
+def _walk_sync(user_id: int) -> list[int]:
+    """Percorre as páginas com o repositório síncrono."""
+    db = SessionLocal()
+    try:
+        repository = MigrationRepository(db)
+        seen, cursor = [], None
+        for _ in range(MIGRATIONS + 1):
+            migrations, cursor = repository.find_by_user_id_keyset(user_id, cursor=cursor, limit=PAGE_SIZE)
+            seen.extend(m.id for m in migrations)
+            if cursor is None:
+                return seen
+        raise AssertionError(f"Paginação não terminou (ids vistos: {seen})")
+    finally:
+        db.close()
+
+
+async def _walk_async(user_id: int) -> list[int]:
+    """Percorre as páginas com o repositório assíncrono."""
+    async with get_async_sessionmaker("api")() as db:
+        repository = AsyncMigrationRepository(db)
+        seen, cursor = [], None
+        for _ in range(MIGRATIONS + 1):
+            migrations, cursor = await repository.find_by_user_id_keyset(user_id, cursor=cursor, limit=PAGE_SIZE)
+            seen.extend(m.id for m in migrations)
+            if cursor is None:
+                return seen
+        raise AssertionError(f"Paginação não terminou (ids vistos: {seen})")
+
+
+def check_cursor_pagination():
+    """Cria os dados de teste, percorre as páginas e compara com a ordem esperada."""
+    print("=" * 60)
+    print("Verificação: Paginação por cursor de migrations")
+    print("=" * 60)
+    print()
+    
+    init_db()
+    db = SessionLocal()
+    user = User(email=f"pagination-check-{uuid.uuid4().hex}@example.com")
+    db.add(user)
+    db.commit()
+    
+    try:
+        for index in range(MIGRATIONS):
+            db.add(Migration(user_id=user.id, status="completed", total_photos=0, migrated_photos=0, failed_photos=0))
+            db.commit()
+            # Alguns segundos distintos, com empates dentro de cada um
+            if index % 4 == 3:
+                time.sleep(1.1)
+        
+        expected = [
+            m.id for m in db.query(Migration)
+            .filter(Migration.user_id == user.id)
+            .order_by(Migration.created_at.desc(), Migration.id.desc())
+            .all()
+        ]
+        
+        failures = 0
+        for name, seen in (("síncrono", _walk_sync(user.id)), ("assíncrono", asyncio.run(_walk_async(user.id)))):
+            if seen == expected:
+                print(f"✅ Repositório {name}: {len(seen)} migrações em {-(-len(seen) // PAGE_SIZE)} páginas")
+            else:
+                failures += 1
+                print(f"❌ Repositório {name}: esperado {expected}, obtido {seen}")
+        
+        print()
+        print("=" * 60)
+        print("✅ Paginação correta" if not failures else "❌ Paginação incorreta")
+        print("=" * 60)
+        return 1 if failures else 0
+    
+    except Exception as e:
+        print()
+        print("=" * 60)
+        print(f"❌ Erro durante a verificação: {str(e)}")
+        print("=" * 60)
+        return 1
+    
+    finally:
+        db.rollback()
+        db.delete(user)
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    print(f"Banco de dados: {settings.DATABASE_URL}")
+    print()
+    exit(check_cursor_pagination())
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""Script para criar os índices compostos da tabela migrations."""
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+from app.config import settings
+from app.models.migration import Migration
+
+
+def migrate_migration_indexes():
+    """Cria os índices compostos de migrations que ainda não existem."""
+    print("=" * 60)
+    print("Migração: Criando índices compostos em migrations")
+    print("=" * 60)
+    print()
+    
+    try:
+        for index in Migration.__table__.indexes:
+            columns = ", ".join(column.name for column in index.columns)
+            if len(index.columns) < 2:
+                continue
+            print(f"Criando índice '{index.name}' ({columns})...")
+            # checkfirst torna o script idempotente
+            index.create(bind=engine, checkfirst=True)
+            print(f"✅ Índice '{index.name}' disponível")
+        
+        print()
+        print("=" * 60)
+        print("✅ Migração concluída com sucesso!")
+        print("=" * 60)
+        
+        return 0
+        
+    except Exception as e:
+        print()
+        print("=" * 60)
+        print(f"❌ Erro durante a migração: {str(e)}")
+        print("=" * 60)
+        return 1
+
+
+if __name__ == "__main__":
+    print(f"Banco de dados: {settings.DATABASE_URL}")
+    print()
+    exit(migrate_migration_indexes())
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Script para adicionar a coluna options à tabela migrations."""
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+from app.database import engine
+from app.config import settings
+from app.models.migration import Migration
+
+
+def migrate_migration_options():
+    """Adiciona a coluna options (JSON) à tabela migrations."""
+    print("=" * 60)
+    print("Migração: Adicionando coluna options em migrations")
+    print("=" * 60)
+    print()
+    
+    try:
+        # Verificar se a coluna já existe
+        columns = [column["name"] for column in inspect(engine).get_columns("migrations")]
+        print(f"Colunas existentes: {', '.join(columns)}")
+        print()
+        
+        if "options" not in columns:
+            print("Adicionando coluna 'options'...")
+            column_type = Migration.__table__.c.options.type.compile(dialect=engine.dialect)
+            with engine.begin() as connection:
+                connection.execute(text(f"ALTER TABLE migrations ADD COLUMN options {column_type}"))
+            print("✅ Coluna 'options' adicionada com sucesso")
+        else:
+            print("✅ Coluna 'options' já existe")
+        
+        print()
+        print("=" * 60)
+        print("✅ Migração concluída com sucesso!")
+        print("=" * 60)
+        
+        return 0
+        
+    except Exception as e:
+        print()
+        print("=" * 60)
+        print(f"❌ Erro durante a migração: {str(e)}")
+        print("=" * 60)
+        return 1
+
+
+if __name__ == "__main__":
+    print(f"Banco de dados: {settings.DATABASE_URL}")
+    print()
+    exit(migrate_migration_options())
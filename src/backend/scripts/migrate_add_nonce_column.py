@@ -6,9 +6,10 @@ import os
 # Adicionar o diretório raiz ao path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sqlalchemy import text
-from app.database import engine, SessionLocal
+from sqlalchemy import inspect, text
+from app.database import engine
 from app.config import settings
+from app.models.credential import Credential
 
 
 def migrate_credentials_table():
@@ -18,13 +19,10 @@ def migrate_credentials_table():
     print("=" * 60)
     print()
     
-    db = SessionLocal()
-    
     try:
-        # Verificar se as colunas já existem
+        # Verificar se as colunas já existem (SQLite ou PostgreSQL)
         print("Verificando estrutura atual da tabela...")
-        result = db.execute(text("PRAGMA table_info(credentials)"))
-        columns = [row[1] for row in result.fetchall()]
+        columns = [column["name"] for column in inspect(engine).get_columns("credentials")]
         
         print(f"Colunas existentes: {', '.join(columns)}")
         print()
@@ -32,8 +30,9 @@ def migrate_credentials_table():
         # Adicionar coluna nonce se não existir
         if 'nonce' not in columns:
             print("Adicionando coluna 'nonce'...")
-            db.execute(text("ALTER TABLE credentials ADD COLUMN nonce VARCHAR"))
-            db.commit()
+            column_type = Credential.__table__.c.nonce.type.compile(dialect=engine.dialect)
+            with engine.begin() as connection:
+                connection.execute(text(f"ALTER TABLE credentials ADD COLUMN nonce {column_type}"))
             print("✅ Coluna 'nonce' adicionada com sucesso")
         else:
             print("✅ Coluna 'nonce' já existe")
@@ -41,8 +40,9 @@ def migrate_credentials_table():
         # Adicionar coluna expires_at se não existir
         if 'expires_at' not in columns:
             print("Adicionando coluna 'expires_at'...")
-            db.execute(text("ALTER TABLE credentials ADD COLUMN expires_at DATETIME"))
-            db.commit()
+            column_type = Credential.__table__.c.expires_at.type.compile(dialect=engine.dialect)
+            with engine.begin() as connection:
+                connection.execute(text(f"ALTER TABLE credentials ADD COLUMN expires_at {column_type}"))
             print("✅ Coluna 'expires_at' adicionada com sucesso")
         else:
             print("✅ Coluna 'expires_at' já existe")
@@ -55,14 +55,11 @@ def migrate_credentials_table():
         return 0
         
     except Exception as e:
-        db.rollback()
         print()
         print("=" * 60)
         print(f"❌ Erro durante a migração: {str(e)}")
         print("=" * 60)
         return 1
-    finally:
-        db.close()
 
 
 if __name__ == "__main__":
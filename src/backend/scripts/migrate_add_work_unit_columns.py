@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Script para adicionar as colunas de unidades de trabalho do agendador."""
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+from app.database import engine
+from app.config import settings
+from app.models.migration import Migration
+from app.models.outbox_message import OutboxMessage
+
+# (tabela, modelo, coluna)
+NEW_COLUMNS = [
+    ("outbox_messages", OutboxMessage, "completed_at"),
+    ("outbox_messages", OutboxMessage, "started_at"),
+    ("migrations", Migration, "destination_folder_id"),
+]
+
+
+def migrate_work_unit_columns():
+    """Adiciona completed_at/started_at em outbox_messages e destination_folder_id em migrations."""
+    print("=" * 60)
+    print("Migração: Adicionando colunas de unidades de trabalho")
+    print("=" * 60)
+    print()
+    
+    try:
+        inspector = inspect(engine)
+        for table, model, name in NEW_COLUMNS:
+            # Verificar se a coluna já existe
+            columns = [column["name"] for column in inspector.get_columns(table)]
+            if name not in columns:
+                print(f"Adicionando coluna '{table}.{name}'...")
+                column_type = model.__table__.c[name].type.compile(dialect=engine.dialect)
+                with engine.begin() as connection:
+                    connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}"))
+                print(f"✅ Coluna '{table}.{name}' adicionada com sucesso")
+            else:
+                print(f"✅ Coluna '{table}.{name}' já existe")
+        
+        for index in OutboxMessage.__table__.indexes:
+            if index.name != "ix_outbox_messages_user_dispatched":
+                continue
+            print(f"Criando índice '{index.name}'...")
+            # checkfirst torna o script idempotente
+            index.create(bind=engine, checkfirst=True)
+            print(f"✅ Índice '{index.name}' disponível")
+        
+        print()
+        print("=" * 60)
+        print("✅ Migração concluída com sucesso!")
+        print("=" * 60)
+        
+        return 0
+    
+    except Exception as e:
+        print()
+        print("=" * 60)
+        print(f"❌ Erro durante a migração: {str(e)}")
+        print("=" * 60)
+        return 1
+
+
+if __name__ == "__main__":
+    print(f"Banco de dados: {settings.DATABASE_URL}")
+    print()
+    exit(migrate_work_unit_columns())
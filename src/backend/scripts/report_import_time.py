@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Script para relatar o tempo de import de um módulo (padrão: app.main)."""
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+# Diretório raiz do backend
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_imports(module: str) -> list[tuple[int, int, str]]:
+    """
+    Import a module in a fresh interpreter with -X importtime.
+    
+    Returns:
+        List of (self_us, cumulative_us, module_name) in import order;
+        nesting depth is encoded by the leading spaces of module_name
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        lines = [l for l in result.stderr.splitlines() if not l.startswith("import time:")]
+        raise RuntimeError("\n".join(lines[-20:]))
+    
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        entries.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return entries
+
+
+def summarize(entries: list[tuple[int, int, str]]) -> dict:
+    """Group import time by top-level package."""
+    by_package = defaultdict(int)
+    for self_us, _, name in entries:
+        by_package[name.strip().split(".")[0]] += self_us
+    
+    top_level = [(cumulative, name.strip()) for _, cumulative, name in entries if not name.startswith("  ")]
+    total_us = sum(cumulative for cumulative, _ in top_level)
+    
+    return {
+        "total_ms": total_us / 1000,
+        "by_package_ms": {
+            package: us / 1000
+            for package, us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)
+        },
+    }
+
+
+def main() -> int:
+    """Print the import-time breakdown."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("module", nargs="?", default="app.main", help="Módulo a importar")
+    parser.add_argument("--top", type=int, default=15, help="Quantidade de pacotes listados")
+    args = parser.parse_args()
+    
+    summary = summarize(measure_imports(args.module))
+    
+    print("=" * 60)
+    print(f"Tempo de import de {args.module}: {summary['total_ms']:.1f} ms")
+    print("=" * 60)
+    for package, ms in list(summary["by_package_ms"].items())[:args.top]:
+        print(f"{ms:10.1f} ms  {package}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Script para preparar o banco de dados a cada deploy.
+
+Roda `init_db.py` (cria tabelas novas) e, em seguida, os scripts de migração
+de `scripts/` na ordem do MIGRATIONS.md. Todos são idempotentes, então o
+script pode rodar em todo deploy (preDeployCommand do Render, `release` do
+Procfile). Para no primeiro script que falhar.
+
+    python scripts/run_migrations.py
+"""
+import sys
+import os
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Ordem de execução; novos scripts de migração entram no fim da lista
+STEPS = [
+    "init_db.py",
+    "scripts/migrate_add_nonce_column.py",
+    "scripts/migrate_add_migration_indexes.py",
+    "scripts/migrate_add_migration_options.py",
+    "scripts/migrate_add_work_unit_columns.py",
+]
+
+
+def run_migrations():
+    """Roda init_db.py e os scripts de migração, parando na primeira falha."""
+    for step in STEPS:
+        print(f"▶️  {step}")
+        result = subprocess.run([sys.executable, step], cwd=BACKEND_DIR)
+        if result.returncode != 0:
+            print(f"❌ {step} falhou (código {result.returncode})")
+            return result.returncode
+        print()
+    
+    print("✅ Banco de dados pronto para o deploy")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(run_migrations())